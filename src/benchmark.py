@@ -6,43 +6,155 @@
 
 from __future__ import annotations
 
+import abc
 import asyncio
 import base64
+import email.utils
+import gc
+import heapq
+import itertools
 import json
-import math
+import os
+import platform
+import secrets
 import socket
 import ssl
 import statistics
+import struct
+import sys
+import threading
 import time
+from collections import OrderedDict
+from collections import deque
+from contextlib import asynccontextmanager
 from dataclasses import asdict
 from dataclasses import dataclass
 from dataclasses import field
+from dataclasses import replace
+from datetime import datetime
+from datetime import timezone
+from typing import AsyncIterator
 from typing import Callable
+from typing import Coroutine
 from typing import Literal
+from typing import TypeVar
 from urllib.parse import parse_qsl
 from urllib.parse import urlencode
 from urllib.parse import urlparse
 from urllib.parse import urlunparse
 
 import dns.asyncquery
+import dns.edns
+import dns.exception
+import dns.flags
 import dns.message
 import dns.name
+import dns.query
+import dns.quic
 import dns.rcode
 import dns.rdataclass
 import dns.rdatatype
 import dns.resolver
 import httpx
 
+try:
+    import uvloop
+except ImportError:  # uvloop is optional; the standard asyncio loop runs every benchmark as well, with more overhead per callback.
+    uvloop = None
+
+from .benchmark_profiling import MeasuredPhaseProfiler
+from .benchmark_profiling import ProfileMode
+from .benchmark_stats import bootstrap_intervals
+from .benchmark_stats import LatencyIntervals
+from .benchmark_stats import LatencySummary
+from .benchmark_stats import percentile
+
 # The warm-up is intentionally small; it should heat up transports without dominating the run.
 DEFAULT_WARMUP_QUERIES = 5
 # The UI should stay responsive, so keep the worker pool bounded.
 DEFAULT_CONCURRENCY = 10
 # Every query uses the same timeout budget so protocols are compared consistently.
 DEFAULT_QUERY_TIMEOUT_SECONDS = 3.0
-
-TransportName = Literal["Do53", "DoT", "DoH"]
+# Warm mode models a stub cache, so it gets a stub-sized bound instead of growing with the corpus.
+DEFAULT_CACHE_MAX_ENTRIES = 10_000
+# A byte bound of zero means only the entry count limits the cache.
+DEFAULT_CACHE_MAX_BYTES = 0
+# The client-cache simulation replays the corpus for one simulated hour at one query per second.
+DEFAULT_SIMULATION_DURATION_SECONDS = 3600.0
+DEFAULT_SIMULATION_QUERY_RATE = 1.0
+# Prefetch once 90% of the TTL has elapsed, as common caching forwarders do.
+DEFAULT_PREFETCH_THRESHOLD = 0.9
+# RFC 8767 suggests keeping stale data for one to three days.
+DEFAULT_STALE_MAX_SECONDS = 86_400.0
+# Matches httpx's own keep-alive expiry so the default DoH pool behaves as before.
+DEFAULT_DOH_KEEPALIVE_EXPIRY_SECONDS = 5.0
+# The circuit breaker opens once 80% of the last 20 upstream queries failed.
+DEFAULT_CIRCUIT_BREAKER_WINDOW = 20
+DEFAULT_CIRCUIT_BREAKER_ERROR_RATE = 0.8
+# SERVFAIL answers and timeouts count as throttling once 3 of the last 10 answers show them.
+DEFAULT_THROTTLE_WINDOW = 10
+DEFAULT_THROTTLE_BURST = 3
+# Retry-After pauses are capped so one provider cannot stall a run for minutes.
+MAX_RETRY_AFTER_SECONDS = 10.0
+# HTTP statuses DoH servers use to shed load.
+THROTTLE_HTTP_STATUSES = (429, 503)
+# Adaptive sampling checks the ranking after 20 queries per resolver and then every 10 more.
+DEFAULT_SAMPLING_MIN_QUERIES = 20
+DEFAULT_SAMPLING_ROUND_QUERIES = 10
+# The adaptive timeout never drops below Linux's TCP RTO floor, whatever the smoothed RTT says.
+DEFAULT_MIN_RTO_SECONDS = 0.2
+# Hedges fire once a query is slower than the p95 of the answers seen so far in the run.
+DEFAULT_HEDGE_PERCENTILE = 95.0
+# The hedge delay needs a few measured answers before the percentile means anything.
+DEFAULT_HEDGE_MIN_SAMPLES = 10
+# The loop-lag sampler wakes every 10 ms, and a run is unreliable once the p95 lag exceeds 25% of the median latency.
+DEFAULT_LOOP_LAG_INTERVAL_SECONDS = 0.01
+DEFAULT_LOOP_LAG_UNRELIABLE_FRACTION = 0.25
+# Wake-ups up to 2 ms late are timer slack that an idle loop shows as well, so they never flag a run.
+LOOP_LAG_NOISE_FLOOR_MS = 2.0
+# Overrides the event loop of runs whose options leave it on "auto".
+EVENT_LOOP_ENVIRONMENT_VARIABLE = "DNS_TESTER_EVENT_LOOP"
+# DNS messages are capped at 64 KiB, so larger declared DoH bodies are rejected before reading.
+MAX_DNS_MESSAGE_SIZE = 65_535
+# Python does not export SO_TIMESTAMPNS; 35 is its value in Linux's generic socket ABI (x86, Arm, RISC-V).
+SO_TIMESTAMPNS = getattr(socket, "SO_TIMESTAMPNS", 35 if sys.platform == "linux" else None)
+# RFC 4892 name that many resolvers answer with the identity of the responding server.
+SITE_PROBE_NAME = "id.server."
+# Network phases in the order a query passes through them; "exchange" stands in where a transport cannot split the round trip.
+PHASE_NAMES = (
+    "failed_attempt",
+    "pool_wait",
+    "bootstrap",
+    "tcp_connect",
+    "tls_handshake",
+    "request_write",
+    "first_byte",
+    "response_complete",
+    "exchange",
+)
+# Short phase names for the one-line result summaries.
+PHASE_LABELS = {
+    "failed_attempt": "failed try",
+    "pool_wait": "pool",
+    "bootstrap": "DNS",
+    "tcp_connect": "TCP",
+    "tls_handshake": "TLS",
+    "request_write": "write",
+    "first_byte": "first byte",
+    "response_complete": "read",
+    "exchange": "exchange",
+}
+
+TransportName = Literal["Do53", "DoT", "DoH", "DoQ", "DoH3"]
 DoHMethod = Literal["POST", "GET"]
+CacheState = Literal["fresh", "prefetch", "stale", "miss"]
+UpstreamCacheClass = Literal["hit", "miss"]
+EventLoopName = Literal["auto", "asyncio", "uvloop"]
 ProgressCallback = Callable[[str, int, int, str], None]
+# Adaptive sampling reports progress and results per endpoint index.
+SampledProgressCallback = Callable[[int, str, int, int, str], None]
+SampledResultCallback = Callable[[int, "BenchmarkResult"], None]
+T = TypeVar("T")
 
 
 @dataclass(frozen=True)
@@ -66,6 +178,60 @@ class BenchmarkOptions:
     warmup_queries: int = DEFAULT_WARMUP_QUERIES
     concurrency: int = DEFAULT_CONCURRENCY
     cache_enabled: bool = False
+    cache_max_entries: int = DEFAULT_CACHE_MAX_ENTRIES
+    cache_max_bytes: int = DEFAULT_CACHE_MAX_BYTES
+    cache_simulation: bool = False
+    simulation_duration_seconds: float = DEFAULT_SIMULATION_DURATION_SECONDS
+    simulation_query_rate: float = DEFAULT_SIMULATION_QUERY_RATE
+    prefetch_threshold: float = DEFAULT_PREFETCH_THRESHOLD
+    serve_stale: bool = True
+    stale_max_seconds: float = DEFAULT_STALE_MAX_SECONDS
+    # Zero keeps httpx's automatic pool; a positive value pins the number of DoH connections.
+    doh_max_connections: int = 0
+    # Zero leaves stream concurrency to the server's HTTP/2 SETTINGS.
+    doh_max_streams_per_connection: int = 0
+    doh_keepalive_expiry_seconds: float = DEFAULT_DOH_KEEPALIVE_EXPIRY_SECONDS
+    # False opens a new connection for every DoT, DoH, DoQ, and DoH3 query, as short-lived clients do.
+    connection_reuse: bool = True
+    # Cold DoT connections offer the TLS session ticket of the previous connection.
+    tls_resumption: bool = False
+    # Cold DoT connections carry the ClientHello in the SYN where the kernel supports TCP Fast Open.
+    tcp_fast_open: bool = False
+    # Do53 workers keep one UDP socket each and time answers by their kernel receive timestamp (Linux only).
+    kernel_timestamps: bool = False
+    # Fast-fails the rest of the measured phase once most recent answers failed; those queries count as failures.
+    circuit_breaker: bool = False
+    circuit_breaker_window: int = DEFAULT_CIRCUIT_BREAKER_WINDOW
+    circuit_breaker_error_rate: float = DEFAULT_CIRCUIT_BREAKER_ERROR_RATE
+    # Halves the in-flight budget on throttling signals, grows it back additively, and requeues throttled queries once.
+    throttle_backoff: bool = False
+    # The adaptive timeout replaces the fixed per-query budget with an RFC 6298 RTO capped by it.
+    adaptive_timeout: bool = False
+    min_rto_seconds: float = DEFAULT_MIN_RTO_SECONDS
+    hedged_queries: bool = False
+    hedge_percentile: float = DEFAULT_HEDGE_PERCENTILE
+    sampling_min_queries: int = DEFAULT_SAMPLING_MIN_QUERIES
+    sampling_round_queries: int = DEFAULT_SAMPLING_ROUND_QUERIES
+    # Adds a pass over unique random labels under each corpus name to force full recursion.
+    cache_busting: bool = False
+    # Re-queries every name once and classifies answers as resolver cache hits or misses by TTL.
+    ttl_analysis: bool = False
+    # Asks for the EDNS NSID of every answer and probes id.server per connection to tag the anycast site.
+    site_identification: bool = False
+    # Re-runs the measured names on the warm pool at concurrency 1, 2, 4, ... up to ``concurrency``.
+    concurrency_sweep: bool = False
+    # Samples how late the event loop wakes up during the measured phase and flags runs it contaminated.
+    loop_lag_monitor: bool = True
+    loop_lag_unreliable_fraction: float = DEFAULT_LOOP_LAG_UNRELIABLE_FRACTION
+    # Moves every existing object out of the collector's reach while measuring, so GC pauses stay short.
+    gc_freeze: bool = False
+    # "auto" uses uvloop when it is installed, unless DNS_TESTER_EVENT_LOOP names a loop.
+    event_loop: EventLoopName = "auto"
+    # Profiles the measured phase with cProfile or a stack sampler, optionally with tracemalloc allocations.
+    profile_mode: ProfileMode = "off"
+    profile_allocations: bool = False
+    # None writes the profile folders under the user cache directory.
+    profile_directory: str | None = None
 
     @property
     def cache_mode(self) -> str:
@@ -85,6 +251,302 @@ class QueryMeasurement:
     error: str | None = None
     http_version: str | None = None
     response_wire: bytes | None = None
+    hedged: bool = False
+    # Resolver-set runs record which upstream produced the answer.
+    upstream: str | None = None
+    # TTL analysis records the answer TTL and whether the resolver answered from its cache.
+    answer_ttl: int | None = None
+    upstream_cache: UpstreamCacheClass | None = None
+    # Site identification records the anycast site (NSID or id.server) that answered.
+    site: str | None = None
+    # Seconds a throttling DoH server asked the client to wait.
+    retry_after_seconds: float | None = None
+    # Throttling signal this answer carried, such as "refused" or "http-429".
+    throttle_signal: str | None = None
+    # Milliseconds spent in each network phase, such as "tcp_connect" or "tls_handshake".
+    phases: dict[str, float] | None = None
+    # Whether a cold TLS connection resumed an earlier session.
+    tls_resumed: bool | None = None
+    # Tries this answer took; 2 when a dropped connection was reopened and the query sent again.
+    attempts: int = 1
+    # Do53 round trip from the send call to the kernel receive timestamp, free of event-loop delay.
+    kernel_rtt_ms: float | None = None
+
+
+@dataclass
+class CacheStatistics:
+    """Counters exported by the warm-mode response cache."""
+
+    max_entries: int
+    max_bytes: int
+    hits: int = 0
+    misses: int = 0
+    negative_hits: int = 0
+    stale_hits: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    entries: int = 0
+    wire_bytes: int = 0
+    peak_wire_bytes: int = 0
+
+    @property
+    def hit_rate(self) -> float | None:
+        """Return the measured-phase hit percentage, or None before any lookup."""
+        lookups = self.hits + self.misses
+        return (self.hits / lookups) * 100.0 if lookups else None
+
+
+@dataclass
+class UpstreamCacheAnalysis:
+    """Resolver-side cache hits and misses inferred from answer TTLs.
+
+    A miss returns the full authoritative TTL, while a cached answer returns it
+    counted down. The reference TTL per name is the highest one seen in the run,
+    including a second query per name. When every answer for a name came from a
+    cache, its freshest answer still counts as a miss, so the hit ratio is a lower
+    bound. Names whose answers imply different insertion times were served from
+    more than one cache.
+    """
+
+    classified_queries: int = 0
+    hits: int = 0
+    misses: int = 0
+    fragmented_names: int = 0
+    names: int = 0
+    hit_latency: LatencySummary | None = None
+    miss_latency: LatencySummary | None = None
+
+    @property
+    def hit_ratio(self) -> float | None:
+        """Return the percentage of classified answers served from the resolver's cache."""
+        return (self.hits / self.classified_queries) * 100.0 if self.classified_queries else None
+
+
+@dataclass
+class SiteLatency:
+    """Latency of the answers that one anycast site served during the measured phase."""
+
+    site: str
+    queries: int
+    # Percentage of the run's site-tagged answers that came from this site.
+    share: float
+    latency: LatencySummary
+
+
+@dataclass
+class ConcurrencyLevel:
+    """Throughput and latency of one pass over the measured names at a fixed concurrency.
+
+    ``throughput_qps`` counts answers only; ``attempted_qps`` is the load that was
+    offered, so a gap between them shows queries the resolver dropped or refused.
+    """
+
+    concurrency: int
+    queries: int
+    successful_queries: int
+    elapsed_ms: float
+    throughput_qps: float
+    latency: LatencySummary | None = None
+    # Queries actually sent; fewer than ``queries`` when the circuit breaker stopped the pass.
+    attempted_queries: int = 0
+    failed_queries: int = 0
+    attempted_qps: float = 0.0
+    # Answers that carried a throttling signal, classified like in the measured phase.
+    throttled_queries: int = 0
+    # Lowest AIMD budget of the level, or None when Throttle Backoff is off.
+    min_in_flight: int | None = None
+
+    @property
+    def success_rate(self) -> float:
+        """Return the percentage of attempted queries in this pass that succeeded."""
+        return (self.successful_queries / self.attempted_queries) * 100.0 if self.attempted_queries else 0.0
+
+    @property
+    def power(self) -> float:
+        """Return throughput divided by mean latency, which peaks where queueing starts."""
+        if self.latency is None or self.latency.average_ms <= 0.0:
+            return 0.0
+        return self.throughput_qps / self.latency.average_ms
+
+
+@dataclass
+class ConcurrencySweep:
+    """Latency-versus-load curve of one resolver.
+
+    The knee is the level with the highest power (throughput over mean latency):
+    below it, extra parallel queries mostly add throughput; above it, they mostly
+    wait in a queue or get rate limited.
+    """
+
+    levels: list[ConcurrencyLevel]
+    knee_concurrency: int | None = None
+    # Levels replay names the resolver already answered, so they load its cached-answer path, not recursion.
+    upstream_cached: bool = True
+
+    @property
+    def knee(self) -> ConcurrencyLevel | None:
+        """Return the level at the knee point."""
+        return next((level for level in self.levels if level.concurrency == self.knee_concurrency), None)
+
+
+@dataclass
+class CacheBustingResult:
+    """Hot-name latency next to the latency of unique names the resolver has to recurse for.
+
+    NXDOMAIN answers count as successful in the uncached pass, since the resolver
+    had to reach the authoritative servers to produce them.
+    """
+
+    queries: int
+    successful_queries: int
+    nxdomain_answers: int
+    cached: LatencySummary | None = None
+    uncached: LatencySummary | None = None
+
+    @property
+    def success_rate(self) -> float:
+        """Return the percentage of random names that got an authoritative answer."""
+        return (self.successful_queries / self.queries) * 100.0 if self.queries else 0.0
+
+    @property
+    def recursion_penalty_ms(self) -> float | None:
+        """Return how much slower the median uncached lookup is than the median cached one."""
+        if self.cached is None or self.uncached is None:
+            return None
+        return self.uncached.p50_ms - self.cached.p50_ms
+
+
+@dataclass
+class CacheSimulationResult:
+    """Outcome of replaying the corpus through a simulated caching client."""
+
+    duration_seconds: float
+    query_rate: float
+    prefetch_threshold: float
+    serve_stale: bool
+    queries: int = 0
+    blocked_queries: int = 0
+    failed_queries: int = 0
+    prefetches: int = 0
+    stale_served: int = 0
+    upstream_fetches: int = 0
+    effective_average_latency_ms: float | None = None
+    effective_p95_latency_ms: float | None = None
+
+    @property
+    def blocked_rate(self) -> float:
+        """Return the percentage of client queries that had to wait for the upstream."""
+        return (self.blocked_queries / self.queries) * 100.0 if self.queries else 0.0
+
+
+@dataclass
+class DoHPoolStatistics:
+    """Connection and stream usage observed by the DoH client during one run."""
+
+    max_connections: int
+    max_streams_per_connection: int
+    keepalive_expiry_seconds: float
+    connections_opened: int = 0
+    streams_opened: int = 0
+    peak_concurrent_streams: int = 0
+    peak_streams_per_connection: int | None = None
+
+
+@dataclass
+class TransportCounters:
+    """Connection events a worker saw while serving the measured phase.
+
+    Connections opened by design, as in new-connection-per-query mode, count as
+    handshakes but not as reconnects.
+    """
+
+    reconnects: int = 0
+    retries: int = 0
+    tls_handshakes: int = 0
+    reused_connections: int = 0
+    http_streams_opened: int = 0
+
+    def merge(self, other: TransportCounters) -> None:
+        """Add another worker's counters to these."""
+        self.reconnects += other.reconnects
+        self.retries += other.retries
+        self.tls_handshakes += other.tls_handshakes
+        self.reused_connections += other.reused_connections
+        self.http_streams_opened += other.http_streams_opened
+
+
+@dataclass
+class LoopLagStatistics:
+    """How late the event loop woke a fixed-interval sampler during the measured phase.
+
+    Lag delays every answer the loop handles in the meantime, so a run whose p95
+    lag is a large share of its median latency measured the harness as much as
+    the resolver.
+    """
+
+    interval_ms: float
+    lag: LatencySummary
+    max_ms: float
+    gc_frozen: bool
+    unreliable: bool = False
+
+
+@dataclass
+class AdaptiveTimeoutStatistics:
+    """Final state of the RFC 6298 retransmission timer that paces UDP resends."""
+
+    min_rto_ms: float
+    max_rto_ms: float
+    samples: int = 0
+    backoffs: int = 0
+    # Resends after an RTO expired, each one a new query on the same worker.
+    retransmissions: int = 0
+    srtt_ms: float | None = None
+    rttvar_ms: float | None = None
+    rto_ms: float | None = None
+
+
+@dataclass
+class HedgeStatistics:
+    """Hedged-request counters plus the latency the run would have shown without hedging."""
+
+    percentile: float
+    queries: int = 0
+    hedged_queries: int = 0
+    hedge_wins: int = 0
+    latency_saved_ms: float = 0.0
+    unhedged_average_latency_ms: float | None = None
+    unhedged_p95_latency_ms: float | None = None
+
+    @property
+    def hedge_rate(self) -> float:
+        """Return the percentage of upstream queries that sent a duplicate."""
+        return (self.hedged_queries / self.queries) * 100.0 if self.queries else 0.0
+
+    @property
+    def average_latency_saved_ms(self) -> float | None:
+        """Return the mean latency saved per hedged query."""
+        return self.latency_saved_ms / self.hedged_queries if self.hedged_queries else None
+
+
+@dataclass
+class ThrottleStatistics:
+    """Throttling signals seen in the measured phase and the AIMD budget's response to them."""
+
+    max_in_flight: int
+    signals: dict[str, int] = field(default_factory=dict)
+    backoffs: int = 0
+    requeued_queries: int = 0
+    retry_after_waits: int = 0
+    min_in_flight: int = 0
+    final_in_flight: int = 0
+    # Successful answers per second after the first backoff, or None when the resolver never pushed back.
+    sustainable_qps: float | None = None
+
+    @property
+    def throttled(self) -> bool:
+        """Return whether any throttling signal was seen."""
+        return bool(self.signals)
 
 
 @dataclass
@@ -108,17 +570,62 @@ class BenchmarkResult:
     http_version: str | None = None
     resolved_target: str | None = None
     error: str | None = None
+    cancelled: bool = False
+    # False when every query opened its own connection.
+    connection_reuse: bool = True
+    circuit_breaker_reason: str | None = None
+    # Set by adaptive sampling to explain why this resolver stopped before or at the end of the corpus.
+    sampling_stop_reason: str | None = None
+    # Bootstrap confidence intervals for the mean and p95 of the successful latencies.
+    latency_intervals: LatencyIntervals | None = None
+    cache_statistics: CacheStatistics | None = None
+    cache_simulation: CacheSimulationResult | None = None
+    cache_busting: CacheBustingResult | None = None
+    upstream_cache: UpstreamCacheAnalysis | None = None
+    sites: list[SiteLatency] | None = None
+    concurrency_sweep: ConcurrencySweep | None = None
+    doh_pool_statistics: DoHPoolStatistics | None = None
+    adaptive_timeout: AdaptiveTimeoutStatistics | None = None
+    hedge_statistics: HedgeStatistics | None = None
+    throttle_statistics: ThrottleStatistics | None = None
+    # Latency summary per network phase over the measurements that recorded phases.
+    phase_breakdown: dict[str, LatencySummary] | None = None
+    # Cold connections that resumed a TLS session, when connections are not reused.
+    tls_resumed_queries: int | None = None
+    # Reconnects, retries, and handshakes summed over the workers; None for Do53.
+    transport_counters: TransportCounters | None = None
+    # Successful latency split by whether the answer needed a retry on a fresh connection.
+    first_attempt_latency: LatencySummary | None = None
+    retried_latency: LatencySummary | None = None
+    # Kernel-timestamped Do53 round trips, and how much the application-observed latency adds to each.
+    kernel_latency: LatencySummary | None = None
+    harness_overhead: LatencySummary | None = None
+    loop_lag: LoopLagStatistics | None = None
+    # Event loop the run was measured on, such as "uvloop" 0.21.0 or "asyncio" 3.13.5.
+    event_loop: str | None = None
+    event_loop_version: str | None = None
+    # Paths of the profiling artifacts by kind, including the folder and the result JSON saved beside them.
+    profile_artifacts: dict[str, str] | None = None
+    # Why the profile is incomplete or the latencies were slowed by the profiler, one note per reason.
+    profile_notes: list[str] = field(default_factory=list)
     measurements: list[QueryMeasurement] = field(default_factory=list)
 
     def summary_line(self) -> str:
         """Return the compact table-style line shown in the main result row."""
         if self.error:
             return self.error
-        return (
+        summary = (
             f"avg {self.average_latency_ms:.1f} ms | "
             f"p95 {self.p95_latency_ms:.1f} ms | "
             f"success {self.success_rate:.0f}%"
         )
+        if self.cancelled:
+            summary += f" | cancelled after {self.total_queries} queries"
+        if self.circuit_breaker_reason:
+            summary += " | aborted early"
+        if self.loop_lag is not None and self.loop_lag.unreliable:
+            summary += " | unreliable (loop lag)"
+        return summary
 
     def detail_line(self) -> str:
         """Return the secondary metrics line shown below the summary."""
@@ -139,8 +646,76 @@ class BenchmarkResult:
             detail_parts.append(f"TTFB {self.average_ttfb_ms:.1f} ms")
         if self.http_version:
             detail_parts.append(self.http_version)
+        if not self.connection_reuse:
+            cold = "new connection per query"
+            handshakes = [
+                f"{label} p50 {self.phase_breakdown[phase].p50_ms:.1f} ms"
+                for phase, label in (("tcp_connect", "TCP"), ("tls_handshake", "TLS"))
+                if self.phase_breakdown and phase in self.phase_breakdown
+            ]
+            if handshakes:
+                cold += f" ({', '.join(handshakes)})"
+            if self.tls_resumed_queries and self.successful_queries:
+                cold += f", {self.tls_resumed_queries / self.successful_queries * 100.0:.0f}% resumed"
+            detail_parts.append(cold)
+        if self.event_loop and self.event_loop != "asyncio":
+            detail_parts.append(self.event_loop)
+        if self.loop_lag is not None:
+            detail_parts.append(f"loop lag p95 {self.loop_lag.lag.p95_ms:.1f} ms")
+        if self.kernel_latency is not None and self.harness_overhead is not None:
+            detail_parts.append(
+                f"kernel p50 {self.kernel_latency.p50_ms:.1f} ms (harness +{self.harness_overhead.p50_ms:.1f} ms)"
+            )
+        if self.cache_statistics is not None and self.cache_statistics.hit_rate is not None:
+            detail_parts.append(f"cache hits {self.cache_statistics.hit_rate:.0f}%")
+        if self.cache_simulation is not None and self.cache_simulation.effective_average_latency_ms is not None:
+            detail_parts.append(
+                f"client blocks {self.cache_simulation.blocked_rate:.1f}% "
+                f"(eff. {self.cache_simulation.effective_average_latency_ms:.1f} ms)"
+            )
+        if self.hedge_statistics is not None and self.hedge_statistics.hedged_queries:
+            detail_parts.append(
+                f"hedged {self.hedge_statistics.hedge_rate:.1f}% "
+                f"(saved {self.hedge_statistics.average_latency_saved_ms:.1f} ms)"
+            )
+        if self.cache_busting is not None and self.cache_busting.uncached is not None:
+            detail_parts.append(
+                f"uncached p50 {self.cache_busting.uncached.p50_ms:.1f} ms "
+                f"({self.cache_busting.recursion_penalty_ms:+.1f} ms)"
+                if self.cache_busting.recursion_penalty_ms is not None
+                else f"uncached p50 {self.cache_busting.uncached.p50_ms:.1f} ms"
+            )
+        if self.upstream_cache is not None and self.upstream_cache.hit_ratio is not None:
+            upstream_cache = f"upstream hits {self.upstream_cache.hit_ratio:.0f}%"
+            if self.upstream_cache.fragmented_names:
+                upstream_cache += f", {self.upstream_cache.fragmented_names} names split across caches"
+            detail_parts.append(upstream_cache)
+        if self.sites is not None and len(self.sites) > 1:
+            site_p95 = [site.latency.p95_ms for site in self.sites]
+            detail_parts.append(f"{len(self.sites)} sites, p95 {min(site_p95):.1f}-{max(site_p95):.1f} ms")
+        elif self.sites:
+            detail_parts.append(f"site {self.sites[0].site}")
+        if self.throttle_statistics is not None and self.throttle_statistics.backoffs:
+            throttle = f"throttled, backed off to {self.throttle_statistics.min_in_flight} in flight"
+            if self.throttle_statistics.sustainable_qps is not None:
+                throttle += f" ({self.throttle_statistics.sustainable_qps:.0f} q/s sustainable)"
+            detail_parts.append(throttle)
+        if self.concurrency_sweep is not None and self.concurrency_sweep.knee is not None:
+            knee = self.concurrency_sweep.knee
+            detail_parts.append(f"knee at {knee.concurrency} in flight ({knee.throughput_qps:.0f} q/s, cached names)")
+        if self.sampling_stop_reason:
+            detail_parts.append(self.sampling_stop_reason)
         return " | ".join(detail_parts)
 
+    def phase_line(self) -> str | None:
+        """Return the median time per network phase, or None when no phase was recorded."""
+        if not self.phase_breakdown:
+            return None
+        return "phases p50 " + ", ".join(
+            f"{PHASE_LABELS.get(phase, phase)} {summary.p50_ms:.1f}"
+            for phase, summary in self.phase_breakdown.items()
+        ) + " ms"
+
     def to_json(self) -> str:
         """Serialize the structured benchmark result for optional export/debugging."""
         payload = asdict(self)
@@ -178,17 +753,38 @@ class CachedResponse:
 
     wire: bytes
     expiration: float
+    ttl: int = 0
+    rcode: int = dns.rcode.NOERROR
+    negative: bool = False
 
 
 class ResponseCache:
-    """Small wrapper around dnspython's cache so warm benchmarks are explicit."""
+    """Bounded LRU response cache so warm benchmarks model a real stub cache.
 
-    def __init__(self, enabled: bool):
+    Entries are keyed like dnspython's cache, expire on the response TTL, and are
+    evicted least-recently-used first once the entry or wire-byte bound is hit.
+    Negative answers (NXDOMAIN/NODATA) are cached for the RFC 2308 SOA minimum.
+    The clock is injectable so the client-cache simulation can replay hours of
+    traffic instantly, and expired entries can be kept for RFC 8767 serve-stale.
+    """
+
+    def __init__(
+        self,
+        enabled: bool,
+        max_entries: int = DEFAULT_CACHE_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_CACHE_MAX_BYTES,
+        prefetch_threshold: float = 0.0,
+        stale_max_seconds: float = 0.0,
+        clock: Callable[[], float] = time.time,
+    ):
         self.enabled = enabled
-        self.cache = dns.resolver.Cache()
-        # Keep a resolver with an attached cache to match dnspython's documented pattern.
-        self.resolver = dns.resolver.Resolver(configure=False)
-        self.resolver.cache = self.cache
+        self.max_entries = max(max_entries, 0)
+        self.max_bytes = max(max_bytes, 0)
+        self.prefetch_threshold = prefetch_threshold
+        self.stale_max_seconds = max(stale_max_seconds, 0.0)
+        self.clock = clock
+        self.entries: OrderedDict[tuple[dns.name.Name, dns.rdatatype.RdataType, dns.rdataclass.RdataClass], CachedResponse] = OrderedDict()
+        self.statistics = CacheStatistics(max_entries=self.max_entries, max_bytes=self.max_bytes)
         self._lock = asyncio.Lock()
 
     def _make_key(self, domain: str, query_type: str) -> tuple[dns.name.Name, dns.rdatatype.RdataType, dns.rdataclass.RdataClass]:
@@ -199,51 +795,131 @@ class ResponseCache:
             dns.rdataclass.IN,
         )
 
+    def _discard(self, cache_key) -> None:
+        """Drop one entry and keep the memory accounting in sync."""
+        cached = self.entries.pop(cache_key)
+        self.statistics.wire_bytes -= len(cached.wire)
+        self.statistics.entries = len(self.entries)
+
+    def _over_bound(self) -> bool:
+        """Return whether the cache currently exceeds either configured bound."""
+        if self.max_entries and len(self.entries) > self.max_entries:
+            return True
+        return bool(self.max_bytes) and self.statistics.wire_bytes > self.max_bytes
+
+    def _evict(self) -> None:
+        """Evict least-recently-used entries until the cache fits its bounds again."""
+        while self.entries and self._over_bound():
+            self._discard(next(iter(self.entries)))
+            self.statistics.evictions += 1
+
+    async def lookup(self, domain: str, query_type: str) -> tuple[CacheState, CachedResponse | None]:
+        """Classify the cached entry for one name as fresh, due for prefetch, stale, or missing."""
+        cache_key = self._make_key(domain, query_type)
+        async with self._lock:
+            cached = self.entries.get(cache_key)
+            now = self.clock()
+            if cached is not None and cached.expiration <= now:
+                if now < cached.expiration + self.stale_max_seconds:
+                    self.entries.move_to_end(cache_key)
+                    self.statistics.stale_hits += 1
+                    return "stale", cached
+                self._discard(cache_key)
+                self.statistics.expirations += 1
+                cached = None
+            if cached is None:
+                self.statistics.misses += 1
+                return "miss", None
+            self.entries.move_to_end(cache_key)
+            self.statistics.hits += 1
+            if cached.negative:
+                self.statistics.negative_hits += 1
+
+        stored_at = cached.expiration - cached.ttl
+        if self.prefetch_threshold > 0.0 and now - stored_at >= cached.ttl * self.prefetch_threshold:
+            return "prefetch", cached
+        return "fresh", cached
+
     async def get(self, domain: str, query_type: str) -> QueryMeasurement | None:
         """Return a cached response as an instant warm measurement when available."""
         if not self.enabled:
             return None
 
-        cache_key = self._make_key(domain, query_type)
         lookup_started = time.perf_counter()
-        async with self._lock:
-            cached = self.cache.get(cache_key)
-        if cached is None:
+        state, cached = await self.lookup(domain, query_type)
+        if cached is None or state == "stale":
             return None
 
         latency_ms = (time.perf_counter() - lookup_started) * 1000.0
+        # Cached answers keep the classification the network answer had, so NXDOMAIN stays a failure.
+        if cached.rcode != dns.rcode.NOERROR:
+            return QueryMeasurement(
+                domain=domain,
+                success=False,
+                latency_ms=latency_ms,
+                from_cache=True,
+                error=dns.rcode.to_text(cached.rcode),
+                response_wire=cached.wire,
+            )
         return QueryMeasurement(
             domain=domain,
             success=True,
             latency_ms=latency_ms,
             ttfb_ms=None,
             from_cache=True,
+            response_wire=cached.wire,
         )
 
-    async def put(self, domain: str, query_type: str, message: dns.message.Message) -> None:
-        """Store successful responses so the measured phase can run warm."""
+    async def put(self, domain: str, query_type: str, message: dns.message.Message) -> bool:
+        """Store cacheable responses so the measured phase can run warm."""
         if not self.enabled:
-            return
+            return False
+
+        rcode = message.rcode()
+        negative = rcode == dns.rcode.NXDOMAIN or (rcode == dns.rcode.NOERROR and not message.answer)
+        if rcode not in (dns.rcode.NOERROR, dns.rcode.NXDOMAIN):
+            return False
+        ttl = _negative_ttl(message) if negative else _message_ttl(message)
+        if ttl is None:
+            return False
+
+        wire = message.to_wire()
+        if self.max_bytes and len(wire) > self.max_bytes:
+            return False
 
         cache_key = self._make_key(domain, query_type)
-        ttl = _message_ttl(message)
         async with self._lock:
-            self.cache.put(
-                cache_key,
-                CachedResponse(
-                    wire=message.to_wire(),
-                    expiration=time.time() + ttl,
-                ),
+            if cache_key in self.entries:
+                self._discard(cache_key)
+            self.entries[cache_key] = CachedResponse(
+                wire=wire,
+                expiration=self.clock() + ttl,
+                ttl=ttl,
+                rcode=rcode,
+                negative=negative,
             )
+            self.statistics.wire_bytes += len(wire)
+            self.statistics.entries = len(self.entries)
+            self._evict()
+            self.statistics.peak_wire_bytes = max(self.statistics.peak_wire_bytes, self.statistics.wire_bytes)
+        return True
 
 
 def _percentile_95(values: list[float]) -> float:
     """Compute a stable p95 even for small datasets."""
-    if len(values) == 1:
-        return values[0]
-    sorted_values = sorted(values)
-    index = math.ceil(len(sorted_values) * 0.95) - 1
-    return sorted_values[max(index, 0)]
+    return percentile(values, 95.0)
+
+
+def _time_from_first_attempt(measurement: QueryMeasurement, started: float, retry_started: float) -> None:
+    """Time a retried answer from the start of the failed first attempt.
+
+    The failed attempt becomes the ``failed_attempt`` phase, and the reconnect,
+    which is already reported as phases, now counts in the latency as well.
+    """
+    if measurement.latency_ms is None:
+        return
+    measurement.latency_ms = (time.perf_counter() - started) * 1000.0
+    measurement.phases = {"failed_attempt": (retry_started - started) * 1000.0, **(measurement.phases or {})}
 
 
 def _safe_error(error: Exception) -> str:
@@ -251,11 +927,187 @@ def _safe_error(error: Exception) -> str:
     return f"{type(error).__name__}: {error}"
 
 
-def _build_query(domain: str, query_type: str) -> dns.message.QueryMessage:
-    """Create a standard recursive DNS question."""
+def _remaining(deadline: float) -> float:
+    """Return the seconds left until a ``time.monotonic()`` deadline, raising once it has passed."""
+    remaining = deadline - time.monotonic()
+    if remaining <= 0.0:
+        raise TimeoutError("timed out")
+    return remaining
+
+
+def _recv_exact(sock: socket.socket, size: int, deadline: float) -> bytes:
+    """Read exactly ``size`` bytes from a blocking socket before ``deadline``."""
+    buffer = bytearray()
+    while len(buffer) < size:
+        sock.settimeout(_remaining(deadline))
+        chunk = sock.recv(size - len(buffer))
+        if not chunk:
+            raise ConnectionError("connection closed before the full response arrived")
+        buffer.extend(chunk)
+    return bytes(buffer)
+
+
+def _doh_request_arguments(endpoint: ResolverEndpoint, query: dns.message.QueryMessage) -> tuple[str, str, dict[str, str], bytes | None]:
+    """Build a RFC 8484 compatible GET or POST request."""
+    wire = query.to_wire()
+    headers = {"accept": "application/dns-message"}
+    if endpoint.doh_method == "POST":
+        headers["content-type"] = "application/dns-message"
+        return "POST", endpoint.target, headers, wire
+
+    parsed = urlparse(endpoint.target)
+    query_items = dict(parse_qsl(parsed.query, keep_blank_values=True))
+    query_items["dns"] = base64.urlsafe_b64encode(wire).rstrip(b"=").decode("ascii")
+    request_url = urlunparse(parsed._replace(query=urlencode(query_items)))
+    return "GET", request_url, headers, None
+
+
+def _http_phases(marks: dict[str, float], started: float, finished: float) -> dict[str, float]:
+    """Turn httpcore trace timestamps into phase durations in milliseconds.
+
+    ``marks`` maps trace events without their protocol prefix, such as
+    ``connect_tcp.complete`` or ``send_request_headers.started``, to the time they
+    were first seen. Everything before the first event is time spent waiting for
+    a stream slot or a pooled connection. httpx resolves the host inside its TCP
+    connect, so for DoH the bootstrap lookup is part of ``tcp_connect``.
+    """
+    phases: dict[str, float] = {}
+    if marks:
+        phases["pool_wait"] = (min(marks.values()) - started) * 1000.0
+    if "connect_tcp.started" in marks and "connect_tcp.complete" in marks:
+        phases["tcp_connect"] = (marks["connect_tcp.complete"] - marks["connect_tcp.started"]) * 1000.0
+    if "start_tls.started" in marks and "start_tls.complete" in marks:
+        phases["tls_handshake"] = (marks["start_tls.complete"] - marks["start_tls.started"]) * 1000.0
+    # A new HTTP/2 connection first sends its preface and SETTINGS, which belongs to writing the request.
+    write_started = marks.get("send_connection_init.started", marks.get("send_request_headers.started"))
+    written = marks.get("send_request_body.complete", marks.get("send_request_headers.complete"))
+    headers_received = marks.get("receive_response_headers.complete")
+    if write_started is not None and written is not None:
+        phases["request_write"] = (written - write_started) * 1000.0
+    if written is not None and headers_received is not None:
+        phases["first_byte"] = (headers_received - written) * 1000.0
+    if headers_received is not None:
+        phases["response_complete"] = (finished - headers_received) * 1000.0
+    return phases
+
+
+def _retry_after_seconds(value: str | None) -> float | None:
+    """Parse a Retry-After header given either as delta-seconds or as an HTTP date."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def _build_query(domain: str, query_type: str, nsid: bool = False) -> dns.message.QueryMessage:
+    """Create a standard recursive DNS question, optionally asking for the server's NSID."""
+    if nsid:
+        return dns.message.make_query(domain, query_type, use_edns=0, options=[dns.edns.NSIDOption(b"")])
     return dns.message.make_query(domain, query_type)
 
 
+def _site_probe_query() -> dns.message.QueryMessage:
+    """Create the CHAOS-class id.server question that names the answering server."""
+    return dns.message.make_query(SITE_PROBE_NAME, "TXT", "CH")
+
+
+def _response_site(wire: bytes) -> str | None:
+    """Return the NSID the server attached to a response, if any."""
+    try:
+        message = dns.message.from_wire(wire)
+    except Exception:
+        return None
+    for option in message.options:
+        if isinstance(option, dns.edns.NSIDOption) and option.nsid:
+            return option.to_text().removeprefix("NSID ")
+    return None
+
+
+def _probe_site(response: dns.message.Message) -> str | None:
+    """Return the first TXT string of an id.server answer."""
+    for rrset in response.answer:
+        for rdata in rrset:
+            if rdata.strings:
+                return rdata.strings[0].decode("utf-8", "replace")
+    return None
+
+
+def _answer_ttl(wire: bytes) -> int | None:
+    """Return the lowest TTL in the answer section, or None for answers without records."""
+    try:
+        message = dns.message.from_wire(wire)
+    except Exception:
+        return None
+    ttls = [rrset.ttl for rrset in message.answer]
+    return min(ttls) if ttls else None
+
+
+def _phase_breakdown(measurements: list[QueryMeasurement]) -> dict[str, LatencySummary] | None:
+    """Summarize every recorded network phase across the given measurements."""
+    per_phase: dict[str, list[float]] = {}
+    for measurement in measurements:
+        for phase, duration_ms in (measurement.phases or {}).items():
+            per_phase.setdefault(phase, []).append(duration_ms)
+    if not per_phase:
+        return None
+    ordered = sorted(per_phase, key=lambda phase: PHASE_NAMES.index(phase) if phase in PHASE_NAMES else len(PHASE_NAMES))
+    return {phase: LatencySummary.from_values(per_phase[phase]) for phase in ordered}
+
+
+def _site_latencies(measurements: list[QueryMeasurement]) -> list[SiteLatency]:
+    """Group site-tagged answers per anycast site, busiest site first."""
+    per_site: dict[str, list[float]] = {}
+    for measurement in measurements:
+        if measurement.site is not None and measurement.latency_ms is not None:
+            per_site.setdefault(measurement.site, []).append(measurement.latency_ms)
+    tagged = sum(len(latencies) for latencies in per_site.values())
+    sites = [
+        SiteLatency(site=site, queries=len(latencies), share=(len(latencies) / tagged) * 100.0, latency=LatencySummary.from_values(latencies))
+        for site, latencies in per_site.items()
+    ]
+    return sorted(sites, key=lambda site: site.queries, reverse=True)
+
+
+def _sweep_levels(maximum: int) -> list[int]:
+    """Return 1, 2, 4, ... below ``maximum``, followed by ``maximum`` itself."""
+    levels: list[int] = []
+    level = 1
+    while level < maximum:
+        levels.append(level)
+        level *= 2
+    levels.append(maximum)
+    return levels
+
+
+def _cache_busting_name(domain: str) -> str:
+    """Prefix a random label that no resolver can have cached."""
+    return f"{secrets.token_hex(8)}.{domain.rstrip('.')}"
+
+
+def _profile_label(name: str) -> str:
+    """Reduce a resolver name to characters that are safe in a folder name."""
+    return "".join(character if character.isalnum() else "-" for character in name.lower()).strip("-")
+
+
+def _is_ip_address(value: str) -> bool:
+    """Return whether the value is an IPv4 or IPv6 literal, without touching the resolver."""
+    for family in (socket.AF_INET, socket.AF_INET6):
+        try:
+            socket.inet_pton(family, value)
+            return True
+        except OSError:
+            pass
+    return False
+
+
 def _resolved_ip(target: str) -> str | None:
     """Return the IP only when the target already is one."""
     try:
@@ -292,28 +1144,444 @@ def _message_ttl(message: dns.message.Message) -> int:
     return min(ttl_candidates) if ttl_candidates else 60
 
 
+def _negative_ttl(message: dns.message.Message) -> int | None:
+    """Return the RFC 2308 negative TTL, or None when no SOA allows negative caching."""
+    for rrset in message.authority:
+        if rrset.rdtype == dns.rdatatype.SOA and len(rrset) > 0:
+            return min(rrset.ttl, rrset[0].minimum)
+    return None
+
+
+class BenchmarkCancellation:
+    """Thread-safe handle that lets the GTK thread cancel a benchmark running in a worker thread."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._tasks: set[asyncio.Task] = set()
+        self._cancelled = False
+
+    @property
+    def cancelled(self) -> bool:
+        """Return whether cancellation was requested."""
+        return self._cancelled
+
+    def attach(self, task: asyncio.Task) -> None:
+        """Bind a running benchmark task, cancelling it at once if cancel() came first."""
+        with self._lock:
+            self._loop = task.get_loop()
+            self._tasks.add(task)
+            if self._cancelled:
+                self._loop.call_soon_threadsafe(task.cancel)
+
+    def detach(self, task: asyncio.Task) -> None:
+        """Forget a task once its benchmark has finished."""
+        with self._lock:
+            self._tasks.discard(task)
+
+    def cancel(self) -> None:
+        """Request cancellation from any thread; repeated requests are ignored.
+
+        A second task.cancel() landing while the first one unwinds would escape
+        the benchmark as a bare CancelledError.
+        """
+        with self._lock:
+            if self._cancelled:
+                return
+            self._cancelled = True
+            if self._loop is None or self._loop.is_closed():
+                return
+            for task in self._tasks:
+                self._loop.call_soon_threadsafe(task.cancel)
+
+
+class _CircuitBreaker:
+    """Sliding-window error-rate breaker that stops a failing resolver from draining the whole corpus."""
+
+    def __init__(self, enabled: bool, window: int, error_rate: float) -> None:
+        self.enabled = enabled and window > 0
+        self.error_rate = error_rate
+        self.outcomes: deque[bool] = deque(maxlen=max(window, 1))
+        self.completed = 0
+        self.reason: str | None = None
+
+    @property
+    def is_open(self) -> bool:
+        """Return whether the breaker has tripped."""
+        return self.reason is not None
+
+    def record(self, measurement: QueryMeasurement, answered: bool | None = None) -> None:
+        """Account one upstream answer and trip once the window is full and mostly failing.
+
+        ``answered`` overrides ``measurement.success`` for passes where an error
+        rcode such as NXDOMAIN is the expected answer.
+        """
+        if not self.enabled or self.is_open:
+            return
+        self.completed += 1
+        self.outcomes.append(measurement.success if answered is None else answered)
+        if len(self.outcomes) < self.outcomes.maxlen:
+            return
+        failures = self.outcomes.count(False)
+        if failures / len(self.outcomes) < self.error_rate:
+            return
+        self.reason = (
+            f"circuit opened after {self.completed} queries: "
+            f"{failures}/{len(self.outcomes)} recent queries failed"
+        )
+        if measurement.error:
+            self.reason += f" (last error: {measurement.error})"
+
+
+class _ThrottleController:
+    """AIMD in-flight budget that backs off when a resolver signals it is shedding load.
+
+    REFUSED answers and HTTP 429/503 are throttling signals on their own. SERVFAIL
+    answers and timeouts only count in bursts, since a few of them are normal. Each
+    clean answer grows the budget by one query per budget's worth of answers, and a
+    signal halves it at most once per budget's worth of answers, like TCP
+    congestion control. Retry-After pauses every new query.
+    """
+
+    def __init__(self, enabled: bool, limit: int) -> None:
+        self.enabled = enabled
+        self.limit = max(limit, 1)
+        self.budget = float(self.limit)
+        self.in_flight = 0
+        self.resume_at = 0.0
+        self.statistics = ThrottleStatistics(max_in_flight=self.limit, min_in_flight=self.limit, final_in_flight=self.limit)
+        self._condition = asyncio.Condition()
+        self._recent: deque[str | None] = deque(maxlen=DEFAULT_THROTTLE_WINDOW)
+        self._since_backoff = self.limit
+        self._first_backoff_at: float | None = None
+        self._successes_since_backoff = 0
+        # Measured time since the first backoff, so the gaps between measured rounds do not dilute the rate.
+        self._round_started_at: float | None = None
+        self._seconds_since_backoff = 0.0
+
+    def classify(self, measurement: QueryMeasurement) -> str | None:
+        """Return the throttling signal an answer carries, taking recent answers into account."""
+        error = measurement.error or ""
+        if error == "REFUSED":
+            return "refused"
+        status = error.removeprefix("HTTP ") if error.startswith("HTTP ") else ""
+        # A DoH3 stream can end without a status, which is reported as "HTTP none".
+        if status.isdigit() and int(status) in THROTTLE_HTTP_STATUSES:
+            return f"http-{status}"
+        kind = "servfail" if error == "SERVFAIL" else "timeout" if "Timeout" in error else None
+        self._recent.append(kind)
+        if kind is not None and self._recent.count(kind) >= DEFAULT_THROTTLE_BURST:
+            return f"{kind}-burst"
+        return None
+
+    async def acquire(self) -> None:
+        """Wait for a free slot in the budget and for any Retry-After pause to end."""
+        if not self.enabled:
+            return
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < int(self.budget))
+            self.in_flight += 1
+        delay = self.resume_at - time.monotonic()
+        if delay > 0.0:
+            await asyncio.sleep(delay)
+
+    async def release(self, measurement: QueryMeasurement) -> str | None:
+        """Free the slot, adapt the budget to the answer, and return its throttling signal."""
+        if not self.enabled:
+            return None
+        signal = self.classify(measurement)
+        async with self._condition:
+            self.in_flight -= 1
+            self._since_backoff += 1
+            if signal is None:
+                self.budget = min(self.budget + 1.0 / self.budget, float(self.limit))
+                if self._first_backoff_at is not None and measurement.success:
+                    self._successes_since_backoff += 1
+            else:
+                self.statistics.signals[signal] = self.statistics.signals.get(signal, 0) + 1
+                if self._since_backoff >= int(self.budget):
+                    self.budget = max(self.budget / 2.0, 1.0)
+                    self._since_backoff = 0
+                    self.statistics.backoffs += 1
+                    if self._first_backoff_at is None:
+                        self._first_backoff_at = time.monotonic()
+                if measurement.retry_after_seconds is not None:
+                    self.resume_at = max(self.resume_at, time.monotonic() + min(measurement.retry_after_seconds, MAX_RETRY_AFTER_SECONDS))
+                    self.statistics.retry_after_waits += 1
+            self.statistics.min_in_flight = min(self.statistics.min_in_flight, int(self.budget))
+            self._condition.notify_all()
+        return signal
+
+    def start_round(self) -> None:
+        """Mark the start of one measured round."""
+        self._round_started_at = time.monotonic()
+
+    def end_round(self) -> None:
+        """Add the part of the round that followed the first backoff to the measured time."""
+        started, self._round_started_at = self._round_started_at, None
+        if started is not None and self._first_backoff_at is not None:
+            self._seconds_since_backoff += time.monotonic() - max(started, self._first_backoff_at)
+
+    def finish(self) -> ThrottleStatistics:
+        """Export the counters with the final budget and the rate sustained since the first backoff."""
+        self.statistics.final_in_flight = int(self.budget)
+        if self._seconds_since_backoff > 0.0 and self._successes_since_backoff:
+            self.statistics.sustainable_qps = self._successes_since_backoff / self._seconds_since_backoff
+        return self.statistics
+
+
+class _HeapFreeze:
+    """Reference-counted gc.freeze() shared by every benchmark in the process.
+
+    gc.collect() and gc.freeze() act on the whole interpreter, so batches running
+    at the same time, in one loop or in several window threads, take holds
+    instead: the first hold collects and freezes, the last release unfreezes.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._holders = 0
+
+    def hold(self) -> None:
+        """Freeze the heap unless another batch already did."""
+        with self._lock:
+            if self._holders == 0:
+                # Collect once so the frozen heap holds no garbage, then keep the collector off the old objects.
+                gc.collect()
+                gc.freeze()
+            self._holders += 1
+
+    def release(self) -> None:
+        """Drop one hold, unfreezing the heap when it was the last."""
+        with self._lock:
+            self._holders -= 1
+            if self._holders == 0:
+                gc.unfreeze()
+
+
+_HEAP_FREEZE = _HeapFreeze()
+
+
+class _LoopLagMonitor:
+    """Background task that sleeps for a fixed interval and records how late it wakes up."""
+
+    def __init__(self, interval: float = DEFAULT_LOOP_LAG_INTERVAL_SECONDS) -> None:
+        self.interval = interval
+        self.samples: list[float] = []
+        self._task: asyncio.Task[None] | None = None
+
+    async def _sample(self) -> None:
+        """Compare every wake-up against the time the sleep should have ended."""
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(time.perf_counter() - expected, 0.0) * 1000.0)
+
+    def start(self) -> None:
+        """Start sampling on the running loop."""
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._sample())
+
+    async def stop(self) -> None:
+        """Stop sampling; the samples of every round are kept."""
+        task, self._task = self._task, None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    def statistics(self, median_latency_ms: float | None, unreliable_fraction: float, gc_frozen: bool) -> LoopLagStatistics | None:
+        """Summarize the lag and flag the run when it rivals the measured latency."""
+        if not self.samples:
+            return None
+        lag = LatencySummary.from_values(self.samples)
+        return LoopLagStatistics(
+            interval_ms=self.interval * 1000.0,
+            lag=lag,
+            max_ms=max(self.samples),
+            gc_frozen=gc_frozen,
+            unreliable=(
+                median_latency_ms is not None
+                and lag.p95_ms > LOOP_LAG_NOISE_FLOOR_MS
+                and lag.p95_ms > median_latency_ms * unreliable_fraction
+            ),
+        )
+
+
+class _RetransmissionTimer:
+    """RFC 6298 retransmission timer driven by the answers of one resolver.
+
+    Until the first answer the RTO is the fixed budget. Every answer updates
+    SRTT and RTTVAR, and every expiry doubles the RTO, always clamped between the
+    configured floor and the fixed budget.
+    """
+
+    # Gains and variance multiplier from RFC 6298, section 2.
+    alpha = 1.0 / 8.0
+    beta = 1.0 / 4.0
+    k = 4.0
+
+    def __init__(self, min_rto: float, max_rto: float) -> None:
+        self.min_rto = min(min_rto, max_rto)
+        self.max_rto = max_rto
+        self.srtt: float | None = None
+        self.rttvar: float | None = None
+        self.rto = max_rto
+        self.samples = 0
+        self.backoffs = 0
+        self.retransmissions = 0
+
+    def back_off(self, expired_rto: float) -> None:
+        """Double the RTO after it expired once."""
+        # Doubling from the RTO that expired means concurrent expiries back off only once.
+        if self.rto < min(expired_rto * 2.0, self.max_rto):
+            self.backoffs += 1
+            self.rto = min(expired_rto * 2.0, self.max_rto)
+
+    def record(self, measurement: QueryMeasurement, timeout: float) -> None:
+        """Feed an answer into the smoothed estimates, or back off after a timeout."""
+        if measurement.latency_ms is None:
+            if measurement.error and "Timeout" in measurement.error:
+                self.back_off(timeout)
+            return
+
+        rtt = measurement.latency_ms / 1000.0
+        if self.srtt is None or self.rttvar is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2.0
+        else:
+            self.rttvar = (1.0 - self.beta) * self.rttvar + self.beta * abs(self.srtt - rtt)
+            self.srtt = (1.0 - self.alpha) * self.srtt + self.alpha * rtt
+        self.samples += 1
+        self.rto = min(max(self.srtt + self.k * self.rttvar, self.min_rto), self.max_rto)
+
+    def statistics(self) -> AdaptiveTimeoutStatistics:
+        """Export the timer state in milliseconds."""
+        return AdaptiveTimeoutStatistics(
+            min_rto_ms=self.min_rto * 1000.0,
+            max_rto_ms=self.max_rto * 1000.0,
+            samples=self.samples,
+            backoffs=self.backoffs,
+            srtt_ms=self.srtt * 1000.0 if self.srtt is not None else None,
+            rttvar_ms=self.rttvar * 1000.0 if self.rttvar is not None else None,
+            rto_ms=self.rto * 1000.0,
+            retransmissions=self.retransmissions,
+        )
+
+
+class _SimulatedClock:
+    """Manually advanced clock that lets the cache simulation skip real waiting."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
 class Do53Worker:
-    """Worker that issues classic UDP DNS queries."""
+    """Worker that issues classic UDP DNS queries.
+
+    With ``kernel_timestamps`` on Linux, the worker keeps one connected UDP
+    socket with ``SO_TIMESTAMPNS`` enabled. Each answer is then also timed from
+    the moment ``send`` returned to the moment the kernel received the datagram,
+    which leaves out however long the event loop took to run the reader.
+    """
 
     def __init__(self, endpoint: ResolverEndpoint, options: BenchmarkOptions):
         self.endpoint = endpoint
         self.options = options
-
-    async def query(self, domain: str) -> QueryMeasurement:
+        self.kernel_timestamps = options.kernel_timestamps and SO_TIMESTAMPNS is not None
+        self._socket: socket.socket | None = None
+        # Answers still awaited on the pooled socket, keyed by DNS message ID.
+        self._pending: dict[int, asyncio.Future[tuple[bytes, int | None]]] = {}
+
+    def _open_socket(self) -> socket.socket:
+        """Open the pooled timestamping socket and start reading from it."""
+        if self._socket is not None:
+            return self._socket
+        family, _type, _proto, _name, address = socket.getaddrinfo(self.endpoint.target, 53, type=socket.SOCK_DGRAM)[0]
+        udp_socket = socket.socket(family, socket.SOCK_DGRAM)
+        udp_socket.setblocking(False)
+        udp_socket.setsockopt(socket.SOL_SOCKET, SO_TIMESTAMPNS, 1)
+        udp_socket.connect(address)
+        asyncio.get_running_loop().add_reader(udp_socket.fileno(), self._read_datagrams)
+        self._socket = udp_socket
+        return udp_socket
+
+    def _read_datagrams(self) -> None:
+        """Drain the socket and hand each answer with its kernel timestamp to the query waiting for it."""
+        assert self._socket is not None
+        while True:
+            try:
+                wire, ancillary, _flags, _address = self._socket.recvmsg(MAX_DNS_MESSAGE_SIZE, socket.CMSG_SPACE(16))
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                # ICMP errors surface here on connected sockets; the waiting query runs into its timeout.
+                return
+            received_ns = None
+            for level, kind, data in ancillary:
+                if level == socket.SOL_SOCKET and kind == SO_TIMESTAMPNS:
+                    seconds, nanoseconds = struct.unpack("@ll", data[: struct.calcsize("@ll")])
+                    received_ns = seconds * 1_000_000_000 + nanoseconds
+            if len(wire) < 2:
+                continue
+            waiter = self._pending.pop(int.from_bytes(wire[:2], "big"), None)
+            if waiter is not None and not waiter.done():
+                waiter.set_result((wire, received_ns))
+
+    async def _timestamped_exchange(
+        self,
+        query: dns.message.QueryMessage,
+        timeout: float,
+    ) -> tuple[dns.message.Message, float | None]:
+        """Send one query on the pooled socket and return the answer with its kernel round trip."""
+        udp_socket = self._open_socket()
+        waiter: asyncio.Future[tuple[bytes, int | None]] = asyncio.get_running_loop().create_future()
+        self._pending[query.id] = waiter
+        try:
+            udp_socket.send(query.to_wire())
+            # The kernel stamps with the realtime clock, so the send side must use it as well.
+            sent_ns = time.clock_gettime_ns(time.CLOCK_REALTIME)
+            wire, received_ns = await asyncio.wait_for(waiter, timeout=timeout)
+        finally:
+            self._pending.pop(query.id, None)
+        response = dns.message.from_wire(wire)
+        if not query.is_response(response):
+            raise dns.query.BadResponse
+        if response.flags & dns.flags.TC:
+            # A truncated answer is retried over TCP like udp_with_fallback does, without a kernel time.
+            response = await dns.asyncquery.tcp(query, self.endpoint.target, timeout=timeout, port=53)
+            return response, None
+        kernel_rtt_ms = (received_ns - sent_ns) / 1_000_000.0 if received_ns is not None else None
+        return response, kernel_rtt_ms
+
+    async def query(self, domain: str, timeout: float | None = None) -> QueryMeasurement:
         """Resolve one domain over UDP and record the latency."""
-        query = _build_query(domain, self.options.query_type)
+        query = _build_query(domain, self.options.query_type, self.options.site_identification)
+        timeout = self.options.timeout_seconds if timeout is None else timeout
+        kernel_rtt_ms = None
         started = time.perf_counter()
         try:
-            response, _used_tcp = await dns.asyncquery.udp_with_fallback(
-                query,
-                self.endpoint.target,
-                timeout=self.options.timeout_seconds,
-                port=53,
-            )
+            if self.kernel_timestamps:
+                response, kernel_rtt_ms = await self._timestamped_exchange(query, timeout)
+            else:
+                response, _used_tcp = await dns.asyncquery.udp_with_fallback(
+                    query,
+                    self.endpoint.target,
+                    timeout=timeout,
+                    port=53,
+                )
         except Exception as error:
             return QueryMeasurement(domain=domain, success=False, error=_safe_error(error))
 
         latency_ms = (time.perf_counter() - started) * 1000.0
+        # UDP has no connection to set up, so the whole round trip is one phase.
+        phases = {"exchange": latency_ms}
         if response.rcode() != dns.rcode.NOERROR:
             return QueryMeasurement(
                 domain=domain,
@@ -321,22 +1589,43 @@ class Do53Worker:
                 latency_ms=latency_ms,
                 error=dns.rcode.to_text(response.rcode()),
                 response_wire=response.to_wire(),
+                phases=phases,
+                kernel_rtt_ms=kernel_rtt_ms,
             )
         return QueryMeasurement(
             domain=domain,
             success=True,
             latency_ms=latency_ms,
             response_wire=response.to_wire(),
+            phases=phases,
+            kernel_rtt_ms=kernel_rtt_ms,
         )
 
     async def close(self) -> None:
-        """No persistent state is kept for classic UDP."""
+        """Close the pooled timestamping socket, if one was opened."""
+        udp_socket = self._socket
+        self._socket = None
+        if udp_socket is None:
+            return
+        asyncio.get_running_loop().remove_reader(udp_socket.fileno())
+        udp_socket.close()
+
+
+class _SiteProbeSupport:
+    """Whether a resolver answers the id.server probe, shared by every connection of one run.
+
+    A server that drops CHAOS queries drops them on every connection, so once one
+    connection sees the probe fail, the others stop spending a timeout on it.
+    """
+
+    def __init__(self) -> None:
+        self.supported = True
 
 
 class DoTWorker:
     """Worker that reuses a single TLS connection for sequential DoT queries."""
 
-    def __init__(self, endpoint: ResolverEndpoint, options: BenchmarkOptions):
+    def __init__(self, endpoint: ResolverEndpoint, options: BenchmarkOptions, site_probe: _SiteProbeSupport | None = None):
         self.endpoint = endpoint
         self.options = options
         self.connect_address = endpoint.bootstrap_address or endpoint.target
@@ -344,42 +1633,121 @@ class DoTWorker:
         self.reader: asyncio.StreamReader | None = None
         self.writer: asyncio.StreamWriter | None = None
         self.connection_setup_ms: float | None = None
+        # Site reported by id.server on the current connection.
+        self.site: str | None = None
+        self.site_probe = site_probe or _SiteProbeSupport()
+        # Setup phases of a connection opened on the way to a query, reported with that query only.
+        self._pending_phases: dict[str, float] = {}
+        self.counters = TransportCounters()
+        self._connected_once = False
 
     async def _connect(self) -> None:
-        """Open the TLS stream once and keep it for subsequent queries."""
-        if self.writer is not None and not self.writer.is_closing():
-            return
-
+        """Open the TLS stream once and keep it for subsequent queries.
+
+        With site identification, each new stream is asked for id.server first.
+        A failed probe leaves the stream unusable, so it is reopened once without
+        the probe, which is then skipped for the rest of the run.
+        """
+        while self.writer is None or self.writer.is_closing():
+            await self._open_stream()
+            if not (self.options.site_identification and self.site_probe.supported):
+                return
+            try:
+                self.site = _probe_site(dns.message.from_wire(await self._exchange(_site_probe_query(), self.options.timeout_seconds)))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.site_probe.supported = False
+                self._discard_stream()
+
+    async def _open_stream(self) -> None:
+        """Set up TCP and TLS in two steps so the connect and handshake times can be reported apart."""
         ssl_context = ssl.create_default_context()
         if self.server_hostname is None:
             ssl_context.check_hostname = False
 
+        phases: dict[str, float] = {}
         started = time.perf_counter()
+        host = self.connect_address
+        if not _is_ip_address(host):
+            addresses = await asyncio.wait_for(
+                asyncio.get_running_loop().getaddrinfo(host, 853, type=socket.SOCK_STREAM),
+                timeout=self.options.timeout_seconds,
+            )
+            host = addresses[0][4][0]
+            phases["bootstrap"] = (time.perf_counter() - started) * 1000.0
+        tcp_started = time.perf_counter()
         self.reader, self.writer = await asyncio.wait_for(
-            asyncio.open_connection(
-                host=self.connect_address,
-                port=853,
-                ssl=ssl_context,
-                server_hostname=self.server_hostname,
-            ),
+            asyncio.open_connection(host=host, port=853),
             timeout=self.options.timeout_seconds,
         )
-        self.connection_setup_ms = (time.perf_counter() - started) * 1000.0
+        tls_started = time.perf_counter()
+        phases["tcp_connect"] = (tls_started - tcp_started) * 1000.0
+        try:
+            await asyncio.wait_for(
+                self.writer.start_tls(ssl_context, server_hostname=self.server_hostname),
+                timeout=self.options.timeout_seconds,
+            )
+        except BaseException:
+            self._discard_stream()
+            raise
+        finished = time.perf_counter()
+        phases["tls_handshake"] = (finished - tls_started) * 1000.0
+        self.connection_setup_ms = (finished - started) * 1000.0
+        self._pending_phases = phases
+        self.counters.tls_handshakes += 1
+        if self._connected_once:
+            self.counters.reconnects += 1
+        self._connected_once = True
+        self.site = None
+
+    def _discard_stream(self) -> None:
+        """Drop a stream whose exchange was interrupted, since its next read would be out of sync."""
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = None
+        self.writer = None
 
-    async def _query_once(self, domain: str) -> QueryMeasurement:
-        """Send one DNS message over the persistent TLS stream."""
-        await self._connect()
+    async def _exchange(self, query: dns.message.QueryMessage, timeout: float, phases: dict[str, float] | None = None) -> bytes:
+        """Write one length-prefixed message to the open stream and read the reply.
+
+        When ``phases`` is given, the write, first-byte, and read times are added to it.
+        """
         assert self.reader is not None
         assert self.writer is not None
+        try:
+            started = time.perf_counter()
+            self.writer.write(query.to_wire(prepend_length=True))
+            await asyncio.wait_for(self.writer.drain(), timeout=timeout)
+            written = time.perf_counter()
+            size_data = await asyncio.wait_for(self.reader.readexactly(2), timeout=timeout)
+            first_byte_at = time.perf_counter()
+            expected_size = int.from_bytes(size_data, "big")
+            wire = await asyncio.wait_for(self.reader.readexactly(expected_size), timeout=timeout)
+            if phases is not None:
+                phases["request_write"] = (written - started) * 1000.0
+                phases["first_byte"] = (first_byte_at - written) * 1000.0
+                phases["response_complete"] = (time.perf_counter() - first_byte_at) * 1000.0
+            return wire
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            # A late reply would desynchronize the next read on this stream.
+            self._discard_stream()
+            raise
+
+    async def _query_once(self, domain: str, timeout: float) -> QueryMeasurement:
+        """Send one DNS message over the persistent TLS stream.
+
+        A reconnect is kept out of the latency, which covers only the exchange,
+        but its bootstrap, connect, and handshake times are reported as phases.
+        """
+        if self.writer is not None and not self.writer.is_closing():
+            self.counters.reused_connections += 1
+        await self._connect()
+        phases, self._pending_phases = self._pending_phases, {}
 
-        query = _build_query(domain, self.options.query_type)
-        payload = query.to_wire(prepend_length=True)
+        query = _build_query(domain, self.options.query_type, self.options.site_identification)
         started = time.perf_counter()
-        self.writer.write(payload)
-        await asyncio.wait_for(self.writer.drain(), timeout=self.options.timeout_seconds)
-        size_data = await asyncio.wait_for(self.reader.readexactly(2), timeout=self.options.timeout_seconds)
-        expected_size = int.from_bytes(size_data, "big")
-        wire = await asyncio.wait_for(self.reader.readexactly(expected_size), timeout=self.options.timeout_seconds)
+        wire = await self._exchange(query, timeout, phases)
         response = dns.message.from_wire(wire)
         latency_ms = (time.perf_counter() - started) * 1000.0
 
@@ -390,63 +1758,313 @@ class DoTWorker:
                 latency_ms=latency_ms,
                 error=dns.rcode.to_text(response.rcode()),
                 response_wire=wire,
+                phases=phases,
             )
         return QueryMeasurement(
             domain=domain,
             success=True,
             latency_ms=latency_ms,
             response_wire=wire,
+            phases=phases,
         )
 
-    async def query(self, domain: str) -> QueryMeasurement:
-        """Retry once with a fresh TLS socket if the persistent stream was dropped."""
+    async def query(self, domain: str, timeout: float | None = None) -> QueryMeasurement:
+        """Retry once with a fresh TLS socket if the persistent stream was dropped.
+
+        The retry is counted, its measurement carries ``attempts=2``, and its
+        latency runs from the start of the failed attempt.
+        """
+        timeout = self.options.timeout_seconds if timeout is None else timeout
+        started = time.perf_counter()
         try:
-            return await self._query_once(domain)
+            return await self._query_once(domain, timeout)
         except Exception:
             await self.close()
+            self.counters.retries += 1
+            retry_started = time.perf_counter()
             try:
-                return await self._query_once(domain)
+                measurement = await self._query_once(domain, timeout)
             except Exception as error:
-                return QueryMeasurement(domain=domain, success=False, error=_safe_error(error))
+                measurement = QueryMeasurement(domain=domain, success=False, error=_safe_error(error))
+            _time_from_first_attempt(measurement, started, retry_started)
+            measurement.attempts = 2
+            return measurement
 
     async def close(self) -> None:
         """Close the persistent TLS stream held by this worker."""
-        if self.writer is None:
+        writer = self.writer
+        self.reader = None
+        self.writer = None
+        if writer is None:
             return
-        self.writer.close()
+        writer.close()
         try:
-            await self.writer.wait_closed()
+            # A dead peer never acknowledges the TLS close, so do not let teardown hang on it.
+            await asyncio.wait_for(writer.wait_closed(), timeout=self.options.timeout_seconds)
         except Exception:
             pass
-        self.reader = None
-        self.writer = None
 
 
-class DoHClient:
-    """Shared DoH client that reuses HTTP connections across all queries."""
+class _TlsSessionCache:
+    """TLS context and most recent session shared by every cold DoT worker of a run.
 
-    def __init__(self, endpoint: ResolverEndpoint, options: BenchmarkOptions):
+    A session can only be resumed through the context that created it, so the
+    workers share one context the way a process shares its TLS client state.
+    """
+
+    def __init__(self, server_hostname: str | None) -> None:
+        self.context = ssl.create_default_context()
+        if server_hostname is None:
+            self.context.check_hostname = False
+        self.session: ssl.SSLSession | None = None
+
+
+class ColdDoTWorker:
+    """Worker that opens, uses, and closes a fresh TCP and TLS connection for every DoT query.
+
+    The exchange runs on a blocking socket in a thread, because asyncio streams
+    can neither offer a saved TLS session nor enable TCP Fast Open.
+    """
+
+    def __init__(self, endpoint: ResolverEndpoint, options: BenchmarkOptions, sessions: _TlsSessionCache):
         self.endpoint = endpoint
         self.options = options
-        self.client = httpx.AsyncClient(
-            http2=True,
-            timeout=httpx.Timeout(options.timeout_seconds),
-            headers={"accept": "application/dns-message"},
-        )
-        self.connection_setup_ms: float | None = None
-        self.http_version: str | None = None
+        self.sessions = sessions
+        self.counters = TransportCounters()
+        self.connect_address = endpoint.bootstrap_address or endpoint.target
+        self.server_hostname = endpoint.tls_hostname or (endpoint.target if _resolved_ip(endpoint.target) is None else None)
 
-    async def measure_connection_setup(self) -> None:
-        """Measure the initial TCP/TLS setup separately from the request benchmark."""
-        parsed = urlparse(self.endpoint.target)
-        host = parsed.hostname
-        if host is None:
-            return
+    def _exchange(self, domain: str, query: dns.message.QueryMessage, timeout: float) -> QueryMeasurement:
+        """Connect, handshake, and resolve one query on a blocking socket, timing every phase.
+
+        ``timeout`` bounds the whole exchange: every blocking call only gets the
+        time the earlier ones left over.
+        """
+        deadline = time.monotonic() + timeout
+        bootstrap_started = time.perf_counter()
+        family, _type, _proto, _name, address = socket.getaddrinfo(self.connect_address, 853, type=socket.SOCK_STREAM)[0]
+        bootstrap_ms = None if _is_ip_address(self.connect_address) else (time.perf_counter() - bootstrap_started) * 1000.0
+        raw_socket = socket.socket(family, socket.SOCK_STREAM)
+        raw_socket.settimeout(_remaining(deadline))
+        if self.options.tcp_fast_open and hasattr(socket, "TCP_FASTOPEN_CONNECT"):
+            # The connect returns at once and the SYN leaves with the ClientHello, so the TCP time moves into the handshake.
+            raw_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_FASTOPEN_CONNECT, 1)
+        with raw_socket:
+            started = time.perf_counter()
+            raw_socket.connect(address)
+            connected = time.perf_counter()
+            with self.sessions.context.wrap_socket(
+                raw_socket,
+                server_hostname=self.server_hostname,
+                do_handshake_on_connect=False,
+                session=self.sessions.session if self.options.tls_resumption else None,
+            ) as tls_socket:
+                tls_socket.settimeout(_remaining(deadline))
+                tls_socket.do_handshake()
+                handshaken = time.perf_counter()
+                tls_socket.settimeout(_remaining(deadline))
+                tls_socket.sendall(query.to_wire(prepend_length=True))
+                written = time.perf_counter()
+                size_data = _recv_exact(tls_socket, 2, deadline)
+                first_byte_at = time.perf_counter()
+                wire = _recv_exact(tls_socket, int.from_bytes(size_data, "big"), deadline)
+                finished = time.perf_counter()
+                resumed = tls_socket.session_reused
+                if self.options.tls_resumption:
+                    # TLS 1.3 tickets arrive after the handshake, so the session is taken once the answer is in.
+                    self.sessions.session = tls_socket.session
 
-        port = parsed.port or 443
-        ssl_context = ssl.create_default_context()
-        started = time.perf_counter()
-        reader, writer = await asyncio.wait_for(
+        response = dns.message.from_wire(wire)
+        phases = {
+            "tcp_connect": (connected - started) * 1000.0,
+            "tls_handshake": (handshaken - connected) * 1000.0,
+            "request_write": (written - handshaken) * 1000.0,
+            "first_byte": (first_byte_at - written) * 1000.0,
+            "response_complete": (finished - first_byte_at) * 1000.0,
+        }
+        if bootstrap_ms is not None:
+            phases["bootstrap"] = bootstrap_ms
+        success = response.rcode() == dns.rcode.NOERROR
+        return QueryMeasurement(
+            domain=domain,
+            success=success,
+            latency_ms=(finished - started) * 1000.0,
+            error=None if success else dns.rcode.to_text(response.rcode()),
+            response_wire=wire,
+            phases=phases,
+            tls_resumed=resumed,
+        )
+
+    async def query(self, domain: str, timeout: float | None = None) -> QueryMeasurement:
+        """Resolve one domain over a connection of its own."""
+        timeout = self.options.timeout_seconds if timeout is None else timeout
+        query = _build_query(domain, self.options.query_type, self.options.site_identification)
+        try:
+            measurement = await asyncio.to_thread(self._exchange, domain, query, timeout)
+        except Exception as error:
+            return QueryMeasurement(domain=domain, success=False, error=_safe_error(error))
+        self.counters.tls_handshakes += 1
+        return measurement
+
+    async def close(self) -> None:
+        """Every connection is closed right after its query."""
+
+
+class ColdQuicWorker:
+    """Worker that opens and closes its own QUIC connection for every DoQ or DoH3 query."""
+
+    def __init__(
+        self,
+        client_class: type[QuicClient],
+        endpoint: ResolverEndpoint,
+        options: BenchmarkOptions,
+        connect_address: str,
+        site_probe: _SiteProbeSupport | None = None,
+    ):
+        self.client_class = client_class
+        self.endpoint = endpoint
+        self.options = options
+        self.connect_address = connect_address
+        self.site_probe = site_probe or _SiteProbeSupport()
+        self.counters = TransportCounters()
+
+    async def query(self, domain: str, timeout: float | None = None) -> QueryMeasurement:
+        """Handshake, resolve one domain, and close, counting the handshake in the latency."""
+        timeout = self.options.timeout_seconds if timeout is None else timeout
+        client = self.client_class(self.endpoint, self.options, self.connect_address, self.site_probe)
+        measurement = await client.query_cold(domain, self.options.query_type, timeout)
+        self.counters.tls_handshakes += client.counters.tls_handshakes
+        return measurement
+
+    async def close(self) -> None:
+        """Every connection is closed right after its query."""
+
+
+class _DoHLane:
+    """One pooled HTTP client plus the stream budget enforced on top of it."""
+
+    def __init__(self, client: httpx.AsyncClient, max_streams: int):
+        self.client = client
+        self.streams = asyncio.Semaphore(max_streams) if max_streams > 0 else None
+        # Requests assigned to this lane, including those still waiting for a stream slot.
+        self.in_flight = 0
+        self.active_streams = 0
+        self.peak_active_streams = 0
+        self.connections_opened = 0
+
+
+class DoHClient:
+    """Shared DoH client that reuses HTTP connections across all queries.
+
+    By default one httpx pool decides how many HTTP/2 connections to open. When
+    ``doh_max_connections`` is set, each connection gets its own single-connection
+    pool ("lane") so the connection count and per-connection stream budget are
+    explicit, and queries go to the least busy lane.
+    """
+
+    def __init__(self, endpoint: ResolverEndpoint, options: BenchmarkOptions):
+        self.endpoint = endpoint
+        self.options = options
+        lane_count = options.doh_max_connections if options.doh_max_connections > 0 else 1
+        # Loaded once, so the throwaway clients of cold queries do not each read the CA bundle.
+        self._tls_context = httpx.create_ssl_context()
+        if not options.connection_reuse:
+            # Every cold query gets a single-use client with these limits; one shared client would multiplex them over HTTP/2.
+            limits = httpx.Limits(max_connections=1, max_keepalive_connections=0)
+        elif options.doh_max_connections > 0:
+            limits = httpx.Limits(
+                max_connections=1,
+                max_keepalive_connections=1,
+                keepalive_expiry=options.doh_keepalive_expiry_seconds,
+            )
+        else:
+            limits = httpx.Limits(keepalive_expiry=options.doh_keepalive_expiry_seconds)
+        self._limits = limits
+        self.lanes = [
+            _DoHLane(self._new_client(limits), options.doh_max_streams_per_connection)
+            for _ in range(lane_count)
+        ]
+        self.pool_statistics = DoHPoolStatistics(
+            max_connections=options.doh_max_connections,
+            max_streams_per_connection=options.doh_max_streams_per_connection,
+            keepalive_expiry_seconds=options.doh_keepalive_expiry_seconds,
+        )
+        self.connection_setup_ms: float | None = None
+        self.http_version: str | None = None
+        self.counters = TransportCounters()
+        self._active_streams = 0
+
+    def _new_client(self, limits: httpx.Limits) -> httpx.AsyncClient:
+        """Build one HTTP/2 capable client on the shared TLS context."""
+        return httpx.AsyncClient(
+            http2=True,
+            verify=self._tls_context,
+            timeout=httpx.Timeout(self.options.timeout_seconds),
+            limits=limits,
+            headers={"accept": "application/dns-message"},
+        )
+
+    @asynccontextmanager
+    async def _stream_slot(self) -> AsyncIterator[_DoHLane]:
+        """Reserve one stream on the least busy lane for the duration of a request."""
+        lane = min(self.lanes, key=lambda candidate: candidate.in_flight)
+        lane.in_flight += 1
+        try:
+            if lane.streams is not None:
+                await lane.streams.acquire()
+            try:
+                self._active_streams += 1
+                lane.active_streams += 1
+                self.pool_statistics.streams_opened += 1
+                self.counters.http_streams_opened += 1
+                self.pool_statistics.peak_concurrent_streams = max(self.pool_statistics.peak_concurrent_streams, self._active_streams)
+                lane.peak_active_streams = max(lane.peak_active_streams, lane.active_streams)
+                yield lane
+            finally:
+                self._active_streams -= 1
+                lane.active_streams -= 1
+                if lane.streams is not None:
+                    lane.streams.release()
+        finally:
+            lane.in_flight -= 1
+
+    async def _trace(self, event_name: str, _info: dict[str, object]) -> None:
+        """Count new connections through httpcore's request trace extension."""
+        if event_name == "connection.connect_tcp.complete":
+            self.pool_statistics.connections_opened += 1
+
+    def _count_connection(self, lane: _DoHLane, marks: dict[str, float]) -> None:
+        """Count whether a request rode a pooled connection or opened one, and whether that was a reconnect.
+
+        On a kept-alive pool, every connection after a lane's first one replaces
+        a connection that was dropped or expired.
+        """
+        if "connect_tcp.complete" not in marks:
+            self.counters.reused_connections += 1
+            return
+        if "start_tls.complete" in marks:
+            self.counters.tls_handshakes += 1
+        if self.options.connection_reuse and lane.connections_opened:
+            self.counters.reconnects += 1
+        lane.connections_opened += 1
+
+    def statistics(self) -> DoHPoolStatistics:
+        """Return the pool counters, including the per-connection peak when lanes are explicit."""
+        if self.options.doh_max_connections > 0:
+            self.pool_statistics.peak_streams_per_connection = max(lane.peak_active_streams for lane in self.lanes)
+        return self.pool_statistics
+
+    async def measure_connection_setup(self) -> None:
+        """Measure the initial TCP/TLS setup separately from the request benchmark."""
+        parsed = urlparse(self.endpoint.target)
+        host = parsed.hostname
+        if host is None:
+            return
+
+        port = parsed.port or 443
+        ssl_context = ssl.create_default_context()
+        started = time.perf_counter()
+        reader, writer = await asyncio.wait_for(
             asyncio.open_connection(host=host, port=port, ssl=ssl_context, server_hostname=host),
             timeout=self.options.timeout_seconds,
         )
@@ -458,47 +2076,81 @@ class DoHClient:
             pass
         del reader
 
-    def _request_arguments(self, query: dns.message.QueryMessage) -> tuple[str, str, dict[str, str], bytes | None]:
-        """Build a RFC 8484 compatible GET or POST request."""
-        wire = query.to_wire()
-        headers = {"accept": "application/dns-message"}
-        if self.endpoint.doh_method == "POST":
-            headers["content-type"] = "application/dns-message"
-            return "POST", self.endpoint.target, headers, wire
-
-        parsed = urlparse(self.endpoint.target)
-        query_items = dict(parse_qsl(parsed.query, keep_blank_values=True))
-        query_items["dns"] = base64.urlsafe_b64encode(wire).rstrip(b"=").decode("ascii")
-        request_url = urlunparse(parsed._replace(query=urlencode(query_items)))
-        return "GET", request_url, headers, None
-
-    async def query(self, domain: str, query_type: str) -> QueryMeasurement:
+    async def _read_payload(self, response: httpx.Response) -> bytes:
+        """Read the DNS message body with at most one copy.
+
+        Unencoded bodies are read raw. A body that arrives in one chunk, which is
+        the usual case for DNS-sized messages, is used as-is. A split body is joined
+        once into a buffer of its final size.
+        """
+        encoded = bool(response.headers.get("content-encoding"))
+        declared_size = int(response.headers["content-length"]) if "content-length" in response.headers else None
+        if declared_size is not None and declared_size > MAX_DNS_MESSAGE_SIZE:
+            raise ValueError(f"DoH body of {declared_size} bytes exceeds the DNS message limit")
+
+        chunks: list[bytes] = []
+        async for chunk in response.aiter_bytes() if encoded else response.aiter_raw():
+            chunks.append(chunk)
+        payload = chunks[0] if len(chunks) == 1 else b"".join(chunks)
+        if declared_size is not None and not encoded and len(payload) != declared_size:
+            raise ValueError(f"DoH body ended after {len(payload)} of {declared_size} bytes")
+        return payload
+
+    async def query(self, domain: str, query_type: str, timeout: float | None = None) -> QueryMeasurement:
         """Execute one DoH exchange and measure both total latency and TTFB."""
-        query = _build_query(domain, query_type)
-        method, request_url, headers, content = self._request_arguments(query)
+        query = _build_query(domain, query_type, self.options.site_identification)
+        method, request_url, headers, content = _doh_request_arguments(self.endpoint, query)
+        first_byte_at: float | None = None
+        marks: dict[str, float] = {}
+
+        async def trace(event_name: str, info: dict[str, object]) -> None:
+            """Timestamp every request phase; the response headers carry the first bytes of the answer."""
+            nonlocal first_byte_at
+            now = time.perf_counter()
+            marks.setdefault(event_name.split(".", 1)[1], now)
+            if first_byte_at is None and event_name.endswith(".receive_response_headers.complete"):
+                first_byte_at = now
+            await self._trace(event_name, info)
+
+        # A cold query's client is built before the clock starts, so only its connection counts in the latency.
+        single_use = None if self.options.connection_reuse else self._new_client(self._limits)
         started = time.perf_counter()
-
         try:
-            async with self.client.stream(method, request_url, headers=headers, content=content) as response:
+            async with self._stream_slot() as lane, (single_use or lane.client).stream(
+                method,
+                request_url,
+                headers=headers,
+                content=content,
+                timeout=httpx.Timeout(timeout) if timeout is not None else httpx.USE_CLIENT_DEFAULT,
+                extensions={"trace": trace},
+            ) as response:
+                if response.status_code in THROTTLE_HTTP_STATUSES:
+                    return QueryMeasurement(
+                        domain=domain,
+                        success=False,
+                        latency_ms=(time.perf_counter() - started) * 1000.0,
+                        http_version=response.http_version.upper().replace("/", "_"),
+                        error=f"HTTP {response.status_code}",
+                        retry_after_seconds=_retry_after_seconds(response.headers.get("retry-after")),
+                    )
                 response.raise_for_status()
                 content_type = response.headers.get("content-type", "").split(";", 1)[0].strip().lower()
                 if content_type and content_type != "application/dns-message":
                     raise ValueError(f"unexpected content-type {content_type}")
 
-                first_chunk_started: float | None = None
-                payload = bytearray()
-                async for chunk in response.aiter_bytes():
-                    if first_chunk_started is None:
-                        first_chunk_started = time.perf_counter()
-                    payload.extend(chunk)
-
+                payload = await self._read_payload(response)
                 finished = time.perf_counter()
-                ttfb_ms = ((first_chunk_started or finished) - started) * 1000.0
+                self._count_connection(lane, marks)
+                ttfb_ms = ((first_byte_at or finished) - started) * 1000.0
                 latency_ms = (finished - started) * 1000.0
-                dns_response = dns.message.from_wire(bytes(payload))
+                phases = _http_phases(marks, started, finished)
+                dns_response = dns.message.from_wire(payload)
                 self.http_version = response.http_version.upper().replace("/", "_")
         except Exception as error:
             return QueryMeasurement(domain=domain, success=False, error=_safe_error(error))
+        finally:
+            if single_use is not None:
+                await single_use.aclose()
 
         if dns_response.rcode() != dns.rcode.NOERROR:
             return QueryMeasurement(
@@ -508,7 +2160,8 @@ class DoHClient:
                 ttfb_ms=ttfb_ms,
                 http_version=self.http_version,
                 error=dns.rcode.to_text(dns_response.rcode()),
-                response_wire=bytes(payload),
+                response_wire=payload,
+                phases=phases,
             )
         return QueryMeasurement(
             domain=domain,
@@ -516,12 +2169,348 @@ class DoHClient:
             latency_ms=latency_ms,
             ttfb_ms=ttfb_ms,
             http_version=self.http_version,
-            response_wire=bytes(payload),
+            response_wire=payload,
+            phases=phases,
         )
 
     async def close(self) -> None:
-        """Dispose of the shared HTTP client and its pooled connections."""
-        await self.client.aclose()
+        """Dispose of the shared HTTP clients and their pooled connections."""
+        for lane in self.lanes:
+            await lane.client.aclose()
+
+
+# Failures that end one QUIC stream but leave the shared connection usable: timeouts and bad answers.
+QUIC_STREAM_ERRORS = (dns.exception.DNSException, TimeoutError, ValueError)
+
+
+class _QuicConnectionFailed(Exception):
+    """The shared QUIC connection failed, as opposed to one stream on it.
+
+    ``connecting`` identifies the connection attempt, so only the first of the
+    queries that saw it fail replaces it.
+    """
+
+    def __init__(self, connecting: asyncio.Future, error: Exception):
+        super().__init__(_safe_error(error))
+        self.connecting = connecting
+
+
+class _Http3StatusError(Exception):
+    """A DoH3 server answered with a status other than 200, on a stream that otherwise completed."""
+
+    def __init__(self, status: str, retry_after_seconds: float | None):
+        super().__init__(f"HTTP {status or 'none'}")
+        self.retry_after_seconds = retry_after_seconds
+
+
+class QuicClient(abc.ABC):
+    """Shared QUIC client that multiplexes every query as a stream on one QUIC connection.
+
+    QUIC streams do not block each other, so unlike DoT there is no need for one
+    connection per worker. QUIC support comes from dnspython and needs aioquic.
+    Subclasses provide the exchange that speaks DoQ or DoH3 over the connection.
+    """
+
+    # Subclasses pick the port and whether the connection speaks HTTP/3.
+    default_port = 853
+    h3 = False
+
+    def __init__(
+        self,
+        endpoint: ResolverEndpoint,
+        options: BenchmarkOptions,
+        connect_address: str,
+        site_probe: _SiteProbeSupport | None = None,
+    ):
+        self.endpoint = endpoint
+        self.options = options
+        self.connect_address = connect_address
+        self.server_hostname = self._server_hostname()
+        self.port = self._port()
+        self.manager = None
+        self.connection = None
+        self.connection_setup_ms: float | None = None
+        self.http_version: str | None = None
+        # Site reported by id.server on the current connection.
+        self.site: str | None = None
+        self.site_probe = site_probe or _SiteProbeSupport()
+        self.counters = TransportCounters()
+        self._connected_once = False
+        # Handshake of the current connection, awaited by every query that needs it.
+        self._connecting: asyncio.Future | None = None
+
+    def _server_hostname(self) -> str | None:
+        """Return the TLS name verified for the QUIC handshake."""
+        return self.endpoint.tls_hostname or (self.endpoint.target if _resolved_ip(self.endpoint.target) is None else None)
+
+    def _port(self) -> int:
+        """Return the UDP port used by the QUIC transport."""
+        return self.default_port
+
+    async def _connect(self) -> asyncio.Future:
+        """Open the QUIC connection once and wait for its handshake, returning the attempt that was awaited.
+
+        Queries that arrive during the handshake wait for the same attempt, so a
+        failed handshake fails all of them together. The attempt is shielded:
+        a cancelled query does not abort the handshake the others wait on.
+        """
+        if self._connecting is None:
+            self._connecting = asyncio.ensure_future(self._open_connection())
+            # Retrieve a failure nobody awaited any more, such as after every waiter was cancelled.
+            self._connecting.add_done_callback(lambda attempt: attempt.cancelled() or attempt.exception())
+        connecting = self._connecting
+        try:
+            await asyncio.shield(connecting)
+        except asyncio.CancelledError:
+            raise
+        except Exception as error:
+            raise _QuicConnectionFailed(connecting, error) from error
+        return connecting
+
+    async def _open_connection(self) -> None:
+        """Handshake a new QUIC connection and probe its site."""
+        if not dns.quic.have_quic:
+            raise RuntimeError(f"{self.endpoint.transport} requires the aioquic package")
+
+        self.manager = dns.quic.AsyncioQuicManager(
+            verify_mode=ssl.CERT_REQUIRED,
+            server_name=self.server_hostname,
+            h3=self.h3,
+        )
+        started = time.perf_counter()
+        self.connection = self.manager.connect(self.connect_address, self.port)
+        # Opening a stream waits for the handshake, which is what the setup metric should capture.
+        stream = await self.connection.make_stream(self.options.timeout_seconds)
+        async with stream:
+            pass
+        self.connection_setup_ms = (time.perf_counter() - started) * 1000.0
+        self.counters.tls_handshakes += 1
+        if self._connected_once and self.options.connection_reuse:
+            self.counters.reconnects += 1
+        self._connected_once = True
+        self.site = None
+        if self.options.site_identification and self.site_probe.supported:
+            try:
+                self.site = _probe_site(await self._exchange(_site_probe_query(), self.options.timeout_seconds))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Servers that drop CHAOS queries are not probed again on any connection of the run.
+                self.site_probe.supported = False
+
+    @abc.abstractmethod
+    async def _exchange(self, query: dns.message.QueryMessage, timeout: float) -> dns.message.Message:
+        """Send one DNS message over the shared connection."""
+
+    async def _query_once(self, domain: str, query_type: str, timeout: float) -> QueryMeasurement:
+        """Run one exchange on the shared QUIC connection and classify the answer.
+
+        The query that opens the connection reports its handshake as a phase,
+        outside the latency; dnspython does not expose the first byte, so the
+        round trip itself is one ``exchange`` phase.
+        """
+        opened = self._connecting is None
+        if not opened:
+            self.counters.reused_connections += 1
+        connecting = await self._connect()
+        query = _build_query(domain, query_type, self.options.site_identification)
+        started = time.perf_counter()
+        try:
+            response = await self._exchange(query, timeout)
+        except _Http3StatusError as error:
+            # Like DoH over httpx, a refused request is a timed failure that may ask the benchmark to back off.
+            return QueryMeasurement(
+                domain=domain,
+                success=False,
+                latency_ms=(time.perf_counter() - started) * 1000.0,
+                http_version=self.http_version,
+                error=str(error),
+                retry_after_seconds=error.retry_after_seconds,
+            )
+        except QUIC_STREAM_ERRORS:
+            raise
+        except Exception as error:
+            # Anything else, such as the server closing the connection, takes every stream with it.
+            raise _QuicConnectionFailed(connecting, error) from error
+        latency_ms = (time.perf_counter() - started) * 1000.0
+        wire = response.to_wire()
+        phases = {"exchange": latency_ms}
+        if opened and self.connection_setup_ms is not None:
+            phases["tls_handshake"] = self.connection_setup_ms
+
+        if response.rcode() != dns.rcode.NOERROR:
+            return QueryMeasurement(
+                domain=domain,
+                success=False,
+                latency_ms=latency_ms,
+                http_version=self.http_version,
+                error=dns.rcode.to_text(response.rcode()),
+                response_wire=wire,
+                phases=phases,
+            )
+        return QueryMeasurement(
+            domain=domain,
+            success=True,
+            latency_ms=latency_ms,
+            http_version=self.http_version,
+            response_wire=wire,
+            phases=phases,
+        )
+
+    async def query(self, domain: str, query_type: str, timeout: float | None = None) -> QueryMeasurement:
+        """Resolve one name on the shared connection, replacing the connection once if it failed.
+
+        A stream timeout or a bad answer fails only this query, since the other
+        streams on the connection are unaffected. A failed handshake or a
+        connection the server closed is replaced, and the query is retried once;
+        like DoT, a retried answer is timed from the start of the failed attempt.
+        """
+        timeout = self.options.timeout_seconds if timeout is None else timeout
+        started = time.perf_counter()
+        try:
+            return await self._query_once(domain, query_type, timeout)
+        except QUIC_STREAM_ERRORS as error:
+            return QueryMeasurement(domain=domain, success=False, error=_safe_error(error))
+        except _QuicConnectionFailed as failure:
+            await self._replace_connection(failure.connecting)
+        self.counters.retries += 1
+        retry_started = time.perf_counter()
+        try:
+            measurement = await self._query_once(domain, query_type, timeout)
+        except _QuicConnectionFailed as failure:
+            await self._replace_connection(failure.connecting)
+            measurement = QueryMeasurement(domain=domain, success=False, error=str(failure))
+        except QUIC_STREAM_ERRORS as error:
+            measurement = QueryMeasurement(domain=domain, success=False, error=_safe_error(error))
+        _time_from_first_attempt(measurement, started, retry_started)
+        measurement.attempts = 2
+        return measurement
+
+    async def query_cold(self, domain: str, query_type: str, timeout: float | None = None) -> QueryMeasurement:
+        """Handshake, resolve one domain, and close, counting the handshake in the latency.
+
+        Nothing is retried, since a retry would just be another cold query.
+        The client is closed afterwards and serves no further queries.
+        """
+        timeout = self.options.timeout_seconds if timeout is None else timeout
+        try:
+            await asyncio.wait_for(self._connect(), timeout=timeout)
+            measurement = await self._query_once(domain, query_type, timeout)
+        except Exception as error:
+            return QueryMeasurement(domain=domain, success=False, error=_safe_error(error))
+        finally:
+            await self.close()
+
+        handshake_ms = self.connection_setup_ms or 0.0
+        exchange_ms = measurement.latency_ms or 0.0
+        # QUIC folds the transport and TLS handshakes into one, and dnspython does not expose the first byte.
+        measurement.phases = {"tls_handshake": handshake_ms, "exchange": exchange_ms}
+        measurement.latency_ms = handshake_ms + exchange_ms
+        return measurement
+
+    async def _replace_connection(self, connecting: asyncio.Future) -> None:
+        """Close a failed connection, unless a query that saw the same failure already replaced it."""
+        if self._connecting is connecting:
+            await self.close()
+
+    async def close(self) -> None:
+        """Close the shared QUIC connection, giving up on a peer that does not finish the close in time."""
+        connecting, connection = self._connecting, self.connection
+        self._connecting = None
+        self.connection = None
+        self.manager = None
+        if connecting is not None and not connecting.done():
+            connecting.cancel()
+        if connection is None:
+            return
+        try:
+            await asyncio.wait_for(connection.close(), timeout=self.options.timeout_seconds)
+        except Exception:
+            pass
+
+
+class DoQClient(QuicClient):
+    """DNS over dedicated QUIC connections (RFC 9250) on UDP port 853."""
+
+    async def _exchange(self, query: dns.message.QueryMessage, timeout: float) -> dns.message.Message:
+        """Send one query on its own QUIC stream."""
+        return await dns.asyncquery.quic(
+            query,
+            self.connect_address,
+            timeout=timeout,
+            port=self.port,
+            connection=self.connection,
+            server_hostname=self.server_hostname,
+        )
+
+
+class DoH3Client(QuicClient):
+    """DNS over HTTPS carried on HTTP/3 over QUIC."""
+
+    default_port = 443
+    h3 = True
+
+    def __init__(
+        self,
+        endpoint: ResolverEndpoint,
+        options: BenchmarkOptions,
+        connect_address: str,
+        site_probe: _SiteProbeSupport | None = None,
+    ):
+        super().__init__(endpoint, options, connect_address, site_probe)
+        self.http_version = "HTTP_3"
+
+    def _server_hostname(self) -> str | None:
+        """HTTP/3 verifies the host named in the DoH URL."""
+        return urlparse(self.endpoint.target).hostname
+
+    def _port(self) -> int:
+        """Honor an explicit port in the DoH URL."""
+        return urlparse(self.endpoint.target).port or self.default_port
+
+
+    async def _exchange(self, query: dns.message.QueryMessage, timeout: float) -> dns.message.Message:
+        """Send one RFC 8484 request on its own HTTP/3 stream.
+
+        dnspython's HTTP/3 query queues the request without waking the
+        connection's sender, so on a reused connection it waits for the next
+        QUIC timer and often outlives the timeout. The stream is driven here
+        instead: headers and body go out without FIN, and the final empty
+        write ends the stream and wakes the sender.
+        """
+        deadline = time.monotonic() + timeout
+        # RFC 8484 asks for ID 0 so HTTP caches can match identical queries.
+        query.id = 0
+        method, request_url, headers, content = _doh_request_arguments(self.endpoint, query)
+        if content is not None:
+            headers["content-length"] = str(len(content))
+        parsed = urlparse(request_url)
+        path = parsed.path + (f"?{parsed.query}" if parsed.query else "")
+        stream = await self.connection.make_stream(timeout)
+        async with stream:
+            self.connection.send_headers(
+                stream.id(),
+                [
+                    (b":method", method.encode()),
+                    (b":scheme", parsed.scheme.encode()),
+                    (b":authority", parsed.netloc.encode()),
+                    (b":path", path.encode()),
+                    *((name.encode(), value.encode()) for name, value in headers.items()),
+                ],
+            )
+            if content is not None:
+                self.connection.send_data(stream.id(), content)
+            await self.connection.write(stream.id(), b"", True)
+            wire = await stream.receive(max(deadline - time.monotonic(), 0.0))
+            response_headers = dict(stream.headers() or [])
+        status = response_headers.get(b":status", b"").decode()
+        if status != "200":
+            retry_after = response_headers.get(b"retry-after")
+            raise _Http3StatusError(status, _retry_after_seconds(retry_after.decode() if retry_after else None))
+        response = dns.message.from_wire(wire)
+        if not query.is_response(response):
+            raise dns.query.BadResponse
+        return response
 
 
 class BenchmarkRunner:
@@ -533,17 +2522,59 @@ class BenchmarkRunner:
         domains: list[str],
         options: BenchmarkOptions,
         progress_callback: ProgressCallback | None = None,
+        cancellation: BenchmarkCancellation | None = None,
     ):
         self.endpoint = endpoint
         self.domains = domains
         self.options = options
         self.progress_callback = progress_callback
-        self.cache = ResponseCache(options.cache_enabled)
+        # Checked between queries too, because a cancel that lands inside a resolver's wait_for can be swallowed.
+        self.cancellation = cancellation
+        self.cache = ResponseCache(
+            options.cache_enabled,
+            max_entries=options.cache_max_entries,
+            max_bytes=options.cache_max_bytes,
+        )
         self.doh_client = DoHClient(endpoint, options) if endpoint.transport == "DoH" else None
+        # QUIC clients need a resolved address, so they are created during preflight.
+        self.quic_client: QuicClient | None = None
         self.resolved_target = endpoint.bootstrap_address
         self._doh_preflight_http_version: str | None = None
         self._dot_connection_setup_ms: float | None = None
+        # Shared by the cold DoT workers so later connections can resume the TLS session.
+        self._tls_sessions: _TlsSessionCache | None = None
+        # One verdict on id.server support for every connection the run opens.
+        self._site_probe = _SiteProbeSupport()
         self._workers: list[object] = []
+        # Measured-phase slots are kept on the runner so a cancelled run can still report them.
+        self._measurements: list[QueryMeasurement | None] = [None] * len(domains)
+        # Index of the first domain the measured phase has not reached yet.
+        self._next_domain = 0
+        # Network answers per domain feed the client-cache simulation after the measured phase.
+        self._upstream_samples: dict[str, list[QueryMeasurement]] = {}
+        self._cache_simulation: CacheSimulationResult | None = None
+        self._cache_busting: CacheBustingResult | None = None
+        self._upstream_cache: UpstreamCacheAnalysis | None = None
+        self._concurrency_sweep: ConcurrencySweep | None = None
+        # TTL observations per name as (monotonic time, TTL) pairs for the upstream cache analysis.
+        self._ttl_observations: dict[str, list[tuple[float, int]]] = {}
+        self._circuit_breaker = _CircuitBreaker(
+            options.circuit_breaker,
+            options.circuit_breaker_window,
+            options.circuit_breaker_error_rate,
+        )
+        self._rto = _RetransmissionTimer(options.min_rto_seconds, options.timeout_seconds) if options.adaptive_timeout else None
+        self._throttle = _ThrottleController(options.throttle_backoff, options.concurrency)
+        # Hedges go out on a second pool of workers so a slow connection is not asked twice.
+        self._hedge_workers: list[object] = []
+        self._hedge_statistics = HedgeStatistics(percentile=options.hedge_percentile) if options.hedged_queries else None
+        # Latencies each query would have had without a hedge; they also drive the hedge delay.
+        self._unhedged_latencies: list[float] = []
+        # Connection events of the measured phase only; warm-up and follow-up passes are left out.
+        self._transport_counters: TransportCounters | None = None
+        self._loop_lag = _LoopLagMonitor() if options.loop_lag_monitor else None
+        profiler = MeasuredPhaseProfiler(options.profile_mode, options.profile_allocations)
+        self._profiler = profiler if profiler.enabled else None
 
     def _progress(self, phase: str, current: int, total: int, detail: str) -> None:
         """Forward progress to the UI when a callback was provided."""
@@ -583,6 +2614,7 @@ class BenchmarkRunner:
                         tls_hostname=self.endpoint.tls_hostname or self.endpoint.target,
                     ),
                     self.options,
+                    self._site_probe,
                 )
                 try:
                     measurement = await worker.query(".")
@@ -593,6 +2625,22 @@ class BenchmarkRunner:
                         # Reuse the same setup value in the final summary.
                         self._dot_connection_setup_ms = worker.connection_setup_ms
                     await worker.close()
+            elif self.endpoint.transport in ("DoQ", "DoH3"):
+                if self.endpoint.transport == "DoQ":
+                    host, port, client_class = self.endpoint.target, 853, DoQClient
+                else:
+                    parsed = urlparse(self.endpoint.target)
+                    host, port, client_class = parsed.hostname or "", parsed.port or 443, DoH3Client
+                self.resolved_target = self.endpoint.bootstrap_address or _resolve_target_address(
+                    host,
+                    port,
+                    socket.SOCK_DGRAM,
+                )
+                self.quic_client = client_class(self.endpoint, self.options, self.resolved_target, self._site_probe)
+                measurement = await self.quic_client.query(".", "NS")
+                if not measurement.success:
+                    raise RuntimeError(measurement.error or "preflight failed")
+                self._doh_preflight_http_version = measurement.http_version
             else:
                 assert self.doh_client is not None
                 await self.doh_client.measure_connection_setup()
@@ -617,24 +2665,198 @@ class BenchmarkRunner:
                 self.options,
             )
         if self.endpoint.transport == "DoT":
-            return DoTWorker(
-                ResolverEndpoint(
-                    name=self.endpoint.name,
-                    transport="DoT",
-                    target=self.resolved_target or self.endpoint.target,
-                    tls_hostname=self.endpoint.tls_hostname or self.endpoint.target,
-                ),
-                self.options,
+            endpoint = ResolverEndpoint(
+                name=self.endpoint.name,
+                transport="DoT",
+                target=self.resolved_target or self.endpoint.target,
+                tls_hostname=self.endpoint.tls_hostname or self.endpoint.target,
             )
+            if not self.options.connection_reuse:
+                if self._tls_sessions is None:
+                    self._tls_sessions = _TlsSessionCache(endpoint.tls_hostname)
+                return ColdDoTWorker(endpoint, self.options, self._tls_sessions)
+            return DoTWorker(endpoint, self.options, self._site_probe)
+        if self.quic_client is not None:
+            if not self.options.connection_reuse:
+                return ColdQuicWorker(
+                    type(self.quic_client),
+                    self.endpoint,
+                    self.options,
+                    self.quic_client.connect_address,
+                    self._site_probe,
+                )
+            return self.quic_client
         assert self.doh_client is not None
         return self.doh_client
 
+    async def _query_worker(self, worker, domain: str, timeout: float | None = None) -> QueryMeasurement:
+        """Dispatch one query, passing the query type to the shared multiplexing clients.
+
+        With the adaptive timeout, UDP queries are resent whenever the RTO
+        expires. Stream transports retransmit below DNS on their own, so their
+        queries only feed the timer. Every query fails only once the fixed
+        budget is spent.
+        """
+        timeout = min(timeout, self.options.timeout_seconds) if timeout is not None else self.options.timeout_seconds
+        if self._rto is not None and isinstance(worker, Do53Worker):
+            # Feeds the timer itself, one sample per answered send.
+            measurement = await self._retransmitted_query(worker, domain, timeout)
+        else:
+            if isinstance(worker, (DoHClient, QuicClient)):
+                measurement = await worker.query(domain, self.options.query_type, timeout=timeout)
+            else:
+                measurement = await worker.query(domain, timeout=timeout)
+            # A retried exchange mixes two attempts, so its latency is no RTT sample (Karn's algorithm).
+            if self._rto is not None and measurement.attempts == 1:
+                self._rto.record(measurement, timeout)
+        if self.options.site_identification:
+            measurement.site = _response_site(measurement.response_wire) if measurement.response_wire is not None else None
+            if measurement.site is None and isinstance(worker, (DoTWorker, QuicClient)):
+                measurement.site = worker.site
+        return measurement
+
+    async def _retransmitted_query(self, worker: Do53Worker, domain: str, budget: float) -> QueryMeasurement:
+        """Resend a UDP query each time the RTO expires, giving up only when ``budget`` is spent.
+
+        Every resend is a new query with its own ID, so the first answer is an
+        unambiguous RTT sample for the send that produced it. The measurement
+        itself is timed from the first send, like a stub resolver would see it.
+        """
+        assert self._rto is not None
+        started = time.perf_counter()
+        deadline = time.monotonic() + budget
+        sends: list[tuple[float, asyncio.Task[QueryMeasurement]]] = []
+
+        def first_answer() -> tuple[float, QueryMeasurement] | None:
+            """Return the earliest finished send that got an answer, with the time it was sent."""
+            return next(
+                ((sent_at, task.result()) for sent_at, task in sends if task.done() and task.result().latency_ms is not None),
+                None,
+            )
+
+        try:
+            while True:
+                rto = self._rto.rto
+                expires_at = min(time.monotonic() + rto, deadline)
+                sends.append((time.perf_counter(), asyncio.ensure_future(worker.query(domain, timeout=deadline - time.monotonic()))))
+                while True:
+                    answered = first_answer()
+                    pending = [task for _sent_at, task in sends if not task.done()]
+                    if answered is not None or not pending or time.monotonic() >= expires_at:
+                        break
+                    await asyncio.wait(pending, timeout=expires_at - time.monotonic(), return_when=asyncio.FIRST_COMPLETED)
+                if answered is None and pending and time.monotonic() >= deadline:
+                    # The sends still out share the deadline, so they finish right away.
+                    await asyncio.wait(pending)
+                    answered = first_answer()
+                if answered is not None:
+                    sent_at, measurement = answered
+                    self._rto.record(measurement, rto)
+                    measurement.latency_ms += (sent_at - started) * 1000.0
+                    measurement.phases = {"exchange": measurement.latency_ms}
+                    break
+                if not pending or time.monotonic() >= deadline:
+                    # Every send failed outright, or the budget is spent: report the first send's error.
+                    measurement = sends[0][1].result()
+                    break
+                self._rto.back_off(rto)
+                self._rto.retransmissions += 1
+        finally:
+            for _sent_at, task in sends:
+                task.cancel()
+        measurement.attempts = len(sends)
+        return measurement
+
+    def _hedge_delay(self) -> float | None:
+        """Return how long a query may run before it is hedged, or None while too few answers are known."""
+        if len(self._unhedged_latencies) < DEFAULT_HEDGE_MIN_SAMPLES:
+            return None
+        delay = percentile(self._unhedged_latencies, self.options.hedge_percentile) / 1000.0
+        # A hedge is a retransmission on another worker, so it is due by the RTO at the latest.
+        return min(delay, self._rto.rto) if self._rto is not None else delay
+
+    async def _hedged_query(self, worker_index: int, domain: str) -> QueryMeasurement:
+        """Send a duplicate on the paired hedge worker once the primary outlives the hedge delay.
+
+        The first successful answer wins. Both exchanges are awaited anyway so the
+        latency the primary alone would have shown is known for the report.
+        """
+        assert self._hedge_statistics is not None
+        hedges = self._hedge_statistics
+        hedges.queries += 1
+        delay = self._hedge_delay()
+        primary_timeout = self.options.timeout_seconds
+        started = time.perf_counter()
+        primary = asyncio.ensure_future(self._query_worker(self._workers[worker_index], domain))
+        hedge: asyncio.Future[QueryMeasurement] | None = None
+        try:
+            if delay is not None:
+                await asyncio.wait({primary}, timeout=delay)
+            if delay is None or primary.done():
+                measurement = await primary
+                if measurement.success and measurement.latency_ms is not None:
+                    self._unhedged_latencies.append(measurement.latency_ms)
+                return measurement
+
+            hedges.hedged_queries += 1
+            hedge_offset_ms = (time.perf_counter() - started) * 1000.0
+            hedge = asyncio.ensure_future(self._query_worker(self._hedge_workers[worker_index], domain))
+            primary_measurement, hedge_measurement = await asyncio.gather(primary, hedge)
+        except asyncio.CancelledError:
+            primary.cancel()
+            if hedge is not None:
+                hedge.cancel()
+            raise
+
+        primary_cost_ms = primary_measurement.latency_ms
+        if primary_cost_ms is None:
+            # A primary that never answered would have cost the whole timeout.
+            primary_cost_ms = primary_timeout * 1000.0
+        elif primary_measurement.success:
+            self._unhedged_latencies.append(primary_cost_ms)
+
+        if hedge_measurement.success and hedge_measurement.latency_ms is not None:
+            hedge_cost_ms = hedge_offset_ms + hedge_measurement.latency_ms
+            if not primary_measurement.success or hedge_cost_ms < primary_cost_ms:
+                hedges.hedge_wins += 1
+                hedges.latency_saved_ms += primary_cost_ms - hedge_cost_ms
+                hedge_measurement.latency_ms = hedge_cost_ms
+                if hedge_measurement.ttfb_ms is not None:
+                    hedge_measurement.ttfb_ms += hedge_offset_ms
+                hedge_measurement.hedged = True
+                return hedge_measurement
+        primary_measurement.hedged = True
+        return primary_measurement
+
+    def _connection_setup_ms(self) -> float | None:
+        """Return the setup time measured for the transport in use."""
+        if self._dot_connection_setup_ms is not None:
+            return self._dot_connection_setup_ms
+        if self.quic_client is not None:
+            return self.quic_client.connection_setup_ms
+        return self.doh_client.connection_setup_ms if self.doh_client else None
+
+    def _drain_transport_counters(self) -> TransportCounters | None:
+        """Sum and reset the counters of every distinct worker, or return None when no worker keeps any."""
+        # The shared DoH and QUIC clients appear once per worker slot but must be counted once.
+        workers = {id(worker): worker for worker in self._workers + self._hedge_workers if hasattr(worker, "counters")}
+        if not workers:
+            return None
+        total = TransportCounters()
+        for worker in workers.values():
+            total.merge(worker.counters)
+            worker.counters = TransportCounters()
+        return total
+
     async def _ensure_workers(self) -> None:
         """Create the worker pool once so warm-up and measurement share the same transport state."""
         if self._workers:
             return
         worker_count = min(self.options.concurrency, max(len(self.domains), 1))
         self._workers = [await self._make_worker() for _ in range(worker_count)]
+        if self.options.hedged_queries:
+            # Shared DoH and QUIC clients hand the hedge a different stream or pooled connection on their own.
+            self._hedge_workers = [await self._make_worker() for _ in range(worker_count)]
 
     async def _warm_connections(self) -> None:
         """Warm up TLS sessions and HTTP pools without contaminating measured metrics."""
@@ -642,11 +2864,20 @@ class BenchmarkRunner:
             return
 
         await self._ensure_workers()
-        for index in range(self.options.warmup_queries):
-            domain = self.domains[index % len(self.domains)]
-            worker = self._workers[index % len(self._workers)]
-            self._progress("warmup", index + 1, self.options.warmup_queries, domain)
-            await worker.query(domain, self.options.query_type) if isinstance(worker, DoHClient) else await worker.query(domain)
+        # Hedge workers get the same warm-up, or every hedge would pay the handshake the primary skipped.
+        pools = [self._workers]
+        hedge_only = [worker for worker in self._hedge_workers if all(worker is not primary for primary in self._workers)]
+        if hedge_only:
+            pools.append(hedge_only)
+        total = self.options.warmup_queries * len(pools)
+        for pool_index, pool in enumerate(pools):
+            for index in range(self.options.warmup_queries):
+                domain = self.domains[index % len(self.domains)]
+                worker = pool[index % len(pool)]
+                if self.cancel_requested:
+                    return
+                self._progress("warmup", pool_index * self.options.warmup_queries + index + 1, total, domain)
+                await self._query_worker(worker, domain)
 
     async def _prime_cache(self) -> None:
         """Populate the cache with one uncaptured pass so warm runs measure cache hits only."""
@@ -662,14 +2893,16 @@ class BenchmarkRunner:
         async def cache_worker(worker_index: int) -> None:
             """Prime the cache with network responses before the warm measurement."""
             worker = self._workers[worker_index]
-            while True:
+            while not self.cancel_requested:
                 try:
                     domain = queue.get_nowait()
                 except asyncio.QueueEmpty:
                     return
                 self._progress("cache", worker_index + 1, worker_count, domain)
-                measurement = await worker.query(domain, self.options.query_type) if isinstance(worker, DoHClient) else await worker.query(domain)
-                if measurement.success and measurement.response_wire is not None:
+                measurement = await self._query_worker(worker, domain)
+                self._upstream_samples.setdefault(domain, []).append(measurement)
+                # NXDOMAIN answers are failures for the benchmark but still belong in a negative cache.
+                if measurement.response_wire is not None:
                     await self.cache.put(
                         domain,
                         self.options.query_type,
@@ -679,20 +2912,29 @@ class BenchmarkRunner:
 
         await asyncio.gather(*(cache_worker(index) for index in range(worker_count)))
 
-    async def _measure(self) -> list[QueryMeasurement]:
-        """Run the measured phase with bounded concurrency."""
+    async def _measure(self, stop: int) -> None:
+        """Measure the domains up to ``stop`` that earlier rounds have not reached, with bounded concurrency."""
         await self._ensure_workers()
+        # Whatever the workers counted before this round belongs to warm-up or a scheduler's own queries.
+        self._drain_transport_counters()
         worker_count = len(self._workers)
         queue: asyncio.Queue[tuple[int, str]] = asyncio.Queue()
-        for index, domain in enumerate(self.domains):
-            queue.put_nowait((index, domain))
+        for index in range(self._next_domain, stop):
+            queue.put_nowait((index, self.domains[index]))
+        self._next_domain = stop
 
-        measurements: list[QueryMeasurement | None] = [None] * len(self.domains)
+        measurements = self._measurements
+        breaker = self._circuit_breaker
+        throttle = self._throttle
+        # Throttled queries go back to the queue once so a self-inflicted limit does not count as a failure.
+        requeued: set[int] = set()
 
         async def measure_worker(worker_index: int) -> None:
             """Execute benchmarked queries while reusing the worker transport state."""
             worker = self._workers[worker_index]
             while True:
+                if self.cancel_requested:
+                    return
                 try:
                     index, domain = queue.get_nowait()
                 except asyncio.QueueEmpty:
@@ -703,68 +2945,343 @@ class BenchmarkRunner:
                     measurements[index] = cached
                     queue.task_done()
                     continue
+                if breaker.is_open:
+                    # Fast-fail the rest of the queue instead of paying a timeout per domain.
+                    measurements[index] = QueryMeasurement(domain=domain, success=False, error="circuit open")
+                    queue.task_done()
+                    continue
 
-                measurement = await worker.query(domain, self.options.query_type) if isinstance(worker, DoHClient) else await worker.query(domain)
+                await throttle.acquire()
+                if self._hedge_statistics is not None:
+                    measurement = await self._hedged_query(worker_index, domain)
+                else:
+                    measurement = await self._query_worker(worker, domain)
+                measurement.throttle_signal = await throttle.release(measurement)
+                if measurement.throttle_signal is not None and index not in requeued:
+                    requeued.add(index)
+                    throttle.statistics.requeued_queries += 1
+                    queue.put_nowait((index, domain))
+                    queue.task_done()
+                    continue
+                breaker.record(measurement)
+                self._observe_ttl(measurement)
+                self._upstream_samples.setdefault(domain, []).append(measurement)
+                # Misses refill the cache the way a stub cache would after going upstream.
+                if self.cache.enabled and measurement.response_wire is not None:
+                    await self.cache.put(
+                        domain,
+                        self.options.query_type,
+                        dns.message.from_wire(measurement.response_wire),
+                    )
                 measurements[index] = measurement
                 queue.task_done()
 
-        await asyncio.gather(*(measure_worker(index) for index in range(worker_count)))
-        return [measurement for measurement in measurements if measurement is not None]
+        if self._loop_lag is not None:
+            self._loop_lag.start()
+        if self._profiler is not None:
+            self._profiler.start()
+        throttle.start_round()
+        try:
+            await asyncio.gather(*(measure_worker(index) for index in range(worker_count)))
+        finally:
+            throttle.end_round()
+            if self._profiler is not None:
+                self._profiler.stop()
+            if self._loop_lag is not None:
+                await self._loop_lag.stop()
+            counters = self._drain_transport_counters()
+            if counters is not None:
+                if self._transport_counters is None:
+                    self._transport_counters = TransportCounters()
+                self._transport_counters.merge(counters)
+
+    def _observe_ttl(self, measurement: QueryMeasurement) -> None:
+        """Record the answer TTL of a network response for the upstream cache analysis."""
+        if not self.options.ttl_analysis or measurement.from_cache or not measurement.success:
+            return
+        if measurement.response_wire is None:
+            return
+        measurement.answer_ttl = _answer_ttl(measurement.response_wire)
+        if measurement.answer_ttl is not None:
+            self._ttl_observations.setdefault(measurement.domain, []).append((time.monotonic(), measurement.answer_ttl))
 
-    async def run(self) -> BenchmarkResult:
-        """Execute the full benchmark lifecycle and return the structured result."""
-        preflight_error = await self._preflight()
-        if preflight_error:
-            return BenchmarkResult(
-                protocol=self.endpoint.transport,
-                endpoint=self.endpoint.target,
-                target=self.endpoint.target,
-                cache_mode=self.options.cache_mode,
-                warmup_queries=self.options.warmup_queries,
-                concurrency=self.options.concurrency,
-                first_query_latency_ms=None,
-                average_latency_ms=None,
-                p95_latency_ms=None,
-                success_rate=0.0,
-                successful_queries=0,
-                total_queries=len(self.domains),
-                connection_setup_ms=self._dot_connection_setup_ms or (self.doh_client.connection_setup_ms if self.doh_client else None),
-                average_ttfb_ms=None,
-                http_version=self._doh_preflight_http_version,
-                resolved_target=self.resolved_target,
-                error=preflight_error,
-            )
+    async def _analyze_upstream_cache(self) -> UpstreamCacheAnalysis | None:
+        """Query every measured name once more, then classify the measured answers by TTL."""
+        if not self.options.ttl_analysis or self._next_domain == 0:
+            return None
 
-        await self._warm_connections()
-        await self._prime_cache()
-        measurements = await self._measure()
+        await self._ensure_workers()
+        domains = list(dict.fromkeys(self.domains[:self._next_domain]))
+        queue: asyncio.Queue[tuple[int, str]] = asyncio.Queue()
+        for index, domain in enumerate(domains):
+            queue.put_nowait((index, domain))
 
-        successful = [measurement for measurement in measurements if measurement.success and measurement.latency_ms is not None]
-        if not successful:
-            return BenchmarkResult(
-                protocol=self.endpoint.transport,
-                endpoint=self.endpoint.target,
-                target=self.endpoint.target,
-                cache_mode=self.options.cache_mode,
-                warmup_queries=self.options.warmup_queries,
-                concurrency=self.options.concurrency,
-                first_query_latency_ms=None,
-                average_latency_ms=None,
-                p95_latency_ms=None,
-                success_rate=0.0,
-                successful_queries=0,
-                total_queries=len(measurements),
-                connection_setup_ms=self._dot_connection_setup_ms or (self.doh_client.connection_setup_ms if self.doh_client else None),
-                average_ttfb_ms=None,
-                http_version=self._doh_preflight_http_version,
-                resolved_target=self.resolved_target,
-                error="no successful responses",
-                measurements=measurements,
+        async def probe_worker(worker_index: int) -> None:
+            """Send the second query per name, bypassing the local response cache."""
+            worker = self._workers[worker_index]
+            while not self._circuit_breaker.is_open:
+                try:
+                    index, domain = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                self._progress("ttl", index + 1, len(domains), domain)
+                measurement = await self._query_worker(worker, domain)
+                self._circuit_breaker.record(measurement)
+                self._observe_ttl(measurement)
+                queue.task_done()
+
+        await asyncio.gather(*(probe_worker(index) for index in range(len(self._workers))))
+
+        analysis = UpstreamCacheAnalysis(names=len(self._ttl_observations))
+        hit_latencies: list[float] = []
+        miss_latencies: list[float] = []
+        for measurement in self.measured():
+            if measurement.answer_ttl is None or measurement.latency_ms is None:
+                continue
+            reference_ttl = max(ttl for _observed_at, ttl in self._ttl_observations[measurement.domain])
+            # TTLs only have one-second resolution, so a countdown of one second still looks fresh.
+            if measurement.answer_ttl >= reference_ttl - 1:
+                measurement.upstream_cache = "miss"
+                miss_latencies.append(measurement.latency_ms)
+            else:
+                measurement.upstream_cache = "hit"
+                hit_latencies.append(measurement.latency_ms)
+        for observations in self._ttl_observations.values():
+            # One cache implies one expiry time; answers pointing at different expiries came from different caches.
+            expiries = [observed_at + ttl for observed_at, ttl in observations]
+            if max(expiries) - min(expiries) > 2.0:
+                analysis.fragmented_names += 1
+        analysis.hits = len(hit_latencies)
+        analysis.misses = len(miss_latencies)
+        analysis.classified_queries = analysis.hits + analysis.misses
+        analysis.hit_latency = LatencySummary.from_values(hit_latencies)
+        analysis.miss_latency = LatencySummary.from_values(miss_latencies)
+        return analysis
+
+    async def _measure_cache_busting(self) -> CacheBustingResult | None:
+        """Resolve a unique random label under every measured name and compare it with the hot names.
+
+        The local response cache is bypassed, and the answers do not feed the
+        client-cache simulation. They do feed the circuit breaker, with NXDOMAIN
+        counting as an answer.
+        """
+        if not self.options.cache_busting or self._next_domain == 0:
+            return None
+
+        await self._ensure_workers()
+        domains = self.domains[:self._next_domain]
+        queue: asyncio.Queue[tuple[int, str]] = asyncio.Queue()
+        for index, domain in enumerate(domains):
+            queue.put_nowait((index, _cache_busting_name(domain)))
+        uncached_latencies: list[float] = []
+        result = CacheBustingResult(queries=len(domains), successful_queries=0, nxdomain_answers=0)
+
+        async def busting_worker(worker_index: int) -> None:
+            """Query random names on the same warm transports as the measured phase."""
+            worker = self._workers[worker_index]
+            while not self._circuit_breaker.is_open:
+                try:
+                    index, name = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                self._progress("uncached", index + 1, len(domains), name)
+                measurement = await self._query_worker(worker, name)
+                nxdomain = measurement.error == "NXDOMAIN"
+                self._circuit_breaker.record(measurement, answered=measurement.success or nxdomain)
+                if (measurement.success or nxdomain) and measurement.latency_ms is not None:
+                    result.successful_queries += 1
+                    result.nxdomain_answers += int(nxdomain)
+                    uncached_latencies.append(measurement.latency_ms)
+                queue.task_done()
+
+        await asyncio.gather(*(busting_worker(index) for index in range(len(self._workers))))
+        result.cached = LatencySummary.from_values(
+            [
+                measurement.latency_ms
+                for measurement in self.measured()
+                if measurement.success and not measurement.from_cache and measurement.latency_ms is not None
+            ]
+        )
+        result.uncached = LatencySummary.from_values(uncached_latencies)
+        return result
+
+    async def _sweep_concurrency(self) -> ConcurrencySweep | None:
+        """Replay the measured names on the warm pool at increasing concurrency.
+
+        Each level uses the first N workers of the pool and bypasses the local
+        response cache, so it measures how the resolver itself copes with load.
+        With Throttle Backoff every level runs under an AIMD budget of its own.
+        The sweep stops after the first level that drew throttling signals,
+        since higher levels would only measure the resolver's rate limit.
+        """
+        if not self.options.concurrency_sweep or self._next_domain == 0:
+            return None
+
+        await self._ensure_workers()
+        domains = self.domains[:self._next_domain]
+        levels = _sweep_levels(len(self._workers))
+        sweep = ConcurrencySweep(levels=[])
+        for level_index, concurrency in enumerate(levels):
+            if self._circuit_breaker.is_open:
+                break
+            self._progress("sweep", level_index + 1, len(levels), f"{concurrency} in flight")
+            queue: asyncio.Queue[str] = asyncio.Queue()
+            for domain in domains:
+                queue.put_nowait(domain)
+            latencies: list[float] = []
+            throttle = _ThrottleController(self.options.throttle_backoff, concurrency)
+            throttled = 0
+            attempted = 0
+
+            async def sweep_worker(worker_index: int) -> None:
+                """Drain the shared queue one query at a time on one pool worker."""
+                nonlocal throttled, attempted
+                worker = self._workers[worker_index]
+                while not self._circuit_breaker.is_open:
+                    try:
+                        domain = queue.get_nowait()
+                    except asyncio.QueueEmpty:
+                        return
+                    await throttle.acquire()
+                    attempted += 1
+                    measurement = await self._query_worker(worker, domain)
+                    signal = await throttle.release(measurement) if throttle.enabled else throttle.classify(measurement)
+                    if signal is not None:
+                        throttled += 1
+                    self._circuit_breaker.record(measurement)
+                    if measurement.success and measurement.latency_ms is not None:
+                        latencies.append(measurement.latency_ms)
+                    queue.task_done()
+
+            started = time.perf_counter()
+            await asyncio.gather(*(sweep_worker(index) for index in range(concurrency)))
+            elapsed = time.perf_counter() - started
+            sweep.levels.append(
+                ConcurrencyLevel(
+                    concurrency=concurrency,
+                    queries=len(domains),
+                    successful_queries=len(latencies),
+                    elapsed_ms=elapsed * 1000.0,
+                    throughput_qps=len(latencies) / elapsed if elapsed > 0.0 else 0.0,
+                    latency=LatencySummary.from_values(latencies),
+                    attempted_queries=attempted,
+                    failed_queries=attempted - len(latencies),
+                    attempted_qps=attempted / elapsed if elapsed > 0.0 else 0.0,
+                    throttled_queries=throttled,
+                    min_in_flight=throttle.statistics.min_in_flight if throttle.enabled else None,
+                )
             )
+            if throttled:
+                break
 
-        latency_values = [measurement.latency_ms for measurement in successful if measurement.latency_ms is not None]
-        ttfb_values = [measurement.ttfb_ms for measurement in successful if measurement.ttfb_ms is not None]
-        http_version = next((measurement.http_version for measurement in successful if measurement.http_version), self._doh_preflight_http_version)
+        if not sweep.levels:
+            return None
+        # A throttled level's throughput is the resolver's rate limit, not its capacity.
+        candidates = [level for level in sweep.levels if not level.throttled_queries] or sweep.levels
+        best = max(candidates, key=lambda level: level.power)
+        sweep.knee_concurrency = best.concurrency if best.power > 0.0 else None
+        return sweep
+
+    async def _simulate_client_cache(self) -> CacheSimulationResult | None:
+        """Replay the corpus through a simulated caching client fed by the measured upstream answers.
+
+        Queries arrive round-robin at a fixed rate on a simulated clock. Fresh hits
+        cost nothing, prefetch and serve-stale hits refresh in the background, and
+        only misses (or expired entries without serve-stale) block on the upstream
+        latency that was actually measured for that domain.
+        """
+        if not self.options.cache_simulation or self.options.simulation_query_rate <= 0.0:
+            return None
+        domains = [domain for domain in self.domains if domain in self._upstream_samples]
+        if not domains:
+            return None
+
+        clock = _SimulatedClock()
+        cache = ResponseCache(
+            True,
+            max_entries=self.options.cache_max_entries,
+            max_bytes=self.options.cache_max_bytes,
+            prefetch_threshold=self.options.prefetch_threshold,
+            stale_max_seconds=self.options.stale_max_seconds if self.options.serve_stale else 0.0,
+            clock=clock,
+        )
+        simulation = CacheSimulationResult(
+            duration_seconds=self.options.simulation_duration_seconds,
+            query_rate=self.options.simulation_query_rate,
+            prefetch_threshold=self.options.prefetch_threshold,
+            serve_stale=self.options.serve_stale,
+        )
+        sample_cursor: dict[str, int] = {}
+        pending: dict[str, tuple[float, QueryMeasurement]] = {}
+        completions: list[tuple[float, int, str, QueryMeasurement]] = []
+        sequence = itertools.count()
+        effective_latencies: list[float] = []
+
+        def start_fetch(domain: str, now: float) -> tuple[float, QueryMeasurement]:
+            """Schedule one upstream refresh that completes after a measured latency."""
+            samples = self._upstream_samples[domain]
+            sample = samples[sample_cursor.get(domain, 0) % len(samples)]
+            sample_cursor[domain] = sample_cursor.get(domain, 0) + 1
+            latency_ms = sample.latency_ms if sample.latency_ms is not None else self.options.timeout_seconds * 1000.0
+            completed_at = now + latency_ms / 1000.0
+            heapq.heappush(completions, (completed_at, next(sequence), domain, sample))
+            pending[domain] = (completed_at, sample)
+            simulation.upstream_fetches += 1
+            return pending[domain]
+
+        query_count = int(self.options.simulation_duration_seconds * self.options.simulation_query_rate)
+        interval = 1.0 / self.options.simulation_query_rate
+        for query_index in range(query_count):
+            now = query_index * interval
+            while completions and completions[0][0] <= now:
+                completed_at, _sequence, completed_domain, sample = heapq.heappop(completions)
+                clock.now = completed_at
+                pending.pop(completed_domain, None)
+                if sample.response_wire is not None:
+                    await cache.put(completed_domain, self.options.query_type, dns.message.from_wire(sample.response_wire))
+            clock.now = now
+
+            domain = domains[query_index % len(domains)]
+            simulation.queries += 1
+            state, _cached = await cache.lookup(domain, self.options.query_type)
+            if state != "miss":
+                if state == "prefetch" and domain not in pending:
+                    simulation.prefetches += 1
+                    start_fetch(domain, now)
+                elif state == "stale":
+                    simulation.stale_served += 1
+                    if domain not in pending:
+                        start_fetch(domain, now)
+                effective_latencies.append(0.0)
+                continue
+
+            # A miss waits for a refresh that is already in flight instead of starting a duplicate.
+            completed_at, sample = pending.get(domain) or start_fetch(domain, now)
+            simulation.blocked_queries += 1
+            if sample.response_wire is None:
+                simulation.failed_queries += 1
+            effective_latencies.append((completed_at - now) * 1000.0)
+
+        if effective_latencies:
+            simulation.effective_average_latency_ms = statistics.fmean(effective_latencies)
+            simulation.effective_p95_latency_ms = _percentile_95(effective_latencies)
+        return simulation
+
+    def _build_result(
+        self,
+        measurements: list[QueryMeasurement],
+        error: str | None = None,
+        cancelled: bool = False,
+    ) -> BenchmarkResult:
+        """Summarize measurements into the structured result shown by the UI."""
+        successful = [measurement for measurement in measurements if measurement.success and measurement.latency_ms is not None]
+        if error is None and not successful:
+            if cancelled:
+                error = "benchmark cancelled"
+            elif self._circuit_breaker.is_open:
+                error = self._circuit_breaker.reason
+            else:
+                error = "no successful responses"
 
         result = BenchmarkResult(
             protocol=self.endpoint.transport,
@@ -773,30 +3290,200 @@ class BenchmarkRunner:
             cache_mode=self.options.cache_mode,
             warmup_queries=self.options.warmup_queries,
             concurrency=self.options.concurrency,
-            first_query_latency_ms=next(
-                (measurement.latency_ms for measurement in measurements if measurement.latency_ms is not None),
-                None,
-            ),
-            average_latency_ms=statistics.fmean(latency_values),
-            p95_latency_ms=_percentile_95(latency_values),
-            success_rate=(len(successful) / len(measurements)) * 100.0,
-            successful_queries=len(successful),
-            total_queries=len(measurements),
-            connection_setup_ms=self._dot_connection_setup_ms or (self.doh_client.connection_setup_ms if self.doh_client else None),
-            average_ttfb_ms=statistics.fmean(ttfb_values) if ttfb_values else None,
-            http_version=http_version,
+            first_query_latency_ms=None,
+            average_latency_ms=None,
+            p95_latency_ms=None,
+            success_rate=0.0,
+            successful_queries=0,
+            total_queries=len(measurements) if measurements or cancelled else len(self.domains),
+            connection_setup_ms=self._connection_setup_ms(),
+            average_ttfb_ms=None,
+            http_version=self._doh_preflight_http_version,
             resolved_target=self.resolved_target,
+            error=error,
+            cancelled=cancelled,
+            connection_reuse=self.options.connection_reuse,
+            circuit_breaker_reason=self._circuit_breaker.reason,
+            cache_statistics=self.cache.statistics if self.cache.enabled else None,
+            cache_simulation=self._cache_simulation,
+            cache_busting=self._cache_busting,
+            upstream_cache=self._upstream_cache,
+            concurrency_sweep=self._concurrency_sweep,
+            doh_pool_statistics=self.doh_client.statistics() if self.doh_client else None,
+            adaptive_timeout=self._rto.statistics() if self._rto is not None else None,
+            hedge_statistics=self._hedge_statistics,
+            throttle_statistics=self._throttle.finish() if self._throttle.enabled else None,
+            transport_counters=self._transport_counters,
             measurements=measurements,
         )
+        result.event_loop, result.event_loop_version = _running_event_loop()
+        if self._hedge_statistics is not None and self._unhedged_latencies:
+            self._hedge_statistics.unhedged_average_latency_ms = statistics.fmean(self._unhedged_latencies)
+            self._hedge_statistics.unhedged_p95_latency_ms = _percentile_95(self._unhedged_latencies)
+        if error is not None:
+            return result
+
+        latency_values = [measurement.latency_ms for measurement in successful if measurement.latency_ms is not None]
+        ttfb_values = [measurement.ttfb_ms for measurement in successful if measurement.ttfb_ms is not None]
+        result.first_query_latency_ms = next(
+            (measurement.latency_ms for measurement in measurements if measurement.latency_ms is not None),
+            None,
+        )
+        result.average_latency_ms = statistics.fmean(latency_values)
+        result.p95_latency_ms = _percentile_95(latency_values)
+        result.latency_intervals = bootstrap_intervals(latency_values)
+        result.success_rate = (len(successful) / len(measurements)) * 100.0
+        result.successful_queries = len(successful)
+        result.average_ttfb_ms = statistics.fmean(ttfb_values) if ttfb_values else None
+        result.http_version = next((measurement.http_version for measurement in successful if measurement.http_version), self._doh_preflight_http_version)
+        if self.options.site_identification:
+            result.sites = _site_latencies(successful)
+        result.phase_breakdown = _phase_breakdown(successful)
+        first_attempt = [measurement.latency_ms for measurement in successful if measurement.attempts == 1]
+        retried = [measurement.latency_ms for measurement in successful if measurement.attempts > 1]
+        if self._loop_lag is not None:
+            result.loop_lag = self._loop_lag.statistics(
+                statistics.median(latency_values),
+                self.options.loop_lag_unreliable_fraction,
+                self.options.gc_freeze,
+            )
+        result.first_attempt_latency = LatencySummary.from_values(first_attempt) if first_attempt else None
+        result.retried_latency = LatencySummary.from_values(retried) if retried else None
+        timestamped = [measurement for measurement in successful if measurement.kernel_rtt_ms is not None]
+        if timestamped:
+            result.kernel_latency = LatencySummary.from_values([measurement.kernel_rtt_ms for measurement in timestamped])
+            result.harness_overhead = LatencySummary.from_values(
+                [measurement.latency_ms - measurement.kernel_rtt_ms for measurement in timestamped]
+            )
+        if not self.options.connection_reuse and self.endpoint.transport == "DoT":
+            result.tls_resumed_queries = sum(1 for measurement in successful if measurement.tls_resumed)
         return result
 
+    async def prepare(self) -> str | None:
+        """Run preflight and warm-up and build the worker pool, returning the preflight error if any."""
+        preflight_error = await self._preflight()
+        if preflight_error:
+            return preflight_error
+        await self._warm_connections()
+        await self._ensure_workers()
+        return None
+
+    async def query(self, domain: str, worker_index: int = 0, timeout: float | None = None) -> QueryMeasurement:
+        """Resolve one domain on a prepared worker for callers that drive their own schedule."""
+        worker = self._workers[worker_index % len(self._workers)]
+        return await self._query_worker(worker, domain, timeout)
+
+    async def start(self) -> str | None:
+        """Prepare the transport and prime the cache, returning the preflight error if any."""
+        preflight_error = await self.prepare()
+        if preflight_error:
+            return preflight_error
+        await self._prime_cache()
+        return None
+
+    @property
+    def cancel_requested(self) -> bool:
+        """Return whether the attached cancellation handle asked this run to stop."""
+        return self.cancellation is not None and self.cancellation.cancelled
+
+    @property
+    def remaining_domains(self) -> int:
+        """Return how many domains the measured phase has not reached yet."""
+        return len(self.domains) - self._next_domain
+
+    async def measure_domains(self, count: int | None = None) -> int:
+        """Measure the next ``count`` domains of the corpus, or all remaining ones, and return how many ran."""
+        start = self._next_domain
+        stop = len(self.domains) if count is None else min(start + count, len(self.domains))
+        await self._measure(stop)
+        return stop - start
+
+    def measured(self) -> list[QueryMeasurement]:
+        """Return the measurements collected so far, in corpus order."""
+        return [measurement for measurement in self._measurements if measurement is not None]
+
+    def latency_intervals(self) -> LatencyIntervals | None:
+        """Bootstrap the mean and p95 intervals of the successful latencies measured so far."""
+        latencies = [
+            measurement.latency_ms
+            for measurement in self.measured()
+            if measurement.success and measurement.latency_ms is not None
+        ]
+        return bootstrap_intervals(latencies) if latencies else None
+
+    def _resolver_answering(self) -> bool:
+        """Return whether the follow-up passes that query the resolver again are worth running.
+
+        After a tripped breaker or a measured phase without a single answer they
+        would only pay one timeout per query.
+        """
+        return not self._circuit_breaker.is_open and any(measurement.success for measurement in self.measured())
+
+    async def build_result(self, cancelled: bool = False, error: str | None = None) -> BenchmarkResult:
+        """Summarize what has been measured, adding the optional follow-up passes for complete runs."""
+        if error is not None:
+            return self._build_result([], error=error)
+        if not cancelled and self._resolver_answering():
+            self._upstream_cache = await self._analyze_upstream_cache()
+            self._cache_busting = await self._measure_cache_busting()
+            self._concurrency_sweep = await self._sweep_concurrency()
+        if not cancelled:
+            self._cache_simulation = await self._simulate_client_cache()
+        return self._save_profile(self._build_result(self.measured(), cancelled=cancelled))
+
+    def _save_profile(self, result: BenchmarkResult) -> BenchmarkResult:
+        """Write the measured-phase profile and the result JSON into one folder, if the run was profiled."""
+        if self._profiler is None or not self._profiler.rounds:
+            return result
+        label = "-".join(part for part in (_profile_label(self.endpoint.name), self.endpoint.transport.lower()) if part)
+        result.profile_notes = self._profiler.notes
+        try:
+            result.profile_artifacts = self._profiler.write(self.options.profile_directory, label)
+            with open(result.profile_artifacts["result"], "w", encoding="utf-8") as result_file:
+                result_file.write(result.to_json())
+        except OSError:
+            # A profile that cannot be saved must not cost the user the benchmark result.
+            result.profile_artifacts = None
+        return result
+
+    async def run(self) -> BenchmarkResult:
+        """Execute the full benchmark lifecycle and return the structured result.
+
+        Cancelling the task returns the measurements completed so far as a
+        partial result marked as cancelled instead of propagating the error.
+        """
+        try:
+            preflight_error = await self.start()
+            if preflight_error:
+                return await self.build_result(error=preflight_error)
+            if not self.cancel_requested:
+                if self.options.gc_freeze:
+                    _HEAP_FREEZE.hold()
+                try:
+                    await self.measure_domains()
+                finally:
+                    if self.options.gc_freeze:
+                        _HEAP_FREEZE.release()
+            if self.cancel_requested:
+                return self.cancelled_result()
+            return await self.build_result()
+        except asyncio.CancelledError:
+            uncancel_current_task()
+            return self.cancelled_result()
+
+    def cancelled_result(self) -> BenchmarkResult:
+        """Return the measurements completed so far as a partial result marked as cancelled."""
+        return self._save_profile(self._build_result(self.measured(), cancelled=True))
+
     async def close(self) -> None:
         """Dispose of any shared resources after the benchmark completes."""
-        for worker in self._workers:
+        for worker in self._workers + self._hedge_workers:
             if isinstance(worker, Do53Worker) or isinstance(worker, DoTWorker):
                 await worker.close()
         if self.doh_client is not None:
             await self.doh_client.close()
+        if self.quic_client is not None:
+            await self.quic_client.close()
 
 
 async def run_benchmark(
@@ -804,13 +3491,97 @@ async def run_benchmark(
     domains: list[str],
     options: BenchmarkOptions,
     progress_callback: ProgressCallback | None = None,
+    cancellation: BenchmarkCancellation | None = None,
 ) -> BenchmarkResult:
     """Async entry point used by the worker thread."""
-    runner = BenchmarkRunner(endpoint, domains, options, progress_callback)
+    runner = BenchmarkRunner(endpoint, domains, options, progress_callback, cancellation)
+    task = asyncio.current_task()
+    if cancellation is not None and task is not None:
+        cancellation.attach(task)
     try:
         return await runner.run()
+    except asyncio.CancelledError:
+        # run() absorbs one cancellation; a cancel from outside that arrives while it unwinds ends up here.
+        uncancel_current_task()
+        return runner.cancelled_result()
     finally:
-        await runner.close()
+        if cancellation is not None and task is not None:
+            cancellation.detach(task)
+        await finish_shielded(runner.close())
+
+
+def uncancel_current_task() -> None:
+    """Clear a cancellation request the caller has answered with a partial result."""
+    task = asyncio.current_task()
+    if task is not None:
+        task.uncancel()
+
+
+async def finish_shielded(teardown: Coroutine[object, object, None]) -> None:
+    """Run teardown to completion, so late cancels cannot leave sockets or pools open."""
+    closing = asyncio.ensure_future(teardown)
+    while True:
+        try:
+            await asyncio.shield(closing)
+            return
+        except asyncio.CancelledError:
+            if closing.cancelled():
+                raise
+            uncancel_current_task()
+
+
+def _cancelled_placeholder(endpoint: ResolverEndpoint, domains: list[str], options: BenchmarkOptions) -> BenchmarkResult:
+    """Build the result of a run that was cancelled before it could summarize itself."""
+    return BenchmarkResult(
+        protocol=endpoint.transport,
+        endpoint=endpoint.target,
+        target=endpoint.target,
+        cache_mode=options.cache_mode,
+        warmup_queries=options.warmup_queries,
+        concurrency=options.concurrency,
+        first_query_latency_ms=None,
+        average_latency_ms=None,
+        p95_latency_ms=None,
+        success_rate=0.0,
+        successful_queries=0,
+        total_queries=len(domains),
+        resolved_target=endpoint.bootstrap_address,
+        error="benchmark cancelled",
+        cancelled=True,
+    )
+
+
+def _event_loop_factory(event_loop: str) -> Callable[[], asyncio.AbstractEventLoop] | None:
+    """Return the loop factory for an event-loop choice, or None for the standard asyncio loop."""
+    if event_loop == "auto":
+        event_loop = os.environ.get(EVENT_LOOP_ENVIRONMENT_VARIABLE, "").strip().lower() or "auto"
+    if event_loop == "asyncio":
+        return None
+    if event_loop == "uvloop":
+        if uvloop is None:
+            raise RuntimeError("the uvloop event loop requires the uvloop package")
+        return uvloop.new_event_loop
+    if event_loop == "auto":
+        return uvloop.new_event_loop if uvloop is not None else None
+    raise ValueError(f"unknown event loop {event_loop!r}")
+
+
+def _running_event_loop() -> tuple[str, str]:
+    """Name the running event loop implementation and its version."""
+    if uvloop is not None and isinstance(asyncio.get_running_loop(), uvloop.Loop):
+        return "uvloop", uvloop.__version__
+    return "asyncio", platform.python_version()
+
+
+def run_with_event_loop(coroutine: Coroutine[object, object, T], event_loop: str = "auto") -> T:
+    """Run a coroutine to completion on a new loop of the chosen implementation."""
+    try:
+        loop_factory = _event_loop_factory(event_loop)
+    except Exception:
+        coroutine.close()
+        raise
+    with asyncio.Runner(loop_factory=loop_factory) as runner:
+        return runner.run(coroutine)
 
 
 def run_benchmark_sync(
@@ -818,6 +3589,182 @@ def run_benchmark_sync(
     domains: list[str],
     options: BenchmarkOptions,
     progress_callback: ProgressCallback | None = None,
+    cancellation: BenchmarkCancellation | None = None,
 ) -> BenchmarkResult:
     """Synchronous wrapper so the GTK code can call the benchmark from a thread."""
-    return asyncio.run(run_benchmark(endpoint, domains, options, progress_callback))
+    try:
+        return run_with_event_loop(run_benchmark(endpoint, domains, options, progress_callback, cancellation), options.event_loop)
+    except asyncio.CancelledError:
+        # CancelledError is a BaseException and would otherwise kill the calling thread.
+        return _cancelled_placeholder(endpoint, domains, options)
+
+
+def compare_event_loops(
+    endpoint: ResolverEndpoint,
+    domains: list[str],
+    options: BenchmarkOptions,
+    event_loops: tuple[str, ...] = ("asyncio", "uvloop"),
+) -> dict[str, BenchmarkResult]:
+    """Run the same benchmark once per installed event loop to show how much latency the loop adds.
+
+    Loops that are not installed are skipped. Against a local resolver the
+    network adds almost nothing, so the differences are the loop's own overhead.
+    """
+    results: dict[str, BenchmarkResult] = {}
+    for event_loop in event_loops:
+        if event_loop == "uvloop" and uvloop is None:
+            continue
+        results[event_loop] = run_benchmark_sync(endpoint, domains, replace(options, event_loop=event_loop))
+    return results
+
+
+def _ranking_settled(index: int, intervals: list[LatencyIntervals | None]) -> bool:
+    """Return whether a resolver's intervals are disjoint from both of its ranking neighbours.
+
+    A resolver without neighbours has nothing to be ranked against, so it keeps
+    sampling until the budget runs out.
+    """
+    ranked = sorted(
+        (candidate for candidate, interval in enumerate(intervals) if interval is not None),
+        key=lambda candidate: intervals[candidate].mean_ms,
+    )
+    if index not in ranked or len(ranked) < 2:
+        return False
+    position = ranked.index(index)
+    neighbours = ranked[max(position - 1, 0):position] + ranked[position + 1:position + 2]
+    return all(intervals[index].separated_from(intervals[neighbour]) for neighbour in neighbours)
+
+
+async def run_adaptive_benchmarks(
+    endpoints: list[ResolverEndpoint],
+    domains: list[str],
+    options: BenchmarkOptions,
+    progress_callback: SampledProgressCallback | None = None,
+    result_callback: SampledResultCallback | None = None,
+    cancellations: list[BenchmarkCancellation] | None = None,
+    cancellation: BenchmarkCancellation | None = None,
+) -> list[BenchmarkResult]:
+    """Benchmark several endpoints in interleaved rounds and stop each one once its rank is settled.
+
+    Every resolver first measures ``sampling_min_queries`` domains, then
+    ``sampling_round_queries`` more per round. Within a round the resolvers take
+    turns, so no measured query shares the event loop with another resolver's
+    queries; a slow resolver therefore cannot inflate the latencies of the rest.
+    After each round a resolver stops when the bootstrap intervals of its mean
+    and p95 no longer overlap those of its ranking neighbours, or when the corpus
+    is exhausted, and its runner is closed as soon as its result is published.
+    ``cancellations`` holds optional per-endpoint handles that stop a resolver
+    between queries, while ``cancellation`` stops the whole batch at once.
+    """
+
+    def bind_progress(index: int) -> ProgressCallback | None:
+        """Tag runner progress with the endpoint index."""
+        if progress_callback is None:
+            return None
+        return lambda phase, current, total, detail: progress_callback(index, phase, current, total, detail)
+
+    runners = [
+        BenchmarkRunner(
+            endpoint,
+            domains,
+            options,
+            bind_progress(index),
+            cancellations[index] if cancellations is not None else None,
+        )
+        for index, endpoint in enumerate(endpoints)
+    ]
+    results: list[BenchmarkResult | None] = [None] * len(runners)
+    intervals: list[LatencyIntervals | None] = [None] * len(runners)
+    closed: set[int] = set()
+
+    def row_cancelled(index: int) -> bool:
+        """Return whether the row of one resolver was cancelled on its own."""
+        return cancellations is not None and cancellations[index].cancelled
+
+    async def finish(index: int, reason: str | None, cancelled: bool = False, error: str | None = None) -> None:
+        """Build and publish the result of one resolver, then release its connections."""
+        result = await runners[index].build_result(cancelled=cancelled, error=error)
+        result.sampling_stop_reason = reason
+        results[index] = result
+        if result_callback is not None:
+            result_callback(index, result)
+        closed.add(index)
+        await finish_shielded(runners[index].close())
+
+    task = asyncio.current_task()
+    if cancellation is not None and task is not None:
+        cancellation.attach(task)
+    try:
+        errors = await asyncio.gather(*(runner.start() for runner in runners))
+        for index, error in enumerate(errors):
+            if error is not None:
+                await finish(index, None, error=error)
+
+        round_size = max(options.sampling_min_queries, 1)
+        # One collection and freeze cover every round of the batch.
+        if options.gc_freeze:
+            _HEAP_FREEZE.hold()
+        try:
+            while active := [index for index, result in enumerate(results) if result is None]:
+                for index in active:
+                    if not row_cancelled(index):
+                        await runners[index].measure_domains(round_size)
+                        intervals[index] = runners[index].latency_intervals()
+                round_size = max(options.sampling_round_queries, 1)
+                for index in active:
+                    measured = len(runners[index].measured())
+                    if row_cancelled(index):
+                        await finish(index, f"cancelled after {measured} queries", cancelled=True)
+                    elif _ranking_settled(index, intervals):
+                        await finish(index, f"ranking settled after {measured} queries")
+                    elif runners[index].remaining_domains == 0:
+                        await finish(index, f"full corpus of {measured} queries")
+        finally:
+            if options.gc_freeze:
+                _HEAP_FREEZE.release()
+    except asyncio.CancelledError:
+        uncancel_current_task()
+        for index, result in enumerate(results):
+            if result is None:
+                await finish(index, "batch cancelled", cancelled=True)
+    finally:
+        if cancellation is not None and task is not None:
+            cancellation.detach(task)
+        await finish_shielded(_close_runners([runner for index, runner in enumerate(runners) if index not in closed]))
+    return [result for result in results if result is not None]
+
+
+async def _close_runners(runners: list[BenchmarkRunner]) -> None:
+    """Close every runner of a batch concurrently."""
+    await asyncio.gather(*(runner.close() for runner in runners))
+
+
+def run_adaptive_benchmarks_sync(
+    endpoints: list[ResolverEndpoint],
+    domains: list[str],
+    options: BenchmarkOptions,
+    progress_callback: SampledProgressCallback | None = None,
+    result_callback: SampledResultCallback | None = None,
+    cancellations: list[BenchmarkCancellation] | None = None,
+    cancellation: BenchmarkCancellation | None = None,
+) -> list[BenchmarkResult]:
+    """Synchronous wrapper that runs a whole adaptive Check All batch on one thread and one loop.
+
+    If a stray cancellation escapes the batch, every resolver comes back as a
+    cancelled placeholder instead of the error killing the calling thread.
+    """
+    try:
+        return run_with_event_loop(
+            run_adaptive_benchmarks(
+                endpoints,
+                domains,
+                options,
+                progress_callback,
+                result_callback,
+                cancellations,
+                cancellation,
+            ),
+            options.event_loop,
+        )
+    except asyncio.CancelledError:
+        return [_cancelled_placeholder(endpoint, domains, options) for endpoint in endpoints]
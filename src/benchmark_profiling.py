@@ -0,0 +1,297 @@
+# benchmark_profiling.py
+#
+# Opt-in profiling of the measured phase, so a slow run can be explained
+# from saved artifacts instead of guessed at. Kept free of transport code.
+
+from __future__ import annotations
+
+import cProfile
+import os
+import pstats
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Literal
+
+ProfileMode = Literal["off", "cprofile", "sampling"]
+
+# The stack sampler looks at the benchmark thread every 5 ms.
+DEFAULT_SAMPLING_INTERVAL_SECONDS = 0.005
+# Text reports keep the functions and allocation sites that matter most.
+PROFILE_REPORT_LINES = 40
+ALLOCATION_REPORT_LINES = 25
+# tracemalloc keeps this many frames per allocation so the report shows who asked for the memory.
+ALLOCATION_TRACEBACK_FRAMES = 5
+
+
+def default_profile_directory() -> str:
+    """Return the folder that holds one subfolder of artifacts per profiled run."""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "es.neikon.dns_tester", "profiles")
+
+
+class _StackSampler:
+    """Thread that periodically records the call stack of one other thread.
+
+    Unlike cProfile it adds no cost to every call, so the latencies of a sampled
+    run stay close to those of an unprofiled one. Time the loop spends idle in
+    its selector shows up as samples in ``select``.
+    """
+
+    def __init__(self, interval: float = DEFAULT_SAMPLING_INTERVAL_SECONDS) -> None:
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self._target: int | None = None
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        """Start sampling the calling thread."""
+        self._target = threading.get_ident()
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="dns-tester-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling; the samples of every round are kept."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        """Fold each sampled stack into one ``outer;...;inner`` line, as flame graph tools expect."""
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            frames: list[str] = []
+            while frame is not None:
+                code = frame.f_code
+                frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if frames:
+                self.stacks[";".join(reversed(frames))] += 1
+
+
+class _StatsSnapshot:
+    """Copy of a profile's statistics that ``pstats`` can read without disabling the profile."""
+
+    def __init__(self, profile: cProfile.Profile) -> None:
+        profile.snapshot_stats()
+        self.stats = dict(profile.stats)
+
+    def create_stats(self) -> None:
+        """Keep the copied statistics; ``pstats`` calls this before reading them."""
+
+
+class _SharedTracer:
+    """Process-wide owner of tracemalloc and of one cProfile profile per thread.
+
+    tracemalloc is global and cProfile allows one profile per thread, so runners
+    that measure at the same time, in one loop or in several threads, hold the
+    same tracer instead of starting and stopping it under each other. The last
+    holder to leave stops it. Every acquisition is counted, which lets a holder
+    tell afterwards whether someone else was traced during its round.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._allocation_holders = 0
+        self._started_tracing = False
+        # Thread id -> [profile, holders] for the threads with an enabled profile.
+        self._profiles: dict[int, list] = {}
+        self.acquisitions = 0
+
+    def hold_allocations(self) -> bool:
+        """Trace allocations until the matching release; return False if someone outside the benchmark already traces them."""
+        with self._lock:
+            self.acquisitions += 1
+            self._allocation_holders += 1
+            if self._allocation_holders == 1 and not tracemalloc.is_tracing():
+                tracemalloc.start(ALLOCATION_TRACEBACK_FRAMES)
+                self._started_tracing = True
+            return self._started_tracing
+
+    def release_allocations(self) -> None:
+        """Stop tracing allocations when the last holder leaves, if the tracer started them."""
+        with self._lock:
+            self._allocation_holders -= 1
+            if self._allocation_holders == 0 and self._started_tracing:
+                tracemalloc.stop()
+                self._started_tracing = False
+
+    def hold_profile(self) -> cProfile.Profile:
+        """Return the calling thread's enabled profile, enabling a fresh one for the first holder.
+
+        Raises ``ValueError`` when another profiler, such as a debugger, is already active on the thread.
+        """
+        thread = threading.get_ident()
+        with self._lock:
+            self.acquisitions += 1
+            entry = self._profiles.get(thread)
+            if entry is None:
+                profile = cProfile.Profile()
+                profile.enable()
+                entry = self._profiles[thread] = [profile, 0]
+            entry[1] += 1
+            return entry[0]
+
+    def release_profile(self) -> None:
+        """Disable the calling thread's profile when its last holder leaves."""
+        thread = threading.get_ident()
+        with self._lock:
+            entry = self._profiles[thread]
+            entry[1] -= 1
+            if entry[1] == 0:
+                entry[0].disable()
+                del self._profiles[thread]
+
+    def holders(self) -> int:
+        """Return how many rounds currently hold tracemalloc or a profile."""
+        with self._lock:
+            return self._allocation_holders + sum(entry[1] for entry in self._profiles.values())
+
+
+_SHARED_TRACER = _SharedTracer()
+
+
+class MeasuredPhaseProfiler:
+    """Profile every measured round of one run and write the artifacts afterwards.
+
+    ``mode`` picks cProfile, which counts every call, or the stack sampler, which
+    costs far less. ``allocations`` adds tracemalloc; its report lists the
+    allocations made during the measured phase that were still alive when the
+    phase ended. ``notes`` says afterwards what the artifacts cannot be trusted
+    for: rounds traced together with other runs, a profiler that could not be
+    enabled, and the overhead the tracers added to the measured latencies.
+    """
+
+    def __init__(self, mode: ProfileMode, allocations: bool) -> None:
+        self.mode = mode
+        self.allocations = allocations
+        self.rounds = 0
+        self._sampler = _StackSampler() if mode == "sampling" else None
+        self._profile: cProfile.Profile | None = None
+        self._holds_allocations = False
+        self._acquisitions = 0
+        # Latest statistics of each shared profile this run was part of.
+        self._profile_stats: dict[cProfile.Profile, _StatsSnapshot] = {}
+        # Allocation size and count per traceback, summed over rounds.
+        self._allocation_sites: dict[str, list[int]] = {}
+        self._peak_traced_bytes = 0
+        self._profile_error: str | None = None
+        self._external_tracing = False
+        self._shared_rounds = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Return whether anything is profiled at all."""
+        return self.mode != "off" or self.allocations
+
+    @property
+    def notes(self) -> list[str]:
+        """Describe what makes the artifacts incomplete, and which tracers slowed the measured queries."""
+        notes: list[str] = []
+        if self._profile_error is not None:
+            notes.append(f"incomplete: cProfile could not be enabled ({self._profile_error})")
+        if self._shared_rounds:
+            notes.append(
+                f"incomplete: {self._shared_rounds} of {self.rounds} round(s) were traced together with other runs, "
+                "whose calls and allocations are mixed in"
+            )
+        if self._external_tracing:
+            notes.append("incomplete: tracemalloc was already started outside the benchmark, so allocations include its traces")
+        if self.mode == "cprofile" and self._profile_error is None:
+            notes.append("overhead: cProfile timed every call, so latencies are higher than in an unprofiled run")
+        if self.allocations:
+            notes.append("overhead: tracemalloc recorded every allocation, so latencies are higher than in an unprofiled run")
+        return notes
+
+    def start(self) -> None:
+        """Start profiling one measured round on the calling thread."""
+        self.rounds += 1
+        if self.mode == "cprofile":
+            try:
+                self._profile = _SHARED_TRACER.hold_profile()
+            except ValueError as error:
+                # Only one profiler can be active per thread, for example under a debugger.
+                self._profile_error = str(error)
+        if self._sampler is not None:
+            self._sampler.start()
+        if self.allocations:
+            self._external_tracing |= not _SHARED_TRACER.hold_allocations()
+            self._holds_allocations = True
+        self._acquisitions = _SHARED_TRACER.acquisitions
+
+    def stop(self) -> None:
+        """Stop profiling the current round and fold its allocations into the totals."""
+        own_holds = (self._profile is not None) + self._holds_allocations
+        if _SHARED_TRACER.acquisitions != self._acquisitions or _SHARED_TRACER.holders() > own_holds:
+            self._shared_rounds += 1
+        if self._profile is not None:
+            # A profile shared with other rounds keeps running, so only its statistics are copied.
+            self._profile_stats[self._profile] = _StatsSnapshot(self._profile)
+            _SHARED_TRACER.release_profile()
+            self._profile = None
+        if self._sampler is not None:
+            self._sampler.stop()
+        if self._holds_allocations and tracemalloc.is_tracing():
+            self._peak_traced_bytes = max(self._peak_traced_bytes, tracemalloc.get_traced_memory()[1])
+            snapshot = tracemalloc.take_snapshot().filter_traces(
+                (
+                    tracemalloc.Filter(False, tracemalloc.__file__),
+                    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+                )
+            )
+            for statistic in snapshot.statistics("traceback"):
+                totals = self._allocation_sites.setdefault("\n".join(statistic.traceback.format(most_recent_first=True)), [0, 0])
+                totals[0] += statistic.size
+                totals[1] += statistic.count
+        if self._holds_allocations:
+            _SHARED_TRACER.release_allocations()
+            self._holds_allocations = False
+
+    def write(self, directory: str | None, label: str) -> dict[str, str]:
+        """Write every artifact into a new folder and return their paths by kind.
+
+        The ``result`` path is reserved next to them for the caller, whose result
+        JSON should list these paths as well.
+        """
+        base = directory or default_profile_directory()
+        os.makedirs(base, exist_ok=True)
+        run_directory = tempfile.mkdtemp(prefix=f"{time.strftime('%Y%m%d-%H%M%S')}-{label}-", dir=base)
+        artifacts: dict[str, str] = {"directory": run_directory}
+
+        if self._profile_stats:
+            snapshots = list(self._profile_stats.values())
+            stats = pstats.Stats(snapshots[0])
+            stats.add(*snapshots[1:])
+            artifacts["cprofile"] = os.path.join(run_directory, "measured.pstats")
+            stats.dump_stats(artifacts["cprofile"])
+            artifacts["cprofile_report"] = os.path.join(run_directory, "measured-cprofile.txt")
+            with open(artifacts["cprofile_report"], "w", encoding="utf-8") as report:
+                stats.stream = report
+                stats.sort_stats("cumulative").print_stats(PROFILE_REPORT_LINES)
+        if self._sampler is not None:
+            artifacts["samples"] = os.path.join(run_directory, "measured-stacks.folded")
+            with open(artifacts["samples"], "w", encoding="utf-8") as folded:
+                for stack, count in self._sampler.stacks.most_common():
+                    folded.write(f"{stack} {count}\n")
+        if self.allocations:
+            artifacts["allocations"] = os.path.join(run_directory, "measured-allocations.txt")
+            with open(artifacts["allocations"], "w", encoding="utf-8") as report:
+                report.write(f"peak traced {self._peak_traced_bytes / 1024:.1f} KiB over {self.rounds} measured round(s)\n")
+                sites = sorted(self._allocation_sites.items(), key=lambda item: item[1][0], reverse=True)
+                for traceback, (size, count) in sites[:ALLOCATION_REPORT_LINES]:
+                    report.write(f"\n{size / 1024:.1f} KiB in {count} blocks\n{traceback}\n")
+
+        notes = self.notes
+        if notes:
+            artifacts["notes"] = os.path.join(run_directory, "notes.txt")
+            with open(artifacts["notes"], "w", encoding="utf-8") as notes_file:
+                notes_file.write("".join(f"{note}\n" for note in notes))
+
+        artifacts["result"] = os.path.join(run_directory, "result.json")
+        return artifacts
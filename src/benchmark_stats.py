@@ -0,0 +1,275 @@
+# benchmark_stats.py
+#
+# Resampling statistics used to judge whether benchmark rankings are settled.
+# Kept free of transport code so both the engine and the UI can reuse it.
+
+from __future__ import annotations
+
+import math
+import random
+import statistics
+from array import array
+from dataclasses import dataclass
+from typing import Iterable
+from typing import Protocol
+
+try:
+    import numpy
+except ImportError:  # numpy is optional; the pure-Python resampler is slower and draws different resamples.
+    numpy = None
+
+# A few hundred resamples keep interval endpoints stable to well under a millisecond for DNS latencies.
+DEFAULT_BOOTSTRAP_RESAMPLES = 500
+DEFAULT_CONFIDENCE = 0.95
+# Vectorized resampling works on blocks of at most this many drawn values to bound memory use.
+RESAMPLE_BLOCK_VALUES = 2_000_000
+
+
+def percentile(values: list[float], percent: float) -> float:
+    """Compute a nearest-rank percentile that stays stable for small datasets."""
+    if len(values) == 1:
+        return values[0]
+    sorted_values = sorted(values)
+    index = math.ceil(len(sorted_values) * percent / 100.0) - 1
+    return sorted_values[min(max(index, 0), len(sorted_values) - 1)]
+
+
+@dataclass(frozen=True)
+class LatencySummary:
+    """Count, mean, median, and p95 of one set of latencies, in milliseconds."""
+
+    count: int
+    average_ms: float
+    p50_ms: float
+    p95_ms: float
+
+    @classmethod
+    def from_values(cls, values: list[float]) -> LatencySummary | None:
+        """Summarize the given latencies, or return None when there are none."""
+        if not values:
+            return None
+        return cls(
+            count=len(values),
+            average_ms=statistics.fmean(values),
+            p50_ms=percentile(values, 50.0),
+            p95_ms=percentile(values, 95.0),
+        )
+
+
+@dataclass(frozen=True)
+class ConfidenceInterval:
+    """Two-sided interval around one latency statistic, in milliseconds."""
+
+    low: float
+    high: float
+
+    def overlaps(self, other: ConfidenceInterval) -> bool:
+        """Return whether the two intervals share any value."""
+        return self.low <= other.high and other.low <= self.high
+
+
+@dataclass(frozen=True)
+class LatencyIntervals:
+    """Bootstrap intervals for the statistics the ranking is built on."""
+
+    samples: int
+    mean_ms: float
+    p95_ms: float
+    mean: ConfidenceInterval
+    p95: ConfidenceInterval
+
+    def separated_from(self, other: LatencyIntervals) -> bool:
+        """Return whether both the mean and the p95 intervals are disjoint from the other run's."""
+        return not self.mean.overlaps(other.mean) and not self.p95.overlaps(other.p95)
+
+
+def bootstrap_intervals(
+    values: list[float],
+    confidence: float = DEFAULT_CONFIDENCE,
+    resamples: int = DEFAULT_BOOTSTRAP_RESAMPLES,
+    seed: int = 0,
+) -> LatencyIntervals:
+    """Estimate percentile-bootstrap intervals for the mean and p95 of the given latencies.
+
+    Both statistics are taken from the same resamples. The generator is seeded so
+    repeated checks over the same data reach the same decision. numpy and the
+    pure-Python fallback use different generators, so their endpoints agree only
+    within resampling noise, not exactly.
+    """
+    if not values:
+        raise ValueError("bootstrap needs at least one value")
+    count = len(values)
+    if numpy is not None:
+        means, tails = _resample_vectorized(values, resamples, seed)
+    else:
+        means, tails = _resample_python(values, resamples, seed)
+
+    tail_percent = (1.0 - confidence) / 2.0 * 100.0
+    return LatencyIntervals(
+        samples=count,
+        mean_ms=statistics.fmean(values),
+        p95_ms=percentile(values, 95.0),
+        mean=ConfidenceInterval(percentile(means, tail_percent), percentile(means, 100.0 - tail_percent)),
+        p95=ConfidenceInterval(percentile(tails, tail_percent), percentile(tails, 100.0 - tail_percent)),
+    )
+
+
+def ranking_tiers(intervals: list[LatencyIntervals | None]) -> list[int | None]:
+    """Group an already ranked list into tiers of statistically tied runs.
+
+    A run joins the current tier unless its intervals are separated from those of
+    the tier's first (fastest) member, in which case it opens the next tier. Runs
+    without intervals, such as failed ones, get no tier.
+    """
+    tiers: list[int | None] = []
+    tier = 0
+    leader: LatencyIntervals | None = None
+    for interval in intervals:
+        if interval is None:
+            tiers.append(None)
+            continue
+        if leader is None or interval.separated_from(leader):
+            tier += 1
+            leader = interval
+        tiers.append(tier)
+    return tiers
+
+
+class LatencySample(Protocol):
+    """The parts of a query measurement the latency matrix reads."""
+
+    domain: str
+    success: bool
+    latency_ms: float | None
+
+
+@dataclass(frozen=True)
+class PairedComparison:
+    """Per-domain comparison of one resolver against a baseline over the names both answered.
+
+    Deltas are ``resolver - baseline``, so a negative median means the resolver
+    was faster on the typical name.
+    """
+
+    resolver: str
+    baseline: str
+    paired_domains: int
+    median_delta_ms: float | None
+    mean_delta_ms: float | None
+    # Percentage of paired names where the resolver answered strictly faster than the baseline.
+    win_rate: float
+
+    def summary_line(self) -> str:
+        """Return a compact description such as ``DoH +3.1 ms/name vs Do53, faster on 22%``."""
+        if self.median_delta_ms is None:
+            return f"{self.resolver} has no names in common with {self.baseline}"
+        return (
+            f"{self.resolver} {self.median_delta_ms:+.1f} ms/name vs {self.baseline}, "
+            f"faster on {self.win_rate:.0f}%"
+        )
+
+
+class LatencyMatrix:
+    """Domain x resolver latency table backed by one flat ``array('d')``.
+
+    Each resolver's column is contiguous, so pairing two resolvers only walks two
+    slices. Missing cells (failed or unmeasured names) hold NaN. A name measured
+    several times by one resolver keeps the median of its successful latencies.
+    """
+
+    def __init__(self, domains: list[str], resolvers: list[str]):
+        self.domains = list(domains)
+        self.resolvers = list(resolvers)
+        self._domain_index = {domain: index for index, domain in enumerate(self.domains)}
+        self._resolver_index = {resolver: index for index, resolver in enumerate(self.resolvers)}
+        self._cells = array("d", [math.nan]) * (len(self.domains) * len(self.resolvers))
+
+    @classmethod
+    def from_measurements(cls, runs: dict[str, Iterable[LatencySample]]) -> LatencyMatrix:
+        """Build the matrix from the measurements each resolver collected over the same corpus."""
+        samples: dict[str, dict[str, list[float]]] = {}
+        domains: dict[str, None] = {}
+        for resolver, measurements in runs.items():
+            per_domain = samples.setdefault(resolver, {})
+            for measurement in measurements:
+                domains.setdefault(measurement.domain, None)
+                if measurement.success and measurement.latency_ms is not None:
+                    per_domain.setdefault(measurement.domain, []).append(measurement.latency_ms)
+
+        matrix = cls(list(domains), list(runs))
+        for resolver, per_domain in samples.items():
+            for domain, latencies in per_domain.items():
+                matrix.set(domain, resolver, statistics.median(latencies))
+        return matrix
+
+    def _offset(self, domain: str, resolver: str) -> int:
+        """Return the flat index of one cell."""
+        return self._resolver_index[resolver] * len(self.domains) + self._domain_index[domain]
+
+    def set(self, domain: str, resolver: str, latency_ms: float) -> None:
+        """Store the latency of one name for one resolver."""
+        self._cells[self._offset(domain, resolver)] = latency_ms
+
+    def get(self, domain: str, resolver: str) -> float | None:
+        """Return the stored latency, or None when the cell is missing."""
+        value = self._cells[self._offset(domain, resolver)]
+        return None if math.isnan(value) else value
+
+    def column(self, resolver: str) -> array:
+        """Return one resolver's latencies in domain order, with NaN for missing names."""
+        start = self._resolver_index[resolver] * len(self.domains)
+        return self._cells[start:start + len(self.domains)]
+
+    def compare(self, resolver: str, baseline: str) -> PairedComparison:
+        """Pair two resolvers on the names both answered and summarize the per-name deltas."""
+        deltas = [
+            candidate - reference
+            for candidate, reference in zip(self.column(resolver), self.column(baseline))
+            if not math.isnan(candidate) and not math.isnan(reference)
+        ]
+        if not deltas:
+            return PairedComparison(resolver, baseline, 0, None, None, 0.0)
+        wins = sum(1 for delta in deltas if delta < 0.0)
+        return PairedComparison(
+            resolver=resolver,
+            baseline=baseline,
+            paired_domains=len(deltas),
+            median_delta_ms=statistics.median(deltas),
+            mean_delta_ms=statistics.fmean(deltas),
+            win_rate=(wins / len(deltas)) * 100.0,
+        )
+
+    def compare_all(self, baseline: str) -> list[PairedComparison]:
+        """Compare every other resolver against the baseline."""
+        return [self.compare(resolver, baseline) for resolver in self.resolvers if resolver != baseline]
+
+
+def _resample_python(values: list[float], resamples: int, seed: int) -> tuple[list[float], list[float]]:
+    """Draw bootstrap resamples one at a time and return their means and p95 values."""
+    generator = random.Random(seed)
+    count = len(values)
+    means: list[float] = []
+    tails: list[float] = []
+    for _ in range(resamples):
+        sample = generator.choices(values, k=count)
+        means.append(statistics.fmean(sample))
+        tails.append(percentile(sample, 95.0))
+    return means, tails
+
+
+def _resample_vectorized(values: list[float], resamples: int, seed: int) -> tuple[list[float], list[float]]:
+    """Draw bootstrap resamples as index matrices and reduce them with numpy in blocks."""
+    generator = numpy.random.default_rng(seed)
+    data = numpy.asarray(values, dtype=numpy.float64)
+    count = len(values)
+    # Same nearest-rank position that percentile() uses.
+    tail_index = min(max(math.ceil(count * 0.95) - 1, 0), count - 1)
+    block_rows = max(1, RESAMPLE_BLOCK_VALUES // count)
+    means: list[float] = []
+    tails: list[float] = []
+    for block_start in range(0, resamples, block_rows):
+        rows = min(block_rows, resamples - block_start)
+        samples = data[generator.integers(0, count, size=(rows, count))]
+        means.extend(samples.mean(axis=1).tolist())
+        tails.extend(numpy.partition(samples, tail_index, axis=1)[:, tail_index].tolist())
+    return means, tails
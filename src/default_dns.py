@@ -53,6 +53,16 @@ DEFAULT_DNS: list[DefaultDnsEntry] = [
         "tls_hostname": None,
         "doh_method": "POST",
     },
+    {
+        "id": "cloudflare-doh3",
+        "provider_name": "Cloudflare",
+        "profile_name": "Default",
+        "regions": ["US"],
+        "target": "https://cloudflare-dns.com/dns-query",
+        "transport": "DoH3",
+        "tls_hostname": None,
+        "doh_method": "POST",
+    },
     {
         "id": "dns4eu-noads-do53",
         "provider_name": "DNS4EU",
@@ -113,6 +123,16 @@ DEFAULT_DNS: list[DefaultDnsEntry] = [
         "tls_hostname": None,
         "doh_method": "POST",
     },
+    {
+        "id": "adguard-filtered-doq",
+        "provider_name": "AdGuard",
+        "profile_name": "Default Filtering",
+        "regions": ["EU", "CY"],
+        "target": "dns.adguard-dns.com",
+        "transport": "DoQ",
+        "tls_hostname": None,
+        "doh_method": "POST",
+    },
     {
         "id": "controld-filtered",
         "provider_name": "ControlD",
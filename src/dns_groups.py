@@ -14,7 +14,9 @@ from .dns_store import DnsEntry
 TRANSPORT_ORDER = {
     "Do53": 0,
     "DoT": 1,
-    "DoH": 2,
+    "DoQ": 2,
+    "DoH": 3,
+    "DoH3": 4,
 }
 
 
@@ -0,0 +1,371 @@
+# idle_probe.py
+#
+# Probe how long a resolver keeps an idle DoT or DoH connection open.
+# Every idle interval gets its own connection so all intervals run at once
+# and the probe takes about as long as its longest interval.
+
+from __future__ import annotations
+
+import asyncio
+import json
+import ssl
+import time
+from dataclasses import asdict
+from dataclasses import dataclass
+from dataclasses import field
+from dataclasses import replace
+from typing import Literal
+
+import dns.edns
+import dns.message
+import dns.rcode
+
+from .benchmark import BenchmarkCancellation
+from .benchmark import BenchmarkOptions
+from .benchmark import DoHClient
+from .benchmark import DoTWorker
+from .benchmark import ProgressCallback
+from .benchmark import ResolverEndpoint
+from .benchmark import finish_shielded
+from .benchmark import run_with_event_loop
+from .benchmark import uncancel_current_task
+
+IdleOutcome = Literal["alive", "eof", "reset", "reconnect", "timeout", "error"]
+
+# Idle intervals cover common server settings, from aggressive 1-2 s limits to two-minute pools.
+DEFAULT_IDLE_INTERVALS_SECONDS = (1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+# An advertised edns-tcp-keepalive timeout is checked just inside and just outside its value.
+KEEPALIVE_BRACKET = (0.9, 1.1)
+# The edns-tcp-keepalive timeout is carried in units of 100 milliseconds (RFC 7828).
+KEEPALIVE_UNIT_SECONDS = 0.1
+
+
+@dataclass
+class IdleProbeStep:
+    """What happened to one connection after it sat idle for a fixed time."""
+
+    idle_seconds: float
+    outcome: IdleOutcome
+    # Latency of the query sent after the idle period, when it was answered.
+    latency_ms: float | None = None
+    error: str | None = None
+
+    @property
+    def alive(self) -> bool:
+        """Return whether the original connection answered after the idle period."""
+        return self.outcome == "alive"
+
+
+@dataclass
+class IdleProbeResult:
+    """Effective idle timeout of one DoT or DoH endpoint.
+
+    The timeout lies between the longest interval the connection survived and
+    the shortest one it did not. Servers that close inconsistently can leave
+    alive steps above the first closed one; the bounds only use the first close.
+    """
+
+    name: str
+    transport: str
+    target: str
+    steps: list[IdleProbeStep] = field(default_factory=list)
+    # Idle timeout the server advertised through edns-tcp-keepalive, DoT only.
+    advertised_keepalive_seconds: float | None = None
+    idle_timeout_lower_seconds: float | None = None
+    idle_timeout_upper_seconds: float | None = None
+    error: str | None = None
+    cancelled: bool = False
+
+    def summary_line(self) -> str:
+        """Return a compact description of the measured idle timeout."""
+        if self.error:
+            return self.error
+        if self.idle_timeout_upper_seconds is None:
+            kept = self.idle_timeout_lower_seconds or 0.0
+            summary = f"kept idle connections for at least {kept:g} s"
+        elif self.idle_timeout_lower_seconds is None:
+            summary = f"closed idle connections within {self.idle_timeout_upper_seconds:g} s"
+        else:
+            summary = (
+                f"idle timeout between {self.idle_timeout_lower_seconds:g} s "
+                f"and {self.idle_timeout_upper_seconds:g} s"
+            )
+        if self.advertised_keepalive_seconds is not None:
+            summary += f" (advertised {self.advertised_keepalive_seconds:g} s)"
+        if self.cancelled:
+            summary += " | cancelled"
+        return summary
+
+    def to_json(self) -> str:
+        """Serialize the probe result for export."""
+        return json.dumps(asdict(self), indent=2, sort_keys=True)
+
+
+def _keepalive_query(domain: str, query_type: str) -> dns.message.QueryMessage:
+    """Create a question that asks a DoT server for its idle timeout (RFC 7828)."""
+    return dns.message.make_query(
+        domain,
+        query_type,
+        use_edns=0,
+        options=[dns.edns.GenericOption(dns.edns.OptionType.KEEPALIVE, b"")],
+    )
+
+
+def _advertised_keepalive(response: dns.message.Message) -> float | None:
+    """Return the edns-tcp-keepalive timeout of a response in seconds, if the server sent one."""
+    for option in response.options:
+        if option.otype == dns.edns.OptionType.KEEPALIVE:
+            data = option.to_wire() or b""
+            if len(data) == 2:
+                return int.from_bytes(data, "big") * KEEPALIVE_UNIT_SECONDS
+    return None
+
+
+def _doh_close_outcome(error: str | None) -> IdleOutcome:
+    """Classify a failed DoH request on an idled connection.
+
+    A GOAWAY surfaces as ``RemoteProtocolError``, while a socket the server closed
+    or reset without one fails the read or write of the reused connection.
+    """
+    if error is None:
+        return "error"
+    if error.startswith("RemoteProtocolError"):
+        return "eof"
+    if error.startswith(("ReadError", "WriteError")):
+        return "reset"
+    if "Timeout" in error:
+        return "timeout"
+    return "error"
+
+
+class IdleProbeRunner:
+    """Hold one connection idle per interval and check whether it still answers."""
+
+    def __init__(
+        self,
+        endpoint: ResolverEndpoint,
+        domain: str,
+        options: BenchmarkOptions,
+        intervals: tuple[float, ...] = DEFAULT_IDLE_INTERVALS_SECONDS,
+        progress_callback: ProgressCallback | None = None,
+    ):
+        self.endpoint = endpoint
+        self.domain = domain
+        self.options = options
+        self.intervals = sorted(set(intervals))
+        self.progress_callback = progress_callback
+        self.result = IdleProbeResult(name=endpoint.name, transport=endpoint.transport, target=endpoint.target)
+        self._completed = 0
+        self._doh_clients: list[DoHClient] = []
+        self._writers: list[asyncio.StreamWriter] = []
+
+    def _progress(self, detail: str) -> None:
+        """Report one finished interval."""
+        self._completed += 1
+        if self.progress_callback is not None:
+            self.progress_callback("idle", self._completed, len(self.intervals), detail)
+
+    async def _open_dot(self) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        """Open a TLS stream the way the DoT worker does."""
+        worker = DoTWorker(self.endpoint, self.options)
+        ssl_context = ssl.create_default_context()
+        if worker.server_hostname is None:
+            ssl_context.check_hostname = False
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(
+                host=worker.connect_address,
+                port=853,
+                ssl=ssl_context,
+                server_hostname=worker.server_hostname,
+            ),
+            timeout=self.options.timeout_seconds,
+        )
+        self._writers.append(writer)
+        return reader, writer
+
+    async def _exchange_dot(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ) -> tuple[dns.message.Message, float]:
+        """Send one keepalive-tagged query on an open stream and return the answer and its latency."""
+        started = time.perf_counter()
+        writer.write(_keepalive_query(self.domain, self.options.query_type).to_wire(prepend_length=True))
+        await asyncio.wait_for(writer.drain(), timeout=self.options.timeout_seconds)
+        size_data = await asyncio.wait_for(reader.readexactly(2), timeout=self.options.timeout_seconds)
+        wire = await asyncio.wait_for(reader.readexactly(int.from_bytes(size_data, "big")), timeout=self.options.timeout_seconds)
+        return dns.message.from_wire(wire), (time.perf_counter() - started) * 1000.0
+
+    async def _advertised_dot_keepalive(self) -> float | None:
+        """Ask a short-lived connection for the server's advertised idle timeout."""
+        reader, writer = await self._open_dot()
+        try:
+            response, _latency_ms = await self._exchange_dot(reader, writer)
+        finally:
+            writer.close()
+        return _advertised_keepalive(response)
+
+    async def _probe_dot(self, idle_seconds: float) -> IdleProbeStep:
+        """Idle a DoT connection, then tell a server-side close apart from a live stream."""
+        try:
+            reader, writer = await self._open_dot()
+            await self._exchange_dot(reader, writer)
+        except Exception as error:
+            return IdleProbeStep(idle_seconds, "error", error=f"{type(error).__name__}: {error}")
+
+        await asyncio.sleep(idle_seconds)
+        try:
+            if reader.at_eof():
+                return IdleProbeStep(idle_seconds, "eof")
+            response, latency_ms = await self._exchange_dot(reader, writer)
+        except asyncio.IncompleteReadError:
+            return IdleProbeStep(idle_seconds, "eof")
+        except (ConnectionResetError, BrokenPipeError) as error:
+            return IdleProbeStep(idle_seconds, "reset", error=f"{type(error).__name__}: {error}")
+        except asyncio.TimeoutError:
+            # Silence after idling means the server or a middlebox dropped the state without telling the client.
+            return IdleProbeStep(idle_seconds, "timeout")
+        except Exception as error:
+            return IdleProbeStep(idle_seconds, "error", error=f"{type(error).__name__}: {error}")
+        finally:
+            writer.close()
+        if response.rcode() != dns.rcode.NOERROR:
+            return IdleProbeStep(idle_seconds, "error", latency_ms, dns.rcode.to_text(response.rcode()))
+        return IdleProbeStep(idle_seconds, "alive", latency_ms)
+
+    async def _probe_doh(self, idle_seconds: float) -> IdleProbeStep:
+        """Idle a single pooled DoH connection and check whether the next request had to redial."""
+        # One connection, and a client-side keep-alive that outlives the interval, so only the server can close it.
+        client = DoHClient(
+            self.endpoint,
+            replace(
+                self.options,
+                connection_reuse=True,
+                doh_max_connections=1,
+                doh_keepalive_expiry_seconds=idle_seconds + self.options.timeout_seconds + 60.0,
+            ),
+        )
+        self._doh_clients.append(client)
+        first = await client.query(self.domain, self.options.query_type)
+        if not first.success:
+            return IdleProbeStep(idle_seconds, "error", error=first.error)
+
+        await asyncio.sleep(idle_seconds)
+        connections_before = client.pool_statistics.connections_opened
+        measurement = await client.query(self.domain, self.options.query_type)
+        if not measurement.success:
+            return IdleProbeStep(idle_seconds, _doh_close_outcome(measurement.error), error=measurement.error)
+        if client.pool_statistics.connections_opened > connections_before:
+            # The pool noticed a GOAWAY or a closed socket and dialed again.
+            return IdleProbeStep(idle_seconds, "reconnect", measurement.latency_ms)
+        return IdleProbeStep(idle_seconds, "alive", measurement.latency_ms)
+
+    async def _probe(self, idle_seconds: float) -> IdleProbeStep:
+        """Probe one interval and report it as done."""
+        if self.endpoint.transport == "DoT":
+            step = await self._probe_dot(idle_seconds)
+        else:
+            step = await self._probe_doh(idle_seconds)
+        self.result.steps.append(step)
+        self._progress(f"{idle_seconds:g} s idle: {step.outcome}")
+        return step
+
+    def _finish(self) -> IdleProbeResult:
+        """Order the steps and derive the idle timeout bounds from the first close."""
+        self.result.steps.sort(key=lambda step: step.idle_seconds)
+        closed = next((step for step in self.result.steps if step.outcome not in ("alive", "error")), None)
+        self.result.idle_timeout_upper_seconds = closed.idle_seconds if closed is not None else None
+        alive = [
+            step.idle_seconds
+            for step in self.result.steps
+            if step.alive and (closed is None or step.idle_seconds < closed.idle_seconds)
+        ]
+        self.result.idle_timeout_lower_seconds = max(alive) if alive else None
+        if not alive and closed is None:
+            self.result.error = next((step.error for step in self.result.steps if step.error), "no interval could be probed")
+        return self.result
+
+    async def run(self) -> IdleProbeResult:
+        """Read any advertised keepalive, probe every interval at once, and derive the idle timeout."""
+        if self.endpoint.transport not in ("DoT", "DoH"):
+            self.result.error = f"idle probing supports DoT and DoH, not {self.endpoint.transport}"
+            return self.result
+        try:
+            if self.endpoint.transport == "DoT":
+                try:
+                    self.result.advertised_keepalive_seconds = await self._advertised_dot_keepalive()
+                except Exception as error:
+                    self.result.error = f"{type(error).__name__}: {error}"
+                    return self.result
+                if self.result.advertised_keepalive_seconds:
+                    self.intervals = sorted(
+                        set(self.intervals)
+                        | {round(self.result.advertised_keepalive_seconds * factor, 1) for factor in KEEPALIVE_BRACKET}
+                    )
+            await asyncio.gather(*(self._probe(idle_seconds) for idle_seconds in self.intervals))
+        except asyncio.CancelledError:
+            uncancel_current_task()
+            return self.cancelled_result()
+        return self._finish()
+
+    def cancelled_result(self) -> IdleProbeResult:
+        """Derive what the intervals probed before the cancel can tell."""
+        self.result.cancelled = True
+        return self._finish()
+
+    async def close(self) -> None:
+        """Close every connection the probe opened."""
+        for writer in self._writers:
+            writer.close()
+        for client in self._doh_clients:
+            await client.close()
+
+
+async def run_idle_probe(
+    endpoint: ResolverEndpoint,
+    domain: str,
+    options: BenchmarkOptions,
+    intervals: tuple[float, ...] = DEFAULT_IDLE_INTERVALS_SECONDS,
+    progress_callback: ProgressCallback | None = None,
+    cancellation: BenchmarkCancellation | None = None,
+) -> IdleProbeResult:
+    """Async entry point for idle-connection probing."""
+    runner = IdleProbeRunner(endpoint, domain, options, intervals, progress_callback)
+    task = asyncio.current_task()
+    if cancellation is not None and task is not None:
+        cancellation.attach(task)
+    try:
+        return await runner.run()
+    except asyncio.CancelledError:
+        # run() absorbs one cancellation; a cancel from outside that arrives while it unwinds ends up here.
+        uncancel_current_task()
+        return runner.cancelled_result()
+    finally:
+        if cancellation is not None and task is not None:
+            cancellation.detach(task)
+        await finish_shielded(runner.close())
+
+
+def run_idle_probe_sync(
+    endpoint: ResolverEndpoint,
+    domain: str,
+    options: BenchmarkOptions,
+    intervals: tuple[float, ...] = DEFAULT_IDLE_INTERVALS_SECONDS,
+    progress_callback: ProgressCallback | None = None,
+    cancellation: BenchmarkCancellation | None = None,
+) -> IdleProbeResult:
+    """Synchronous wrapper so the GTK code can run an idle probe from a thread."""
+    try:
+        return run_with_event_loop(
+            run_idle_probe(endpoint, domain, options, intervals, progress_callback, cancellation),
+            options.event_loop,
+        )
+    except asyncio.CancelledError:
+        # CancelledError is a BaseException and would otherwise kill the calling thread.
+        return IdleProbeResult(
+            name=endpoint.name,
+            transport=endpoint.transport,
+            target=endpoint.target,
+            error="probe cancelled",
+            cancelled=True,
+        )
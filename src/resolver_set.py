@@ -0,0 +1,414 @@
+# resolver_set.py
+#
+# Composite benchmark for stub configurations with several upstream resolvers.
+# Each upstream keeps its own warm benchmark runner; this module only decides
+# which upstream answers each query, the way a stub resolver would.
+
+from __future__ import annotations
+
+import asyncio
+import json
+import statistics
+import time
+from dataclasses import asdict
+from dataclasses import dataclass
+from dataclasses import field
+from typing import Literal
+
+from .benchmark import BenchmarkCancellation
+from .benchmark import BenchmarkOptions
+from .benchmark import BenchmarkRunner
+from .benchmark import ProgressCallback
+from .benchmark import QueryMeasurement
+from .benchmark import ResolverEndpoint
+from .benchmark import finish_shielded
+from .benchmark import run_with_event_loop
+from .benchmark import uncancel_current_task
+from .benchmark_stats import percentile
+
+ResolverSetStrategy = Literal["race", "failover", "round-robin", "fastest-srtt"]
+RESOLVER_SET_STRATEGIES: tuple[ResolverSetStrategy, ...] = ("race", "failover", "round-robin", "fastest-srtt")
+
+# Failover waits this long for one upstream before moving to the next, like a stub's per-server timeout.
+DEFAULT_FAILOVER_TIMEOUT_SECONDS = 1.0
+# SRTT selection uses the same smoothing gain as TCP and lets idle upstreams drift back into contention.
+SRTT_ALPHA = 1.0 / 8.0
+SRTT_DECAY = 0.98
+# Error rcodes that mean the upstream could not answer, so a stub moves on to the next one.
+FAILOVER_RCODES = ("SERVFAIL", "REFUSED")
+
+
+@dataclass
+class UpstreamShare:
+    """How one upstream of the set was used during the measured phase."""
+
+    name: str
+    transport: str
+    target: str
+    queries: int = 0
+    wins: int = 0
+    failures: int = 0
+    srtt_ms: float | None = None
+    # Percentage of the set's successful answers that came from this upstream.
+    win_share: float = 0.0
+    error: str | None = None
+
+
+@dataclass
+class ResolverSetResult:
+    """Effective latency seen by a stub that spreads one corpus over several upstreams."""
+
+    strategy: ResolverSetStrategy
+    concurrency: int
+    average_latency_ms: float | None
+    p50_latency_ms: float | None
+    p95_latency_ms: float | None
+    p99_latency_ms: float | None
+    success_rate: float
+    successful_queries: int
+    total_queries: int
+    error: str | None = None
+    cancelled: bool = False
+    upstreams: list[UpstreamShare] = field(default_factory=list)
+    measurements: list[QueryMeasurement] = field(default_factory=list)
+
+    def summary_line(self) -> str:
+        """Return a compact line comparable with single-resolver summaries."""
+        if self.error:
+            return self.error
+        return (
+            f"{self.strategy} | avg {self.average_latency_ms:.1f} ms | "
+            f"p95 {self.p95_latency_ms:.1f} ms | p99 {self.p99_latency_ms:.1f} ms | "
+            f"success {self.success_rate:.0f}%"
+        )
+
+    def share_line(self) -> str:
+        """Return the win share of every upstream."""
+        return " | ".join(f"{share.name} {share.win_share:.0f}%" for share in self.upstreams)
+
+    def to_json(self) -> str:
+        """Serialize the result without raw DNS wire payloads."""
+        payload = asdict(self)
+        for measurement in payload["measurements"]:
+            response_wire = measurement.pop("response_wire", None)
+            measurement["response_size_bytes"] = len(response_wire) if response_wire is not None else None
+        return json.dumps(payload, indent=2, sort_keys=True)
+
+
+def _fails_over(measurement: QueryMeasurement) -> bool:
+    """Return whether a stub would try the next upstream after this attempt.
+
+    Timeouts and transport errors carry no answer, and SERVFAIL or REFUSED
+    say the upstream could not help. NXDOMAIN and other negative answers are
+    real answers to the query and end it.
+    """
+    if measurement.success:
+        return False
+    return measurement.response_wire is None or measurement.error in FAILOVER_RCODES
+
+
+def _no_upstream(domain: str) -> QueryMeasurement:
+    """Return the failure of a query that had no usable upstream to go to."""
+    return QueryMeasurement(domain=domain, success=False, error="no upstream available")
+
+
+class _Upstream:
+    """One member of the set: its warm runner plus the state the strategies need."""
+
+    def __init__(self, runner: BenchmarkRunner):
+        self.runner = runner
+        self.share = UpstreamShare(
+            name=runner.endpoint.name,
+            transport=runner.endpoint.transport,
+            target=runner.endpoint.target,
+        )
+        self.available = False
+        self.srtt_ms: float | None = None
+        # A race leg that lost may still hold a slot's worker, so the next leg on that slot waits for it.
+        self.slot_locks: dict[int, asyncio.Lock] = {}
+
+    def record(self, cost_ms: float, answered: bool) -> None:
+        """Update the smoothed RTT, charging failures the time they cost."""
+        if not answered:
+            self.share.failures += 1
+        if self.srtt_ms is None:
+            self.srtt_ms = cost_ms
+        else:
+            self.srtt_ms += SRTT_ALPHA * (cost_ms - self.srtt_ms)
+        self.share.srtt_ms = self.srtt_ms
+
+
+class ResolverSetRunner:
+    """Run one corpus through several upstreams with a stub-resolver selection strategy.
+
+    ``race`` sends every query to all upstreams and keeps the first successful
+    answer; the slower upstreams still finish in the background. ``failover``
+    always starts with the first upstream and moves on after a timeout, a
+    transport error, SERVFAIL, or REFUSED. ``round-robin`` rotates the starting
+    upstream per query and fails over from there. ``fastest-srtt`` starts with the
+    upstream that has the lowest smoothed RTT and lets the others decay back into
+    contention.
+    """
+
+    def __init__(
+        self,
+        endpoints: list[ResolverEndpoint],
+        domains: list[str],
+        options: BenchmarkOptions,
+        strategy: ResolverSetStrategy,
+        failover_timeout_seconds: float = DEFAULT_FAILOVER_TIMEOUT_SECONDS,
+        progress_callback: ProgressCallback | None = None,
+    ):
+        if not endpoints:
+            raise ValueError("a resolver set needs at least one endpoint")
+        self.domains = domains
+        self.options = options
+        self.strategy = strategy
+        self.failover_timeout_seconds = failover_timeout_seconds
+        self.progress_callback = progress_callback
+        self.upstreams = [_Upstream(BenchmarkRunner(endpoint, domains, options)) for endpoint in endpoints]
+        self._measurements: list[QueryMeasurement | None] = []
+        self._next_start = 0
+        self._race_legs: set[asyncio.Task] = set()
+
+    def _progress(self, phase: str, current: int, total: int, detail: str) -> None:
+        """Forward progress to the UI when a callback was provided."""
+        if self.progress_callback is not None:
+            self.progress_callback(phase, current, total, detail)
+
+    async def _prepare(self) -> str | None:
+        """Preflight and warm every upstream; the set works as long as one of them does."""
+        self._progress("preflight", 0, len(self.upstreams), "Upstream preflight")
+        errors = await asyncio.gather(*(upstream.runner.prepare() for upstream in self.upstreams))
+        for upstream, error in zip(self.upstreams, errors):
+            upstream.available = error is None
+            upstream.share.error = error
+        if not any(upstream.available for upstream in self.upstreams):
+            return "preflight failed for every upstream"
+        return None
+
+    def _attempt_order(self) -> list[_Upstream]:
+        """Return the upstreams in the order the strategy tries them for the next query."""
+        available = [upstream for upstream in self.upstreams if upstream.available]
+        if not available:
+            return []
+        if self.strategy == "round-robin":
+            start = self._next_start % len(available)
+            self._next_start += 1
+            return available[start:] + available[:start]
+        if self.strategy == "fastest-srtt":
+            # Untried upstreams sort first so every member gets measured at least once.
+            ordered = sorted(available, key=lambda upstream: -1.0 if upstream.srtt_ms is None else upstream.srtt_ms)
+            for upstream in ordered[1:]:
+                if upstream.srtt_ms is not None:
+                    upstream.srtt_ms *= SRTT_DECAY
+            return ordered
+        return available
+
+    def _attempt_cost_ms(self, measurement: QueryMeasurement, elapsed_ms: float) -> float:
+        """Return the time an attempt cost the stub, charging failures the wall-clock time including retries."""
+        if not _fails_over(measurement) and measurement.latency_ms is not None:
+            return measurement.latency_ms
+        return elapsed_ms
+
+    async def _race_leg(self, upstream: _Upstream, domain: str, slot: int, started: float) -> QueryMeasurement:
+        """Run one upstream's part of a race and record its outcome, even when another upstream already won.
+
+        The returned latency counts from the start of the race, so a leg that
+        had to wait for its slot's worker is charged that wait.
+        """
+        upstream.share.queries += 1
+        async with upstream.slot_locks.setdefault(slot, asyncio.Lock()):
+            leg_started = time.perf_counter()
+            measurement = await upstream.runner.query(domain, slot)
+        leg_ms = (time.perf_counter() - leg_started) * 1000.0
+        upstream.record(self._attempt_cost_ms(measurement, leg_ms), not _fails_over(measurement))
+        measurement.upstream = upstream.share.name
+        if measurement.latency_ms is not None:
+            measurement.latency_ms += (leg_started - started) * 1000.0
+        return measurement
+
+    async def _race(self, domain: str, slot: int) -> QueryMeasurement:
+        """Query every upstream at once and return as soon as one of them answers successfully."""
+        available = [upstream for upstream in self.upstreams if upstream.available]
+        if not available:
+            return _no_upstream(domain)
+        started = time.perf_counter()
+        pending: set[asyncio.Task] = set()
+        legs: dict[asyncio.Task, _Upstream] = {}
+        for upstream in available:
+            leg = asyncio.ensure_future(self._race_leg(upstream, domain, slot, started))
+            leg.add_done_callback(self._race_legs.discard)
+            self._race_legs.add(leg)
+            pending.add(leg)
+            legs[leg] = upstream
+        failures: list[QueryMeasurement] = []
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            answers = [(legs[leg], leg.result()) for leg in done]
+            successful = [(upstream, measurement) for upstream, measurement in answers if measurement.success]
+            if successful:
+                upstream, measurement = min(successful, key=lambda answer: answer[1].latency_ms or 0.0)
+                upstream.share.wins += 1
+                return measurement
+            failures.extend(measurement for _upstream, measurement in answers)
+        # Nothing succeeded: a negative answer is more telling than a transport error.
+        return next((measurement for measurement in failures if not _fails_over(measurement)), failures[-1])
+
+    async def _failover(self, domain: str, slot: int) -> QueryMeasurement:
+        """Try upstreams one after another until one answers, charging every failed attempt to the query."""
+        timeout = min(self.failover_timeout_seconds, self.options.timeout_seconds)
+        elapsed_ms = 0.0
+        measurement: QueryMeasurement | None = None
+        for upstream in self._attempt_order():
+            upstream.share.queries += 1
+            started = time.perf_counter()
+            measurement = await upstream.runner.query(domain, slot, timeout)
+            cost_ms = self._attempt_cost_ms(measurement, (time.perf_counter() - started) * 1000.0)
+            upstream.record(cost_ms, not _fails_over(measurement))
+            elapsed_ms += cost_ms
+            measurement.upstream = upstream.share.name
+            if measurement.success:
+                upstream.share.wins += 1
+            if not _fails_over(measurement):
+                break
+        if measurement is None:
+            return _no_upstream(domain)
+        if not _fails_over(measurement):
+            measurement.latency_ms = elapsed_ms
+        return measurement
+
+    async def _measure(self) -> list[QueryMeasurement]:
+        """Run the corpus through the strategy with the configured concurrency."""
+        queue: asyncio.Queue[tuple[int, str]] = asyncio.Queue()
+        for index, domain in enumerate(self.domains):
+            queue.put_nowait((index, domain))
+        self._measurements = [None] * len(self.domains)
+        measurements = self._measurements
+        resolve = self._race if self.strategy == "race" else self._failover
+
+        async def set_worker(slot: int) -> None:
+            """Resolve queued domains, each slot using the matching worker of every upstream."""
+            while True:
+                try:
+                    index, domain = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                self._progress("measure", index + 1, len(self.domains), domain)
+                measurements[index] = await resolve(domain, slot)
+                queue.task_done()
+
+        slot_count = min(self.options.concurrency, max(len(self.domains), 1))
+        await asyncio.gather(*(set_worker(slot) for slot in range(slot_count)))
+        return [measurement for measurement in measurements if measurement is not None]
+
+    def _build_result(
+        self,
+        measurements: list[QueryMeasurement],
+        error: str | None = None,
+        cancelled: bool = False,
+    ) -> ResolverSetResult:
+        """Summarize the effective latency distribution and the win share of each upstream."""
+        latencies = [measurement.latency_ms for measurement in measurements if measurement.success and measurement.latency_ms is not None]
+        if error is None and not latencies:
+            error = "benchmark cancelled" if cancelled else "no successful responses"
+        for upstream in self.upstreams:
+            upstream.share.win_share = (upstream.share.wins / len(latencies)) * 100.0 if latencies else 0.0
+        return ResolverSetResult(
+            strategy=self.strategy,
+            concurrency=self.options.concurrency,
+            average_latency_ms=statistics.fmean(latencies) if latencies else None,
+            p50_latency_ms=percentile(latencies, 50.0) if latencies else None,
+            p95_latency_ms=percentile(latencies, 95.0) if latencies else None,
+            p99_latency_ms=percentile(latencies, 99.0) if latencies else None,
+            success_rate=(len(latencies) / len(measurements)) * 100.0 if measurements else 0.0,
+            successful_queries=len(latencies),
+            total_queries=len(measurements) if measurements or cancelled else len(self.domains),
+            error=error,
+            cancelled=cancelled,
+            upstreams=[upstream.share for upstream in self.upstreams],
+            measurements=measurements,
+        )
+
+    def cancelled_result(self) -> ResolverSetResult:
+        """Summarize the queries that finished before the run was cancelled."""
+        for leg in self._race_legs:
+            leg.cancel()
+        partial = [measurement for measurement in self._measurements if measurement is not None]
+        return self._build_result(partial, cancelled=True)
+
+    async def run(self) -> ResolverSetResult:
+        """Prepare every upstream, run the measured phase, and return a partial result when cancelled."""
+        try:
+            preflight_error = await self._prepare()
+            if preflight_error:
+                return self._build_result([], error=preflight_error)
+            measurements = await self._measure()
+        except asyncio.CancelledError:
+            uncancel_current_task()
+            return self.cancelled_result()
+        return self._build_result(measurements)
+
+    async def close(self) -> None:
+        """Let race legs that lost finish, then close the workers and pools of every upstream."""
+        await asyncio.gather(*self._race_legs, return_exceptions=True)
+        for upstream in self.upstreams:
+            await upstream.runner.close()
+
+
+async def run_resolver_set(
+    endpoints: list[ResolverEndpoint],
+    domains: list[str],
+    options: BenchmarkOptions,
+    strategy: ResolverSetStrategy,
+    failover_timeout_seconds: float = DEFAULT_FAILOVER_TIMEOUT_SECONDS,
+    progress_callback: ProgressCallback | None = None,
+    cancellation: BenchmarkCancellation | None = None,
+) -> ResolverSetResult:
+    """Async entry point for resolver-set benchmarks."""
+    runner = ResolverSetRunner(endpoints, domains, options, strategy, failover_timeout_seconds, progress_callback)
+    task = asyncio.current_task()
+    if cancellation is not None and task is not None:
+        cancellation.attach(task)
+    try:
+        return await runner.run()
+    except asyncio.CancelledError:
+        # run() absorbs one cancellation; a cancel from outside that arrives while it unwinds ends up here.
+        uncancel_current_task()
+        return runner.cancelled_result()
+    finally:
+        if cancellation is not None and task is not None:
+            cancellation.detach(task)
+        await finish_shielded(runner.close())
+
+
+def run_resolver_set_sync(
+    endpoints: list[ResolverEndpoint],
+    domains: list[str],
+    options: BenchmarkOptions,
+    strategy: ResolverSetStrategy,
+    failover_timeout_seconds: float = DEFAULT_FAILOVER_TIMEOUT_SECONDS,
+    progress_callback: ProgressCallback | None = None,
+    cancellation: BenchmarkCancellation | None = None,
+) -> ResolverSetResult:
+    """Synchronous wrapper so the GTK code can run a resolver set from a thread."""
+    try:
+        return run_with_event_loop(
+            run_resolver_set(endpoints, domains, options, strategy, failover_timeout_seconds, progress_callback, cancellation),
+            options.event_loop,
+        )
+    except asyncio.CancelledError:
+        # CancelledError is a BaseException and would otherwise kill the calling thread.
+        return ResolverSetResult(
+            strategy=strategy,
+            concurrency=options.concurrency,
+            average_latency_ms=None,
+            p50_latency_ms=None,
+            p95_latency_ms=None,
+            p99_latency_ms=None,
+            success_rate=0.0,
+            successful_queries=0,
+            total_queries=len(domains),
+            error="benchmark cancelled",
+            cancelled=True,
+        )
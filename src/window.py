@@ -17,20 +17,27 @@
 #
 # SPDX-License-Identifier: GPL-3.0-or-later
 
+import asyncio
 import ipaddress
 import threading
+from dataclasses import replace
 from urllib.parse import urlparse
 
+import dns.quic
 from gi.repository import Adw
 from gi.repository import GLib
 from gi.repository import GObject
 from gi.repository import Gtk
 
 from .aux import TOP_ES_WEBS
+from .benchmark import BenchmarkCancellation
 from .benchmark import BenchmarkResult
 from .benchmark import BenchmarkOptions
 from .benchmark import ResolverEndpoint
+from .benchmark import run_adaptive_benchmarks_sync
 from .benchmark import run_benchmark_sync
+from .benchmark_stats import LatencyMatrix
+from .benchmark_stats import ranking_tiers
 from .default_dns import DEFAULT_DNS
 from .dns_groups import DnsProfileGroup
 from .dns_groups import DnsProviderGroup
@@ -41,12 +48,29 @@ from .dns_groups import provider_sidebar_summary
 from .dns_groups import variant_display_name
 from .dns_store import DnsEntry
 from .dns_store import DnsStateStore
+from .idle_probe import IdleProbeResult
+from .idle_probe import run_idle_probe_sync
+from .resolver_set import RESOLVER_SET_STRATEGIES
+from .resolver_set import ResolverSetResult
+from .resolver_set import run_resolver_set_sync
 from .region_info import format_region_summary
 
-# Supported resolver transports exposed in the add-entry dialog.
-TRANSPORTS = ("Do53", "DoT", "DoH")
+# QUIC transports need dnspython's optional aioquic support.
+QUIC_TRANSPORTS = ("DoQ", "DoH3")
+# Supported resolver transports exposed in the add-entry dialog and the provider pages.
+TRANSPORTS = tuple(
+    transport
+    for transport in ("Do53", "DoT", "DoQ", "DoH", "DoH3")
+    if dns.quic.have_quic or transport not in QUIC_TRANSPORTS
+)
+# Transports addressed by an HTTPS URL rather than by a host.
+HTTPS_TRANSPORTS = ("DoH", "DoH3")
 # DoH RFC 8484 supports both POST and GET, while POST remains the default choice.
 DOH_METHODS = ("POST", "GET")
+# Transports whose idle-connection lifetime can be probed from a variant row.
+IDLE_PROBE_TRANSPORTS = ("DoT", "DoH")
+# Profile cards run their variants as a resolver set with failover preselected, as most stubs do.
+DEFAULT_RESOLVER_SET_STRATEGY = "failover"
 
 
 @Gtk.Template(resource_path='/es/neikon/dns_tester/window.ui')
@@ -74,13 +98,39 @@ class DnsTesterWindow(Adw.ApplicationWindow):
         self._printed_console_header = False
         # Benchmark settings stay in memory and are edited from the preferences dialog.
         self.cache_enabled = False
+        self.cache_simulation_enabled = False
+        self.cache_busting_enabled = False
+        self.ttl_analysis_enabled = False
+        self.site_identification_enabled = False
+        self.concurrency_sweep_enabled = False
+        self.circuit_breaker_enabled = False
+        self.throttle_backoff_enabled = False
+        self.adaptive_timeout_enabled = False
+        self.hedged_queries_enabled = False
+        self.adaptive_sampling_enabled = False
         self.concurrency_value = 10
         self.warmup_queries_value = 5
+        # Zero keeps the automatic DoH pool and server-controlled stream concurrency.
+        self.doh_connections_value = 0
+        self.doh_streams_value = 0
+        # Cold mode opens a new connection per query; resumption and Fast Open only apply to it.
+        self.cold_connections_enabled = False
+        self.tls_resumption_enabled = False
+        self.tcp_fast_open_enabled = False
+        # Kernel receive timestamps only change how Do53 answers are timed.
+        self.kernel_timestamps_enabled = False
+        # Harness checks: the lag monitor is cheap enough to stay on, freezing the GC is opt-in.
+        self.loop_lag_monitor_enabled = True
+        self.gc_freeze_enabled = False
+        # Profiling saves cProfile stats and top allocations of every run to the cache folder.
+        self.profiling_enabled = False
         self.preferences_dialog: Adw.Dialog | None = None
         # Batch state tracks a running "Check All" operation and its final ranking.
         self.check_all_batch_id = 0
         self.check_all_pending = 0
         self.check_all_results: list[tuple[str, object]] = []
+        self.check_all_cancellations: list[BenchmarkCancellation] = []
+        self.check_all_cancelled = False
         self.check_all_dialog: Adw.Dialog | None = None
         # DNS state is persisted separately from the bundled catalog.
         self.dns_store = DnsStateStore()
@@ -99,7 +149,9 @@ class DnsTesterWindow(Adw.ApplicationWindow):
         for provider_page in list(self.provider_pages.values()):
             self.provider_stack.remove(provider_page)
 
-        self.provider_groups = group_dns_providers(self.dns_store.load_entries(DEFAULT_DNS))
+        # Entries for transports this install cannot run stay stored but are not shown.
+        entries = [entry for entry in self.dns_store.load_entries(DEFAULT_DNS) if entry.transport in TRANSPORTS]
+        self.provider_groups = group_dns_providers(entries)
         self.provider_pages = {}
         self.provider_names = []
         self.group_rows = []
@@ -244,6 +296,76 @@ class DnsTesterWindow(Adw.ApplicationWindow):
         )
         benchmark_group.add(cache_row)
 
+        cache_simulation_row = Adw.SwitchRow(
+            title="Client Cache Simulation",
+            subtitle="Estimate how often a prefetching, serve-stale client cache would block on each resolver",
+            active=self.cache_simulation_enabled,
+        )
+        benchmark_group.add(cache_simulation_row)
+
+        cache_busting_row = Adw.SwitchRow(
+            title="Uncached Pass",
+            subtitle="Also resolve a random subdomain of every name to measure full recursion next to cached answers",
+            active=self.cache_busting_enabled,
+        )
+        benchmark_group.add(cache_busting_row)
+
+        ttl_analysis_row = Adw.SwitchRow(
+            title="Upstream Cache Analysis",
+            subtitle="Query every name twice and use answer TTLs to tell resolver cache hits from fresh recursion",
+            active=self.ttl_analysis_enabled,
+        )
+        benchmark_group.add(ttl_analysis_row)
+
+        site_identification_row = Adw.SwitchRow(
+            title="Anycast Site Identification",
+            subtitle="Ask for NSID on every query and id.server on every connection, then group latency per site",
+            active=self.site_identification_enabled,
+        )
+        benchmark_group.add(site_identification_row)
+
+        concurrency_sweep_row = Adw.SwitchRow(
+            title="Concurrency Sweep",
+            subtitle="Replay the names at 1, 2, 4, ... queries in flight and report where latency starts to climb",
+            active=self.concurrency_sweep_enabled,
+        )
+        benchmark_group.add(concurrency_sweep_row)
+
+        circuit_breaker_row = Adw.SwitchRow(
+            title="Circuit Breaker",
+            subtitle="Stop querying a resolver once most recent queries fail",
+            active=self.circuit_breaker_enabled,
+        )
+        benchmark_group.add(circuit_breaker_row)
+
+        throttle_backoff_row = Adw.SwitchRow(
+            title="Throttle Backoff",
+            subtitle="Halve the queries in flight when a resolver refuses or rate limits, and retry those queries once",
+            active=self.throttle_backoff_enabled,
+        )
+        benchmark_group.add(throttle_backoff_row)
+
+        adaptive_timeout_row = Adw.SwitchRow(
+            title="Adaptive Timeout",
+            subtitle="Derive each query timeout from the resolver's smoothed RTT instead of a fixed 3 s",
+            active=self.adaptive_timeout_enabled,
+        )
+        benchmark_group.add(adaptive_timeout_row)
+
+        hedged_queries_row = Adw.SwitchRow(
+            title="Hedged Queries",
+            subtitle="Send a duplicate query on another connection when an answer is slower than p95",
+            active=self.hedged_queries_enabled,
+        )
+        benchmark_group.add(hedged_queries_row)
+
+        adaptive_sampling_row = Adw.SwitchRow(
+            title="Adaptive Sampling",
+            subtitle="Let Check All stop each resolver once its place in the ranking is statistically settled",
+            active=self.adaptive_sampling_enabled,
+        )
+        benchmark_group.add(adaptive_sampling_row)
+
         concurrency_row, concurrency_spin = self._build_spin_row(
             "Concurrency",
             "Maximum number of workers used during the measured phase",
@@ -262,6 +384,73 @@ class DnsTesterWindow(Adw.ApplicationWindow):
         )
         benchmark_group.add(warmup_row)
 
+        doh_connections_row, doh_connections_spin = self._build_spin_row(
+            "DoH Connections",
+            "Fixed number of HTTP connections per DoH resolver, 0 for automatic pooling",
+            self.doh_connections_value,
+            0,
+            50,
+        )
+        benchmark_group.add(doh_connections_row)
+
+        doh_streams_row, doh_streams_spin = self._build_spin_row(
+            "DoH Streams per Connection",
+            "Maximum concurrent HTTP/2 streams on each DoH connection, 0 for the server limit",
+            self.doh_streams_value,
+            0,
+            100,
+        )
+        benchmark_group.add(doh_streams_row)
+
+        cold_connections_row = Adw.SwitchRow(
+            title="New Connection per Query",
+            subtitle="Open, handshake, and close a connection for every DoT, DoH, DoQ, and DoH3 query",
+            active=self.cold_connections_enabled,
+        )
+        benchmark_group.add(cold_connections_row)
+
+        tls_resumption_row = Adw.SwitchRow(
+            title="TLS Session Resumption",
+            subtitle="Let new DoT connections resume the previous TLS session",
+            active=self.tls_resumption_enabled,
+        )
+        benchmark_group.add(tls_resumption_row)
+
+        tcp_fast_open_row = Adw.SwitchRow(
+            title="TCP Fast Open",
+            subtitle="Send the TLS ClientHello in the SYN of new DoT connections where the system allows it",
+            active=self.tcp_fast_open_enabled,
+        )
+        benchmark_group.add(tcp_fast_open_row)
+
+        kernel_timestamps_row = Adw.SwitchRow(
+            title="Kernel Timestamps",
+            subtitle="Time Do53 answers by when the kernel received them, next to the app-observed latency (Linux)",
+            active=self.kernel_timestamps_enabled,
+        )
+        benchmark_group.add(kernel_timestamps_row)
+
+        loop_lag_monitor_row = Adw.SwitchRow(
+            title="Event-Loop Lag Monitor",
+            subtitle="Measure how late the benchmark loop runs and mark results it may have inflated",
+            active=self.loop_lag_monitor_enabled,
+        )
+        benchmark_group.add(loop_lag_monitor_row)
+
+        gc_freeze_row = Adw.SwitchRow(
+            title="Freeze Garbage Collector",
+            subtitle="Keep long-lived objects out of garbage collection while queries are measured",
+            active=self.gc_freeze_enabled,
+        )
+        benchmark_group.add(gc_freeze_row)
+
+        profiling_row = Adw.SwitchRow(
+            title="Profile Runs",
+            subtitle="Save cProfile stats and the top memory allocations of each measured phase to the cache folder",
+            active=self.profiling_enabled,
+        )
+        benchmark_group.add(profiling_row)
+
         reset_row = Adw.ActionRow(
             title="Reset Defaults",
             subtitle="Restore bundled DNS entries that were removed earlier",
@@ -280,14 +469,52 @@ class DnsTesterWindow(Adw.ApplicationWindow):
 
         # Widgets are stored on the dialog so values can be read back on every presentation.
         dialog.cache_row = cache_row
+        dialog.cache_simulation_row = cache_simulation_row
+        dialog.cache_busting_row = cache_busting_row
+        dialog.ttl_analysis_row = ttl_analysis_row
+        dialog.site_identification_row = site_identification_row
+        dialog.concurrency_sweep_row = concurrency_sweep_row
+        dialog.circuit_breaker_row = circuit_breaker_row
+        dialog.throttle_backoff_row = throttle_backoff_row
+        dialog.adaptive_timeout_row = adaptive_timeout_row
+        dialog.hedged_queries_row = hedged_queries_row
+        dialog.adaptive_sampling_row = adaptive_sampling_row
         dialog.concurrency_spin = concurrency_spin
         dialog.warmup_spin = warmup_spin
+        dialog.doh_connections_spin = doh_connections_spin
+        dialog.cold_connections_row = cold_connections_row
+        dialog.tls_resumption_row = tls_resumption_row
+        dialog.tcp_fast_open_row = tcp_fast_open_row
+        dialog.kernel_timestamps_row = kernel_timestamps_row
+        dialog.loop_lag_monitor_row = loop_lag_monitor_row
+        dialog.gc_freeze_row = gc_freeze_row
+        dialog.profiling_row = profiling_row
+        dialog.doh_streams_spin = doh_streams_spin
 
         def sync_preferences(_dialog: Adw.Dialog) -> None:
             """Keep the in-memory settings aligned with the dialog state."""
             self.cache_enabled = dialog.cache_row.get_active()
+            self.cache_simulation_enabled = dialog.cache_simulation_row.get_active()
+            self.cache_busting_enabled = dialog.cache_busting_row.get_active()
+            self.ttl_analysis_enabled = dialog.ttl_analysis_row.get_active()
+            self.site_identification_enabled = dialog.site_identification_row.get_active()
+            self.concurrency_sweep_enabled = dialog.concurrency_sweep_row.get_active()
+            self.circuit_breaker_enabled = dialog.circuit_breaker_row.get_active()
+            self.throttle_backoff_enabled = dialog.throttle_backoff_row.get_active()
+            self.adaptive_timeout_enabled = dialog.adaptive_timeout_row.get_active()
+            self.hedged_queries_enabled = dialog.hedged_queries_row.get_active()
+            self.adaptive_sampling_enabled = dialog.adaptive_sampling_row.get_active()
             self.concurrency_value = int(dialog.concurrency_spin.get_value())
             self.warmup_queries_value = int(dialog.warmup_spin.get_value())
+            self.doh_connections_value = int(dialog.doh_connections_spin.get_value())
+            self.cold_connections_enabled = dialog.cold_connections_row.get_active()
+            self.tls_resumption_enabled = dialog.tls_resumption_row.get_active()
+            self.tcp_fast_open_enabled = dialog.tcp_fast_open_row.get_active()
+            self.kernel_timestamps_enabled = dialog.kernel_timestamps_row.get_active()
+            self.loop_lag_monitor_enabled = dialog.loop_lag_monitor_row.get_active()
+            self.gc_freeze_enabled = dialog.gc_freeze_row.get_active()
+            self.profiling_enabled = dialog.profiling_row.get_active()
+            self.doh_streams_value = int(dialog.doh_streams_spin.get_value())
 
         dialog.connect("closed", sync_preferences)
         self.preferences_dialog = dialog
@@ -297,8 +524,27 @@ class DnsTesterWindow(Adw.ApplicationWindow):
         """Present the shared preferences dialog and sync its current values."""
         dialog = self._ensure_preferences_dialog()
         dialog.cache_row.set_active(self.cache_enabled)
+        dialog.cache_simulation_row.set_active(self.cache_simulation_enabled)
+        dialog.cache_busting_row.set_active(self.cache_busting_enabled)
+        dialog.ttl_analysis_row.set_active(self.ttl_analysis_enabled)
+        dialog.site_identification_row.set_active(self.site_identification_enabled)
+        dialog.concurrency_sweep_row.set_active(self.concurrency_sweep_enabled)
+        dialog.circuit_breaker_row.set_active(self.circuit_breaker_enabled)
+        dialog.throttle_backoff_row.set_active(self.throttle_backoff_enabled)
+        dialog.adaptive_timeout_row.set_active(self.adaptive_timeout_enabled)
+        dialog.hedged_queries_row.set_active(self.hedged_queries_enabled)
+        dialog.adaptive_sampling_row.set_active(self.adaptive_sampling_enabled)
         dialog.concurrency_spin.set_value(self.concurrency_value)
         dialog.warmup_spin.set_value(self.warmup_queries_value)
+        dialog.doh_connections_spin.set_value(self.doh_connections_value)
+        dialog.cold_connections_row.set_active(self.cold_connections_enabled)
+        dialog.tls_resumption_row.set_active(self.tls_resumption_enabled)
+        dialog.tcp_fast_open_row.set_active(self.tcp_fast_open_enabled)
+        dialog.kernel_timestamps_row.set_active(self.kernel_timestamps_enabled)
+        dialog.loop_lag_monitor_row.set_active(self.loop_lag_monitor_enabled)
+        dialog.gc_freeze_row.set_active(self.gc_freeze_enabled)
+        dialog.profiling_row.set_active(self.profiling_enabled)
+        dialog.doh_streams_spin.set_value(self.doh_streams_value)
         dialog.present(self)
 
     def _group_subtitle(self, group: DnsProfileGroup) -> str:
@@ -376,6 +622,18 @@ class DnsTesterWindow(Adw.ApplicationWindow):
         """Return the transport rows currently attached to one provider/profile card."""
         return list(getattr(group_row, "dns_variant_rows", []))
 
+    def _variant_labels(self, variant_rows: list[Adw.ExpanderRow]) -> dict[str, str]:
+        """Label variants by transport inside a card, adding the target where a transport repeats."""
+        transports = [variant_row.dns_transport for variant_row in variant_rows]
+        return {
+            variant_row.dns_entry_id: (
+                variant_row.dns_transport
+                if transports.count(variant_row.dns_transport) == 1
+                else f"{variant_row.dns_transport} {variant_row.dns_target}"
+            )
+            for variant_row in variant_rows
+        }
+
     def _update_group_summary(self, group_row: Adw.ExpanderRow) -> None:
         """Summarize the latest transport results at the provider/profile level."""
         summary_row = getattr(group_row, "profile_result_row")
@@ -408,15 +666,28 @@ class DnsTesterWindow(Adw.ApplicationWindow):
                     item[1].p95_latency_ms if item[1].p95_latency_ms is not None else float("inf"),
                 ),
             )
+            labels = self._variant_labels(variant_rows)
             summary_parts = [
-                f"Best {best_variant_row.dns_transport}",
+                f"Best {labels[best_variant_row.dns_entry_id]}",
                 best_result.summary_line(),
                 f"tested {tested_count}/{total_count}",
             ]
             if failed_variants:
                 summary_parts.append(f"failed {failed_variants}")
+            subtitle = " | ".join(summary_parts)
+            if len(successful_variants) > 1:
+                # Every variant queried the same names, so compare them name by name against the best one.
+                # Entry ids keep two variants with the same transport apart; labels are applied afterwards.
+                matrix = LatencyMatrix.from_measurements(
+                    {variant_row.dns_entry_id: result.measurements for variant_row, result in successful_variants}
+                )
+                comparisons = [
+                    replace(comparison, resolver=labels[comparison.resolver], baseline=labels[comparison.baseline])
+                    for comparison in matrix.compare_all(best_variant_row.dns_entry_id)
+                ]
+                subtitle += "\n" + " | ".join(comparison.summary_line() for comparison in comparisons)
             summary_row.set_title("Profile Results")
-            summary_row.set_subtitle(" | ".join(summary_parts))
+            summary_row.set_subtitle(subtitle)
             return
 
         summary_row.set_title("Profile Results")
@@ -424,7 +695,7 @@ class DnsTesterWindow(Adw.ApplicationWindow):
 
     def _transport_detail_title(self, transport: str) -> str:
         """Return the appropriate title for the optional transport-specific field."""
-        if transport == "DoT":
+        if transport in ("DoT", "DoQ"):
             return "TLS Hostname"
         return "DoH Method"
 
@@ -454,6 +725,25 @@ class DnsTesterWindow(Adw.ApplicationWindow):
             concurrency=self.concurrency_value,
             warmup_queries=self.warmup_queries_value,
             cache_enabled=self.cache_enabled,
+            cache_simulation=self.cache_simulation_enabled,
+            cache_busting=self.cache_busting_enabled,
+            ttl_analysis=self.ttl_analysis_enabled,
+            site_identification=self.site_identification_enabled,
+            concurrency_sweep=self.concurrency_sweep_enabled,
+            circuit_breaker=self.circuit_breaker_enabled,
+            throttle_backoff=self.throttle_backoff_enabled,
+            adaptive_timeout=self.adaptive_timeout_enabled,
+            hedged_queries=self.hedged_queries_enabled,
+            doh_max_connections=self.doh_connections_value,
+            connection_reuse=not self.cold_connections_enabled,
+            tls_resumption=self.tls_resumption_enabled,
+            tcp_fast_open=self.tcp_fast_open_enabled,
+            kernel_timestamps=self.kernel_timestamps_enabled,
+            loop_lag_monitor=self.loop_lag_monitor_enabled,
+            gc_freeze=self.gc_freeze_enabled,
+            profile_mode="cprofile" if self.profiling_enabled else "off",
+            profile_allocations=self.profiling_enabled,
+            doh_max_streams_per_connection=self.doh_streams_value,
         )
 
     def _benchmark_endpoint(self, expander_row: Adw.ExpanderRow) -> ResolverEndpoint:
@@ -478,6 +768,35 @@ class DnsTesterWindow(Adw.ApplicationWindow):
             detail_parts.append(f"TTFB {result.average_ttfb_ms:.1f} ms")
         if result.http_version:
             detail_parts.append(result.http_version)
+        if result.doh_pool_statistics is not None and result.doh_pool_statistics.streams_opened:
+            detail_parts.append(
+                f"{result.doh_pool_statistics.connections_opened} conn | "
+                f"peak {result.doh_pool_statistics.peak_concurrent_streams} streams"
+            )
+        if result.adaptive_timeout is not None and result.adaptive_timeout.srtt_ms is not None:
+            detail_parts.append(
+                f"SRTT {result.adaptive_timeout.srtt_ms:.1f} ms | RTO {result.adaptive_timeout.rto_ms:.0f} ms"
+            )
+        counters = result.transport_counters
+        if counters is not None:
+            connection_events = (
+                f"{counters.reconnects} reconnects | {counters.retries} retries | "
+                f"{counters.tls_handshakes} handshakes | {counters.reused_connections} reused"
+            )
+            if counters.http_streams_opened:
+                connection_events += f" | {counters.http_streams_opened} streams"
+            detail_parts.append(connection_events)
+        if result.retried_latency is not None and result.first_attempt_latency is not None:
+            detail_parts.append(
+                f"retried p50 {result.retried_latency.p50_ms:.1f} ms vs first try {result.first_attempt_latency.p50_ms:.1f} ms"
+            )
+        phase_line = result.phase_line()
+        if phase_line:
+            detail_parts.append(phase_line)
+        if result.profile_artifacts:
+            caveats = sorted({note.split(":", 1)[0] for note in result.profile_notes})
+            caveat_text = f" ({', '.join(caveats)})" if caveats else ""
+            detail_parts.append(f"profile {result.profile_artifacts['directory']}{caveat_text}")
         return " | ".join(detail_parts) if detail_parts else "No extra transport metrics"
 
     def _show_error_dialog(self, title: str, message: str) -> None:
@@ -556,6 +875,11 @@ class DnsTesterWindow(Adw.ApplicationWindow):
 
         toolbar_view = Adw.ToolbarView()
         header_bar = Adw.HeaderBar()
+        cancel_button = Gtk.Button(label="Cancel")
+        cancel_button.add_css_class("destructive-action")
+        cancel_button.set_tooltip_text("Stop the remaining benchmarks")
+        cancel_button.connect("clicked", lambda _button: self._cancel_check_all_batch())
+        header_bar.pack_start(cancel_button)
         toolbar_view.add_top_bar(header_bar)
 
         summary_box = Gtk.Box(
@@ -597,9 +921,13 @@ class DnsTesterWindow(Adw.ApplicationWindow):
             selection_mode=Gtk.SelectionMode.NONE,
             css_classes=["boxed-list-separate"],
         )
+        ranking_group.set_header_func(self._ranking_row_header)
         ranking_group_header = Adw.PreferencesGroup(
             title="Final Ranking",
-            description="Use this ranking only when the compared rows belong to the same provider/backend family.",
+            description=(
+                "Use this ranking only when the compared rows belong to the same provider/backend family. "
+                "Resolvers in one tier have overlapping 95% confidence intervals and should be treated as tied."
+            ),
         )
 
         content_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=12)
@@ -630,6 +958,7 @@ class DnsTesterWindow(Adw.ApplicationWindow):
         dialog.progress_spinner = progress_spinner
         dialog.progress_label = progress_label
         dialog.ranking_list_box = ranking_group
+        dialog.cancel_button = cancel_button
 
         def clear_dialog_reference(_dialog: Adw.Dialog) -> None:
             """Drop the cached dialog when the user closes it."""
@@ -653,8 +982,17 @@ class DnsTesterWindow(Adw.ApplicationWindow):
         completed_runs = len(ranked_results)
         total_runs = completed_runs + self.check_all_pending
         batch_is_running = self.check_all_pending > 0
+        dialog.cancel_button.set_sensitive(batch_is_running and not self.check_all_cancelled)
 
-        if batch_is_running:
+        if batch_is_running and self.check_all_cancelled:
+            dialog.summary_title_label.set_label("Cancelling benchmarks...")
+            dialog.summary_description_label.set_label(
+                f"{completed_runs}/{total_runs} completed. Waiting for running resolvers to close their connections."
+            )
+            dialog.progress_label.set_label("Stopping the remaining benchmarks...")
+            dialog.progress_spinner.start()
+            dialog.progress_spinner.set_visible(True)
+        elif batch_is_running:
             dialog.summary_title_label.set_label("Running benchmarks...")
             dialog.summary_description_label.set_label(
                 f"{completed_runs}/{total_runs} completed, {failed_runs} failed so far. "
@@ -670,6 +1008,9 @@ class DnsTesterWindow(Adw.ApplicationWindow):
                 "Resolvers are ordered from best to worst using average latency and p95."
             )
             dialog.progress_label.set_label("All bulk benchmarks finished.")
+            if self.check_all_cancelled:
+                dialog.summary_title_label.set_label("Benchmarks cancelled")
+                dialog.progress_label.set_label("Partial results are ranked from the queries completed before cancelling.")
             dialog.progress_spinner.stop()
             dialog.progress_spinner.set_visible(False)
 
@@ -690,15 +1031,40 @@ class DnsTesterWindow(Adw.ApplicationWindow):
             ranking_list_box.append(pending_row)
             return
 
-        for position, (name, result) in enumerate(ranked_results, start=1):
+        tiers = ranking_tiers(
+            [result.latency_intervals if result.error is None else None for _name, result in ranked_results]
+        )
+        for position, ((name, result), tier) in enumerate(zip(ranked_results, tiers), start=1):
+            subtitle = f"{result.summary_line()}\n{result.detail_line()}"
+            intervals = result.latency_intervals if result.error is None else None
+            if intervals is not None:
+                subtitle += (
+                    f"\n95% CI avg {intervals.mean.low:.1f}-{intervals.mean.high:.1f} ms | "
+                    f"p95 {intervals.p95.low:.1f}-{intervals.p95.high:.1f} ms"
+                )
             row = Adw.ActionRow(
                 title=f"{position}. {name}",
-                subtitle=f"{result.summary_line()}\n{result.detail_line()}",
+                subtitle=subtitle,
                 activatable=False,
                 selectable=False,
             )
+            row.ranking_tier = tier
+            row.ranking_tier_size = tiers.count(tier) if tier is not None else 0
             ranking_list_box.append(row)
 
+    def _ranking_row_header(self, row: Gtk.ListBoxRow, before: Gtk.ListBoxRow | None) -> None:
+        """Label the first row of every tier of statistically tied resolvers."""
+        tier = getattr(row, "ranking_tier", None)
+        if tier is None or (before is not None and getattr(before, "ranking_tier", None) == tier):
+            row.set_header(None)
+            return
+        label_text = f"Tier {tier}"
+        if row.ranking_tier_size > 1:
+            label_text += f" · {row.ranking_tier_size} resolvers statistically tied"
+        header = Gtk.Label(label=label_text, xalign=0.0, margin_top=12, margin_bottom=6, margin_start=6)
+        header.add_css_class("heading")
+        row.set_header(header)
+
     def _record_check_all_result(self, batch_id: int, name: str, result: object) -> None:
         """Append one finished result, refresh the progress dialog, and close the batch if needed."""
         if batch_id != self.check_all_batch_id:
@@ -717,6 +1083,41 @@ class DnsTesterWindow(Adw.ApplicationWindow):
         self._refresh_check_all_results_dialog()
         self.check_all_results = []
         self.check_all_pending = 0
+        self.check_all_cancellations = []
+
+    def _cancel_check_all_batch(self) -> None:
+        """Stop every benchmark that belongs to the running bulk batch."""
+        if self.check_all_pending == 0 or self.check_all_cancelled:
+            return
+        self.check_all_cancelled = True
+        for cancellation in self.check_all_cancellations:
+            cancellation.cancel()
+        self._refresh_check_all_results_dialog()
+
+    def _set_test_button_running(self, variant_row: Adw.ExpanderRow, running: bool) -> None:
+        """Toggle the per-row test button between start and stop."""
+        test_button = variant_row.test_button
+        test_button.set_sensitive(True)
+        if running:
+            test_button.set_icon_name("media-playback-stop-symbolic")
+            test_button.set_tooltip_text("Stop this benchmark")
+        else:
+            test_button.set_icon_name("media-playback-start-symbolic")
+            test_button.set_tooltip_text("Test this transport")
+
+    def _on_test_button_clicked(self, button: Gtk.Button, variant_row: Adw.ExpanderRow) -> None:
+        """Start a benchmark for one row, or cancel the one it is already running."""
+        cancellation = getattr(variant_row, "benchmark_cancellation", None)
+        if cancellation is not None:
+            if cancellation.cancelled:
+                return
+            cancellation.cancel()
+            # One stop request is enough; the button comes back once the partial result is in.
+            variant_row.test_button.set_sensitive(False)
+            variant_row.result_row.set_title("Cancelling...")
+            variant_row.result_row.set_subtitle("Closing connections and keeping completed queries...")
+            return
+        self._run_test_async(button, variant_row)
 
     def _run_group_tests(self, group_row: Adw.ExpanderRow) -> None:
         """Benchmark every transport variant that belongs to one provider/profile card."""
@@ -770,9 +1171,9 @@ class DnsTesterWindow(Adw.ApplicationWindow):
         variant_row.add_row(transport_row)
 
         detail_value = None
-        if entry.transport == "DoT" and entry.tls_hostname and entry.tls_hostname != entry.target:
+        if entry.transport in ("DoT", "DoQ") and entry.tls_hostname and entry.tls_hostname != entry.target:
             detail_value = entry.tls_hostname
-        if entry.transport == "DoH":
+        if entry.transport in HTTPS_TRANSPORTS:
             detail_value = entry.doh_method
         if detail_value:
             detail_row = Adw.ActionRow(
@@ -805,12 +1206,14 @@ class DnsTesterWindow(Adw.ApplicationWindow):
         variant_row.result_row = result_row
         variant_row.metrics_row = metrics_row
         variant_row.transport_metrics_row = transport_metrics_row
+        variant_row.benchmark_cancellation = None
 
         test_button = Gtk.Button.new_from_icon_name("media-playback-start-symbolic")
         test_button.add_css_class("flat")
         test_button.set_tooltip_text("Test this transport")
-        test_button.connect("clicked", self._run_test_async, variant_row)
+        test_button.connect("clicked", self._on_test_button_clicked, variant_row)
         result_row.add_suffix(test_button)
+        variant_row.test_button = test_button
 
         copy_button = Gtk.Button.new_from_icon_name("edit-copy-symbolic")
         copy_button.add_css_class("flat")
@@ -834,6 +1237,24 @@ class DnsTesterWindow(Adw.ApplicationWindow):
         variant_row.add_row(result_row)
         variant_row.add_row(metrics_row)
         variant_row.add_row(transport_metrics_row)
+
+        if entry.transport in IDLE_PROBE_TRANSPORTS:
+            idle_probe_row = Adw.ActionRow(
+                title="Idle Timeout",
+                subtitle="Probe how long the resolver keeps an idle connection open (up to 2 minutes)",
+                activatable=False,
+                selectable=False,
+            )
+            idle_probe_button = Gtk.Button.new_from_icon_name("media-playback-start-symbolic")
+            idle_probe_button.add_css_class("flat")
+            idle_probe_button.set_tooltip_text("Probe idle timeout")
+            idle_probe_button.connect("clicked", lambda _button: self._on_idle_probe_button_clicked(variant_row))
+            idle_probe_row.add_suffix(idle_probe_button)
+            variant_row.idle_probe_row = idle_probe_row
+            variant_row.idle_probe_button = idle_probe_button
+            variant_row.idle_probe_cancellation = None
+            variant_row.add_row(idle_probe_row)
+
         variant_row.add_suffix(remove_button)
         return variant_row
 
@@ -887,6 +1308,31 @@ class DnsTesterWindow(Adw.ApplicationWindow):
         group_row.profile_result_row = profile_result_row
         group_row.add_row(profile_result_row)
 
+        if len(group.entries) > 1:
+            resolver_set_row = Adw.ActionRow(
+                title="Resolver Set",
+                subtitle="Resolve the names through all variants at once, the way a stub with several upstreams does",
+                activatable=False,
+                selectable=False,
+            )
+            strategy_model = Gtk.StringList()
+            for strategy in RESOLVER_SET_STRATEGIES:
+                strategy_model.append(strategy)
+            strategy_dropdown = Gtk.DropDown(model=strategy_model, valign=Gtk.Align.CENTER)
+            strategy_dropdown.set_selected(RESOLVER_SET_STRATEGIES.index(DEFAULT_RESOLVER_SET_STRATEGY))
+            strategy_dropdown.set_tooltip_text("Upstream selection strategy")
+            resolver_set_button = Gtk.Button.new_from_icon_name("media-playback-start-symbolic")
+            resolver_set_button.add_css_class("flat")
+            resolver_set_button.set_tooltip_text("Test this profile as a resolver set")
+            resolver_set_button.connect("clicked", lambda _button: self._on_resolver_set_button_clicked(group_row))
+            resolver_set_row.add_suffix(strategy_dropdown)
+            resolver_set_row.add_suffix(resolver_set_button)
+            group_row.resolver_set_row = resolver_set_row
+            group_row.resolver_set_dropdown = strategy_dropdown
+            group_row.resolver_set_button = resolver_set_button
+            group_row.resolver_set_cancellation = None
+            group_row.add_row(resolver_set_row)
+
         for entry in group.entries:
             variant_row = self._build_variant_row(group_row, entry)
             group_row.dns_variant_rows.append(variant_row)
@@ -984,13 +1430,24 @@ class DnsTesterWindow(Adw.ApplicationWindow):
                 tls_row.set_visible(True)
                 doh_method_row.set_visible(False)
                 return
+            if transport == "DoQ":
+                target_row.set_title("IP Address or Hostname")
+                transport_action_row.set_subtitle("DNS over QUIC on UDP port 853")
+                tls_row.set_visible(True)
+                doh_method_row.set_visible(False)
+                return
             target_row.set_title("HTTPS URL")
-            transport_action_row.set_subtitle("DNS over HTTPS with connection reuse")
+            if transport == "DoH3":
+                transport_action_row.set_subtitle("DNS over HTTPS on HTTP/3 over QUIC")
+            else:
+                transport_action_row.set_subtitle("DNS over HTTPS with connection reuse")
             tls_row.set_visible(False)
             doh_method_row.set_visible(True)
 
         def maybe_autoselect_transport(*_args) -> None:
             """Switch to DoH automatically when the endpoint clearly is a HTTPS URL."""
+            if TRANSPORTS[transport_dropdown.get_selected()] in HTTPS_TRANSPORTS:
+                return
             if self._is_https_url(target_row.get_text().strip()):
                 transport_dropdown.set_selected(TRANSPORTS.index("DoH"))
 
@@ -1011,13 +1468,13 @@ class DnsTesterWindow(Adw.ApplicationWindow):
             if not provider_name:
                 provider_row.add_css_class("error")
                 return
-            if transport in ("Do53", "DoT") and not (self._is_ip_address(target) or self._is_hostname(target)):
+            if transport in ("Do53", "DoT", "DoQ") and not (self._is_ip_address(target) or self._is_hostname(target)):
                 target_row.add_css_class("error")
                 return
-            if transport == "DoH" and not self._is_https_url(target):
+            if transport in HTTPS_TRANSPORTS and not self._is_https_url(target):
                 target_row.add_css_class("error")
                 return
-            if transport == "DoT" and tls_hostname and not self._is_hostname(tls_hostname):
+            if transport in ("DoT", "DoQ") and tls_hostname and not self._is_hostname(tls_hostname):
                 tls_row.add_css_class("error")
                 return
 
@@ -1066,12 +1523,159 @@ class DnsTesterWindow(Adw.ApplicationWindow):
         self.check_all_batch_id += 1
         self.check_all_pending = len(rows)
         self.check_all_results = []
+        self.check_all_cancellations = []
+        self.check_all_cancelled = False
         self.check_button.set_sensitive(False)
         self._show_check_all_results_dialog()
 
+        if self.adaptive_sampling_enabled:
+            self._run_sampled_check_all(rows, self.check_all_batch_id)
+            return
         for row in rows:
             self._run_test_async(None, row, batch_id=self.check_all_batch_id)
 
+    def _begin_benchmark(self, expander_row: Adw.ExpanderRow, batch_id: int | None) -> BenchmarkCancellation:
+        """Reset a row for a new run and return the cancellation handle that now owns it."""
+        # A new run on the same row supersedes the previous one, whose result is then discarded.
+        previous_cancellation = getattr(expander_row, "benchmark_cancellation", None)
+        if previous_cancellation is not None:
+            previous_cancellation.cancel()
+        cancellation = BenchmarkCancellation()
+        expander_row.benchmark_cancellation = cancellation
+        if batch_id is not None:
+            self.check_all_cancellations.append(cancellation)
+        self._set_test_button_running(expander_row, True)
+
+        expander_row.result_row.set_title("Testing...")
+        expander_row.result_row.set_subtitle("Preparing transport benchmark...")
+        expander_row.metrics_row.set_title("Metrics")
+        expander_row.metrics_row.set_subtitle("Waiting for results...")
+        expander_row.transport_metrics_row.set_title("Transport Metrics")
+        expander_row.transport_metrics_row.set_subtitle("Waiting for results...")
+        expander_row.copy_button.set_sensitive(False)
+        expander_row.set_expanded(True)
+        self.provider_stack.queue_draw()
+        return cancellation
+
+    def _update_benchmark_progress(
+        self,
+        expander_row: Adw.ExpanderRow,
+        cancellation: BenchmarkCancellation,
+        phase: str,
+        current: int,
+        total: int,
+        detail: str,
+    ) -> bool:
+        """Reflect benchmark progress in the row while the worker thread is running."""
+        if expander_row.benchmark_cancellation is not cancellation or cancellation.cancelled:
+            return False
+        result_row = expander_row.result_row
+        if phase == "preflight":
+            result_row.set_title("Testing... preflight")
+            result_row.set_subtitle(detail)
+        elif phase == "warmup":
+            result_row.set_title(f"Testing... warm-up {current}/{total}")
+            result_row.set_subtitle(detail)
+        elif phase == "cache":
+            result_row.set_title("Testing... cache prime")
+            result_row.set_subtitle(detail)
+        elif phase == "uncached":
+            result_row.set_title(f"Testing... uncached {current}/{total}")
+            result_row.set_subtitle(detail)
+        elif phase == "ttl":
+            result_row.set_title(f"Testing... TTL check {current}/{total}")
+            result_row.set_subtitle(detail)
+        elif phase == "sweep":
+            result_row.set_title(f"Testing... sweep {current}/{total}")
+            result_row.set_subtitle(detail)
+        else:
+            result_row.set_title(f"Testing... {current}/{total}")
+            result_row.set_subtitle(detail)
+        result_row.queue_draw()
+        return False
+
+    def _failure_result(self, endpoint: ResolverEndpoint, options: BenchmarkOptions, error_text: str) -> BenchmarkResult:
+        """Build the placeholder result shown when the benchmark raised instead of returning."""
+        return BenchmarkResult(
+            protocol=endpoint.transport,
+            endpoint=endpoint.target,
+            target=endpoint.target,
+            cache_mode=options.cache_mode,
+            warmup_queries=options.warmup_queries,
+            concurrency=options.concurrency,
+            first_query_latency_ms=None,
+            average_latency_ms=None,
+            p95_latency_ms=None,
+            success_rate=0.0,
+            successful_queries=0,
+            total_queries=len(TOP_ES_WEBS),
+            resolved_target=endpoint.bootstrap_address,
+            error=error_text,
+        )
+
+    def _apply_benchmark_result(
+        self,
+        expander_row: Adw.ExpanderRow,
+        cancellation: BenchmarkCancellation,
+        batch_id: int | None,
+        result: BenchmarkResult,
+        aborted: bool = False,
+    ) -> bool:
+        """Publish a finished benchmark in its row and in the running Check All batch."""
+        display_name = getattr(expander_row, "dns_display_name", expander_row.get_title())
+        if expander_row.benchmark_cancellation is not cancellation:
+            # A newer run owns this row now; only the batch bookkeeping still needs this result.
+            if batch_id is not None and batch_id == self.check_all_batch_id:
+                self._record_check_all_result(batch_id, display_name, result)
+            return False
+        expander_row.benchmark_cancellation = None
+        self._set_test_button_running(expander_row, False)
+
+        result_row = expander_row.result_row
+        metrics_row = expander_row.metrics_row
+        transport_metrics_row = expander_row.transport_metrics_row
+        copy_button = expander_row.copy_button
+        group_row = getattr(expander_row, "dns_group_row", None)
+        if aborted:
+            expander_row.latest_benchmark_result = result
+            expander_row.latest_result_json = None
+            result_row.set_title("Result")
+            result_row.set_subtitle(result.error)
+            metrics_row.set_title("Metrics")
+            metrics_row.set_subtitle("Benchmark aborted")
+            transport_metrics_row.set_title("Transport Metrics")
+            transport_metrics_row.set_subtitle("No transport details collected")
+            copy_button.set_sensitive(False)
+            if group_row is not None:
+                self._update_group_summary(group_row)
+            if batch_id is not None and batch_id == self.check_all_batch_id:
+                self._record_check_all_result(batch_id, display_name, result)
+            return False
+
+        expander_row.dns_resolved_target = result.resolved_target
+        expander_row.latest_benchmark_result = result
+        expander_row.latest_result_json = result.to_json()
+        result_row.set_title("Result")
+        result_row.set_subtitle(result.summary_line())
+        metrics_row.set_title("Metrics")
+        metrics_row.set_subtitle(result.detail_line())
+        transport_metrics_row.set_title("Transport Metrics")
+        transport_metrics_row.set_subtitle(self._transport_detail_line(result))
+        copy_button.set_sensitive(True)
+        result_row.add_css_class("property")
+        if group_row is not None:
+            self._update_group_summary(group_row)
+        expander_row.queue_draw()
+        self.provider_stack.queue_draw()
+        if not self._printed_console_header:
+            print("[DNS benchmark]", flush=False)
+            print(result.table_header(), flush=False)
+            self._printed_console_header = True
+        print(result.table_row(), flush=True)
+        if batch_id is not None and batch_id == self.check_all_batch_id:
+            self._record_check_all_result(batch_id, display_name, result)
+        return False
+
     def _run_test_async(
         self,
         _button: Gtk.Button | None,
@@ -1079,125 +1683,297 @@ class DnsTesterWindow(Adw.ApplicationWindow):
         batch_id: int | None = None,
     ) -> None:
         """Execute the benchmark in a worker thread and update the row from the GTK main loop."""
-        result_row = getattr(expander_row, "result_row")
-        metrics_row = getattr(expander_row, "metrics_row")
-        transport_metrics_row = getattr(expander_row, "transport_metrics_row")
-        copy_button = getattr(expander_row, "copy_button")
-        group_row = getattr(expander_row, "dns_group_row", None)
         endpoint = self._benchmark_endpoint(expander_row)
         options = self._benchmark_options()
-
-        result_row.set_title("Testing...")
-        result_row.set_subtitle("Preparing transport benchmark...")
-        metrics_row.set_title("Metrics")
-        metrics_row.set_subtitle("Waiting for results...")
-        transport_metrics_row.set_title("Transport Metrics")
-        transport_metrics_row.set_subtitle("Waiting for results...")
-        copy_button.set_sensitive(False)
-        expander_row.set_expanded(True)
-        self.provider_stack.queue_draw()
+        cancellation = self._begin_benchmark(expander_row, batch_id)
 
         def worker() -> None:
-            def update_progress(phase: str, current: int, total: int, detail: str) -> bool:
-                """Reflect benchmark progress in the row while the worker thread is running."""
-                if phase == "preflight":
-                    result_row.set_title("Testing... preflight")
-                    result_row.set_subtitle(detail)
-                elif phase == "warmup":
-                    result_row.set_title(f"Testing... warm-up {current}/{total}")
-                    result_row.set_subtitle(detail)
-                elif phase == "cache":
-                    result_row.set_title("Testing... cache prime")
-                    result_row.set_subtitle(detail)
-                else:
-                    result_row.set_title(f"Testing... {current}/{total}")
-                    result_row.set_subtitle(detail)
-                result_row.queue_draw()
-                return False
-
+            aborted = False
             try:
                 result = run_benchmark_sync(
                     endpoint,
                     TOP_ES_WEBS,
                     options,
                     progress_callback=lambda phase, current, total, detail: GLib.idle_add(
-                        update_progress,
+                        self._update_benchmark_progress,
+                        expander_row,
+                        cancellation,
                         phase,
                         current,
                         total,
                         detail,
                     ),
+                    cancellation=cancellation,
                 )
+            except asyncio.CancelledError:
+                # A stray cancellation must still hand the row a result, or it would stay on "Cancelling...".
+                result = self._failure_result(endpoint, options, "benchmark cancelled")
+                result.cancelled = True
             except Exception as error:
-                result = None
-                error_text = f"{type(error).__name__}: {error}"
+                result = self._failure_result(endpoint, options, f"{type(error).__name__}: {error}")
+                aborted = True
+            GLib.idle_add(self._apply_benchmark_result, expander_row, cancellation, batch_id, result, aborted)
 
-            def update_ui() -> bool:
-                """Publish the final benchmark result after the worker thread finishes."""
-                if result is None:
-                    failure_result = BenchmarkResult(
-                        protocol=endpoint.transport,
-                        endpoint=endpoint.target,
-                        target=endpoint.target,
-                        cache_mode=options.cache_mode,
-                        warmup_queries=options.warmup_queries,
-                        concurrency=options.concurrency,
-                        first_query_latency_ms=None,
-                        average_latency_ms=None,
-                        p95_latency_ms=None,
-                        success_rate=0.0,
-                        successful_queries=0,
-                        total_queries=len(TOP_ES_WEBS),
-                        resolved_target=endpoint.bootstrap_address,
-                        error=error_text,
-                    )
-                    expander_row.latest_benchmark_result = failure_result
-                    expander_row.latest_result_json = None
-                    result_row.set_title("Result")
-                    result_row.set_subtitle(error_text)
-                    metrics_row.set_title("Metrics")
-                    metrics_row.set_subtitle("Benchmark aborted")
-                    transport_metrics_row.set_title("Transport Metrics")
-                    transport_metrics_row.set_subtitle("No transport details collected")
-                    copy_button.set_sensitive(False)
-                    if group_row is not None:
-                        self._update_group_summary(group_row)
-                    if batch_id is not None and batch_id == self.check_all_batch_id:
-                        self._record_check_all_result(
-                            batch_id,
-                            getattr(expander_row, "dns_display_name", expander_row.get_title()),
-                            failure_result,
-                        )
-                    return False
-
-                expander_row.dns_resolved_target = result.resolved_target
-                expander_row.latest_benchmark_result = result
-                expander_row.latest_result_json = result.to_json()
-                result_row.set_title("Result")
-                result_row.set_subtitle(result.summary_line())
-                metrics_row.set_title("Metrics")
-                metrics_row.set_subtitle(result.detail_line())
-                transport_metrics_row.set_title("Transport Metrics")
-                transport_metrics_row.set_subtitle(self._transport_detail_line(result))
-                copy_button.set_sensitive(True)
-                result_row.add_css_class("property")
-                if group_row is not None:
-                    self._update_group_summary(group_row)
-                expander_row.queue_draw()
-                self.provider_stack.queue_draw()
-                if not self._printed_console_header:
-                    print("[DNS benchmark]", flush=False)
-                    print(result.table_header(), flush=False)
-                    self._printed_console_header = True
-                print(result.table_row(), flush=True)
-                if batch_id is not None and batch_id == self.check_all_batch_id:
-                    self._record_check_all_result(
-                        batch_id,
-                        getattr(expander_row, "dns_display_name", expander_row.get_title()),
-                        result,
-                    )
-                return False
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _on_idle_probe_button_clicked(self, variant_row: Adw.ExpanderRow) -> None:
+        """Start an idle-timeout probe for one row, or cancel the one it is already running."""
+        cancellation = variant_row.idle_probe_cancellation
+        if cancellation is not None:
+            if not cancellation.cancelled:
+                cancellation.cancel()
+                variant_row.idle_probe_button.set_sensitive(False)
+                variant_row.idle_probe_row.set_subtitle("Cancelling... closing the idle connections")
+            return
+        self._run_idle_probe_async(variant_row)
+
+    def _set_idle_probe_running(self, variant_row: Adw.ExpanderRow, running: bool) -> None:
+        """Toggle the idle-probe button between start and stop."""
+        idle_probe_button = variant_row.idle_probe_button
+        idle_probe_button.set_sensitive(True)
+        if running:
+            idle_probe_button.set_icon_name("media-playback-stop-symbolic")
+            idle_probe_button.set_tooltip_text("Stop this probe")
+        else:
+            idle_probe_button.set_icon_name("media-playback-start-symbolic")
+            idle_probe_button.set_tooltip_text("Probe idle timeout")
+
+    def _update_idle_probe_progress(
+        self,
+        variant_row: Adw.ExpanderRow,
+        cancellation: BenchmarkCancellation,
+        current: int,
+        total: int,
+        detail: str,
+    ) -> bool:
+        """Show how many idle intervals have finished while the probe runs."""
+        if variant_row.idle_probe_cancellation is not cancellation or cancellation.cancelled:
+            return False
+        variant_row.idle_probe_row.set_subtitle(f"Probing... {current}/{total} intervals | {detail}")
+        return False
+
+    def _apply_idle_probe_result(
+        self,
+        variant_row: Adw.ExpanderRow,
+        cancellation: BenchmarkCancellation,
+        result: IdleProbeResult,
+    ) -> bool:
+        """Publish a finished idle probe in its row."""
+        if variant_row.idle_probe_cancellation is not cancellation:
+            return False
+        variant_row.idle_probe_cancellation = None
+        self._set_idle_probe_running(variant_row, False)
+        variant_row.idle_probe_row.set_subtitle(result.summary_line())
+        print(f"[idle probe] {result.name} {result.transport}: {result.summary_line()}", flush=True)
+        return False
+
+    def _run_idle_probe_async(self, variant_row: Adw.ExpanderRow) -> None:
+        """Probe the idle timeout in a worker thread and update the row from the GTK main loop."""
+        endpoint = self._benchmark_endpoint(variant_row)
+        options = self._benchmark_options()
+        cancellation = BenchmarkCancellation()
+        variant_row.idle_probe_cancellation = cancellation
+        self._set_idle_probe_running(variant_row, True)
+        variant_row.idle_probe_row.set_subtitle("Probing... opening one connection per idle interval")
+        variant_row.set_expanded(True)
+
+        def worker() -> None:
+            try:
+                result = run_idle_probe_sync(
+                    endpoint,
+                    TOP_ES_WEBS[0],
+                    options,
+                    progress_callback=lambda _phase, current, total, detail: GLib.idle_add(
+                        self._update_idle_probe_progress,
+                        variant_row,
+                        cancellation,
+                        current,
+                        total,
+                        detail,
+                    ),
+                    cancellation=cancellation,
+                )
+            except asyncio.CancelledError:
+                result = IdleProbeResult(name=endpoint.name, transport=endpoint.transport, target=endpoint.target, error="probe cancelled")
+                result.cancelled = True
+            except Exception as error:
+                result = IdleProbeResult(
+                    name=endpoint.name,
+                    transport=endpoint.transport,
+                    target=endpoint.target,
+                    error=f"{type(error).__name__}: {error}",
+                )
+            GLib.idle_add(self._apply_idle_probe_result, variant_row, cancellation, result)
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _on_resolver_set_button_clicked(self, group_row: Adw.ExpanderRow) -> None:
+        """Start a resolver-set benchmark for one profile, or cancel the one it is already running."""
+        cancellation = group_row.resolver_set_cancellation
+        if cancellation is not None:
+            if not cancellation.cancelled:
+                cancellation.cancel()
+                group_row.resolver_set_button.set_sensitive(False)
+                group_row.resolver_set_row.set_subtitle("Cancelling... keeping completed queries")
+            return
+        self._run_resolver_set_async(group_row)
+
+    def _set_resolver_set_running(self, group_row: Adw.ExpanderRow, running: bool) -> None:
+        """Toggle the resolver-set button between start and stop, and lock the strategy while it runs."""
+        resolver_set_button = group_row.resolver_set_button
+        resolver_set_button.set_sensitive(True)
+        group_row.resolver_set_dropdown.set_sensitive(not running)
+        if running:
+            resolver_set_button.set_icon_name("media-playback-stop-symbolic")
+            resolver_set_button.set_tooltip_text("Stop this resolver set")
+        else:
+            resolver_set_button.set_icon_name("media-playback-start-symbolic")
+            resolver_set_button.set_tooltip_text("Test this profile as a resolver set")
+
+    def _update_resolver_set_progress(
+        self,
+        group_row: Adw.ExpanderRow,
+        cancellation: BenchmarkCancellation,
+        phase: str,
+        current: int,
+        total: int,
+        detail: str,
+    ) -> bool:
+        """Reflect resolver-set progress in the profile card while the worker thread is running."""
+        if group_row.resolver_set_cancellation is not cancellation or cancellation.cancelled:
+            return False
+        group_row.resolver_set_row.set_subtitle(f"Testing... {phase} {current}/{total} | {detail}")
+        return False
+
+    def _apply_resolver_set_result(
+        self,
+        group_row: Adw.ExpanderRow,
+        cancellation: BenchmarkCancellation,
+        result: ResolverSetResult,
+    ) -> bool:
+        """Publish a finished resolver set with the share of answers each variant won."""
+        if group_row.resolver_set_cancellation is not cancellation:
+            return False
+        group_row.resolver_set_cancellation = None
+        self._set_resolver_set_running(group_row, False)
+        subtitle = result.summary_line()
+        if result.error is None:
+            subtitle += "\n" + result.share_line()
+            if result.cancelled:
+                subtitle += " | cancelled"
+        group_row.resolver_set_row.set_subtitle(subtitle)
+        print(f"[resolver set] {group_row.dns_provider_name} {group_row.dns_profile_name}: {result.summary_line()}", flush=True)
+        return False
+
+    def _run_resolver_set_async(self, group_row: Adw.ExpanderRow) -> None:
+        """Benchmark a profile's variants as one resolver set in a worker thread."""
+        variant_rows = self._variant_rows_for_group(group_row)
+        # Variant display names include the provider and profile; inside the card the transport tells them apart.
+        endpoints = [
+            replace(self._benchmark_endpoint(variant_row), name=variant_row.dns_transport)
+            for variant_row in variant_rows
+        ]
+        options = self._benchmark_options()
+        strategy = RESOLVER_SET_STRATEGIES[group_row.resolver_set_dropdown.get_selected()]
+        cancellation = BenchmarkCancellation()
+        group_row.resolver_set_cancellation = cancellation
+        self._set_resolver_set_running(group_row, True)
+        group_row.resolver_set_row.set_subtitle("Preparing every upstream...")
+        group_row.set_expanded(True)
+
+        def worker() -> None:
+            try:
+                result = run_resolver_set_sync(
+                    endpoints,
+                    TOP_ES_WEBS,
+                    options,
+                    strategy,
+                    progress_callback=lambda phase, current, total, detail: GLib.idle_add(
+                        self._update_resolver_set_progress,
+                        group_row,
+                        cancellation,
+                        phase,
+                        current,
+                        total,
+                        detail,
+                    ),
+                    cancellation=cancellation,
+                )
+            except asyncio.CancelledError:
+                result = self._failed_resolver_set_result(strategy, options, "resolver set cancelled")
+                result.cancelled = True
+            except Exception as error:
+                result = self._failed_resolver_set_result(strategy, options, f"{type(error).__name__}: {error}")
+            GLib.idle_add(self._apply_resolver_set_result, group_row, cancellation, result)
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _failed_resolver_set_result(self, strategy: str, options: BenchmarkOptions, error_text: str) -> ResolverSetResult:
+        """Build the placeholder shown when a resolver set raised instead of returning."""
+        return ResolverSetResult(
+            strategy=strategy,
+            concurrency=options.concurrency,
+            average_latency_ms=None,
+            p50_latency_ms=None,
+            p95_latency_ms=None,
+            p99_latency_ms=None,
+            success_rate=0.0,
+            successful_queries=0,
+            total_queries=len(TOP_ES_WEBS),
+            error=error_text,
+        )
+
+    def _run_sampled_check_all(self, rows: list[Adw.ExpanderRow], batch_id: int) -> None:
+        """Run a whole Check All batch on one worker thread with adaptive early stopping."""
+        endpoints = [self._benchmark_endpoint(row) for row in rows]
+        options = self._benchmark_options()
+        row_cancellations = [self._begin_benchmark(row, batch_id) for row in rows]
+        batch_cancellation = BenchmarkCancellation()
+        self.check_all_cancellations.append(batch_cancellation)
+
+        def worker() -> None:
+            published: set[int] = set()
+
+            def publish(index: int, result: BenchmarkResult, aborted: bool = False) -> None:
+                """Hand one finished resolver to the GTK main loop."""
+                published.add(index)
+                GLib.idle_add(
+                    self._apply_benchmark_result,
+                    rows[index],
+                    row_cancellations[index],
+                    batch_id,
+                    result,
+                    aborted,
+                )
 
-            GLib.idle_add(update_ui)
+            try:
+                run_adaptive_benchmarks_sync(
+                    endpoints,
+                    TOP_ES_WEBS,
+                    options,
+                    progress_callback=lambda index, phase, current, total, detail: GLib.idle_add(
+                        self._update_benchmark_progress,
+                        rows[index],
+                        row_cancellations[index],
+                        phase,
+                        current,
+                        total,
+                        detail,
+                    ),
+                    result_callback=publish,
+                    cancellations=row_cancellations,
+                    cancellation=batch_cancellation,
+                )
+            except Exception as error:
+                error_text = f"{type(error).__name__}: {error}"
+                for index, endpoint in enumerate(endpoints):
+                    if index not in published:
+                        publish(index, self._failure_result(endpoint, options, error_text), aborted=True)
+            # Every row needs a result for the batch to finish, even if the run ended without publishing it.
+            for index, endpoint in enumerate(endpoints):
+                if index not in published:
+                    result = self._failure_result(endpoint, options, "benchmark cancelled")
+                    result.cancelled = True
+                    publish(index, result)
 
         threading.Thread(target=worker, daemon=True).start()
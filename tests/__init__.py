@@ -0,0 +1 @@
+"""Tests for the dns_tester benchmark engine."""
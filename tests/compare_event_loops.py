@@ -0,0 +1,64 @@
+# compare_event_loops.py
+#
+# Measure the event loop's own cost: benchmark the Do53 stand-in once per
+# installed loop and print the latency the harness adds on each.
+#
+#     python -m tests.compare_event_loops [queries] [concurrency]
+#
+# The stand-in runs in a child process, so it does not compete with the
+# benchmark for the GIL. Port 53 needs root or CAP_NET_BIND_SERVICE.
+
+from __future__ import annotations
+
+import socket
+import subprocess
+import sys
+import time
+
+from src.benchmark import BenchmarkOptions
+from src.benchmark import ResolverEndpoint
+from src.benchmark import compare_event_loops
+from tests.do53_standin import DEFAULT_ADDRESS
+
+DEFAULT_QUERIES = 5000
+DEFAULT_CONCURRENCY = 50
+
+
+def _wait_for_standin(address: str, timeout: float = 5.0) -> None:
+    """Return once something is bound to ``address`` port 53."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as probe:
+            try:
+                probe.bind((address, 53))
+            except OSError:
+                return
+        time.sleep(0.05)
+    raise RuntimeError(f"the stand-in did not start on {address}:53")
+
+
+def main(queries: int = DEFAULT_QUERIES, concurrency: int = DEFAULT_CONCURRENCY) -> None:
+    """Run the comparison and print one line per loop."""
+    standin = subprocess.Popen([sys.executable, "-m", "tests.do53_standin", DEFAULT_ADDRESS])
+    try:
+        _wait_for_standin(DEFAULT_ADDRESS)
+        endpoint = ResolverEndpoint(name="stand-in", transport="Do53", target=DEFAULT_ADDRESS)
+        domains = [f"name{index}.example" for index in range(queries)]
+        options = BenchmarkOptions(concurrency=concurrency, kernel_timestamps=True)
+        for event_loop, result in compare_event_loops(endpoint, domains, options).items():
+            overhead = result.harness_overhead
+            lag = result.loop_lag
+            print(
+                f"{event_loop} {result.event_loop_version}: "
+                f"mean {result.average_latency_ms:.2f} ms | p95 {result.p95_latency_ms:.2f} ms | "
+                f"harness p50 {overhead.p50_ms:.2f} ms p95 {overhead.p95_ms:.2f} ms | "
+                f"loop lag p95 {lag.lag.p95_ms:.2f} ms" if overhead is not None and lag is not None
+                else f"{event_loop}: {result.error or 'no kernel timestamps'}"
+            )
+    finally:
+        standin.terminate()
+        standin.wait()
+
+
+if __name__ == "__main__":
+    main(*(int(argument) for argument in sys.argv[1:3]))
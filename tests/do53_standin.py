@@ -0,0 +1,40 @@
+# do53_standin.py
+#
+# Loopback Do53 server that answers every query at once, so a benchmark against
+# it measures the harness rather than a resolver. Do53 always targets port 53,
+# so serving needs root or CAP_NET_BIND_SERVICE.
+
+from __future__ import annotations
+
+import asyncio
+import sys
+
+from tests.quic_standin import answer
+
+DEFAULT_ADDRESS = "127.0.0.153"
+
+
+class _Do53Protocol(asyncio.DatagramProtocol):
+    """Answer each datagram as soon as it arrives."""
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self._transport = transport
+
+    def datagram_received(self, data: bytes, address: tuple[str, int]) -> None:
+        self._transport.sendto(answer(data), address)
+
+
+async def serve(address: str = DEFAULT_ADDRESS) -> None:
+    """Serve on ``address`` port 53 until cancelled."""
+    transport, _protocol = await asyncio.get_running_loop().create_datagram_endpoint(
+        _Do53Protocol,
+        local_addr=(address, 53),
+    )
+    try:
+        await asyncio.Event().wait()
+    finally:
+        transport.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(serve(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_ADDRESS))
@@ -0,0 +1,190 @@
+# quic_standin.py
+#
+# Loopback DoQ and DoH3 servers for the QUIC client tests. Answers depend only on
+# the queried name, so every outcome the benchmark classifies can be provoked
+# without a real resolver.
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import datetime
+import ipaddress
+import os
+import struct
+from urllib.parse import parse_qs
+from urllib.parse import urlparse
+
+import dns.message
+import dns.rcode
+import dns.rrset
+from aioquic.asyncio import QuicConnectionProtocol
+from aioquic.asyncio import serve
+from aioquic.asyncio.server import QuicServer
+from aioquic.h3.connection import H3_ALPN
+from aioquic.h3.connection import H3Connection
+from aioquic.h3.events import DataReceived
+from aioquic.h3.events import HeadersReceived
+from aioquic.quic.configuration import QuicConfiguration
+from aioquic.quic.events import ProtocolNegotiated
+from aioquic.quic.events import StreamDataReceived
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
+
+ANSWER_ADDRESS = "192.0.2.1"
+# Names starting with these labels get NXDOMAIN, or HTTP 503 over DoH3.
+NXDOMAIN_PREFIX = "nx"
+HTTP_ERROR_PREFIX = "http503"
+# The 503 answer asks the client to wait this many seconds before retrying.
+HTTP_ERROR_RETRY_AFTER = 7
+# Names starting with this label are answered only after SLOW_ANSWER_SECONDS.
+SLOW_PREFIX = "slow"
+SLOW_ANSWER_SECONDS = 2.0
+
+
+def _answer_delay(wire: bytes) -> float:
+    """Return how long to hold the answer to a query."""
+    name = dns.message.from_wire(wire).question[0].name.to_text()
+    return SLOW_ANSWER_SECONDS if name.startswith(SLOW_PREFIX) else 0.0
+
+
+def answer(wire: bytes) -> bytes:
+    """Answer NXDOMAIN for ``nx`` names and one A record for every other name."""
+    query = dns.message.from_wire(wire)
+    response = dns.message.make_response(query)
+    name = query.question[0].name
+    if name.to_text().startswith(NXDOMAIN_PREFIX):
+        response.set_rcode(dns.rcode.NXDOMAIN)
+    else:
+        response.answer.append(dns.rrset.from_text(name, 60, "IN", "A", ANSWER_ADDRESS))
+    return response.to_wire()
+
+
+def write_certificate(directory: str) -> tuple[str, str]:
+    """Write a self-signed certificate for localhost and 127.0.0.1, returning the certificate and key paths."""
+    key = ec.generate_private_key(ec.SECP256R1())
+    subject = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    certificate = (
+        x509.CertificateBuilder()
+        .subject_name(subject)
+        .issuer_name(subject)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(minutes=5))
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+        .add_extension(
+            x509.SubjectAlternativeName([x509.DNSName("localhost"), x509.IPAddress(ipaddress.ip_address("127.0.0.1"))]),
+            critical=False,
+        )
+        .sign(key, hashes.SHA256())
+    )
+    certificate_path = os.path.join(directory, "standin.pem")
+    key_path = os.path.join(directory, "standin.key")
+    with open(certificate_path, "wb") as certificate_file:
+        certificate_file.write(certificate.public_bytes(serialization.Encoding.PEM))
+    with open(key_path, "wb") as key_file:
+        key_file.write(
+            key.private_bytes(
+                serialization.Encoding.PEM,
+                serialization.PrivateFormat.PKCS8,
+                serialization.NoEncryption(),
+            )
+        )
+    return certificate_path, key_path
+
+
+class _DoQProtocol(QuicConnectionProtocol):
+    """RFC 9250 server: one length-prefixed query per stream."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._buffers: dict[int, bytes] = {}
+
+    def quic_event_received(self, event) -> None:
+        """Answer a stream once the client has finished sending on it."""
+        if not isinstance(event, StreamDataReceived):
+            return
+        data = self._buffers.pop(event.stream_id, b"") + event.data
+        if not event.end_stream:
+            self._buffers[event.stream_id] = data
+            return
+        asyncio.get_running_loop().call_later(_answer_delay(data[2:]), self._respond, event.stream_id, data[2:])
+
+    def _respond(self, stream_id: int, query: bytes) -> None:
+        """Send the length-prefixed answer and end the stream."""
+        wire = answer(query)
+        self._quic.send_stream_data(stream_id, struct.pack("!H", len(wire)) + wire, end_stream=True)
+        self.transmit()
+
+
+class _DoH3Protocol(QuicConnectionProtocol):
+    """RFC 8484 server on HTTP/3, accepting GET and POST."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._http: H3Connection | None = None
+        self._requests: dict[int, tuple[dict[bytes, bytes], bytes]] = {}
+
+    def quic_event_received(self, event) -> None:
+        """Collect request headers and body, then answer the finished stream."""
+        if isinstance(event, ProtocolNegotiated):
+            self._http = H3Connection(self._quic)
+        if self._http is None:
+            return
+        for http_event in self._http.handle_event(event):
+            if isinstance(http_event, HeadersReceived):
+                self._requests[http_event.stream_id] = (dict(http_event.headers), b"")
+            elif isinstance(http_event, DataReceived):
+                headers, body = self._requests[http_event.stream_id]
+                self._requests[http_event.stream_id] = (headers, body + http_event.data)
+            else:
+                continue
+            if http_event.stream_ended:
+                headers, body = self._requests.pop(http_event.stream_id)
+                if headers[b":method"] == b"GET":
+                    encoded = parse_qs(urlparse(headers[b":path"].decode()).query)["dns"][0]
+                    body = base64.urlsafe_b64decode(encoded + "=" * (-len(encoded) % 4))
+                asyncio.get_running_loop().call_later(_answer_delay(body), self._respond, http_event.stream_id, body)
+
+    def _respond(self, stream_id: int, body: bytes) -> None:
+        """Send the DNS answer, or HTTP 503 for names that ask for it."""
+        if dns.message.from_wire(body).question[0].name.to_text().startswith(HTTP_ERROR_PREFIX):
+            self._http.send_headers(
+                stream_id,
+                [
+                    (b":status", b"503"),
+                    (b"retry-after", str(HTTP_ERROR_RETRY_AFTER).encode()),
+                    (b"content-length", b"0"),
+                ],
+                end_stream=True,
+            )
+        else:
+            wire = answer(body)
+            self._http.send_headers(
+                stream_id,
+                [
+                    (b":status", b"200"),
+                    (b"content-type", b"application/dns-message"),
+                    (b"content-length", str(len(wire)).encode()),
+                ],
+            )
+            self._http.send_data(stream_id, wire, end_stream=True)
+        self.transmit()
+
+
+async def start_standin(h3: bool, certificate_path: str, key_path: str) -> tuple[QuicServer, int]:
+    """Serve DoH3 or DoQ on an ephemeral loopback port and return the server and its port."""
+    configuration = QuicConfiguration(is_client=False, alpn_protocols=H3_ALPN if h3 else ["doq"])
+    configuration.load_cert_chain(certificate_path, key_path)
+    server = await serve(
+        "127.0.0.1",
+        0,
+        configuration=configuration,
+        create_protocol=_DoH3Protocol if h3 else _DoQProtocol,
+    )
+    return server, server._transport.get_extra_info("sockname")[1]
@@ -0,0 +1,163 @@
+# test_benchmark_stats.py
+#
+# Bootstrap confidence intervals, the tiered ranking built on them, and the
+# paired per-domain latency matrix.
+
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from src import benchmark_stats
+from src.benchmark import QueryMeasurement
+from src.benchmark_stats import ConfidenceInterval
+from src.benchmark_stats import LatencyIntervals
+from src.benchmark_stats import LatencyMatrix
+from src.benchmark_stats import bootstrap_intervals
+from src.benchmark_stats import ranking_tiers
+
+
+def _latencies(center: float, count: int = 200, seed: int = 1) -> list[float]:
+    """Draw noisy latencies around ``center`` milliseconds."""
+    generator = random.Random(seed)
+    return [center + generator.uniform(-2.0, 2.0) for _ in range(count)]
+
+
+def _intervals(mean_low: float, mean_high: float) -> LatencyIntervals:
+    """Build intervals whose mean and p95 share the given bounds."""
+    interval = ConfidenceInterval(mean_low, mean_high)
+    return LatencyIntervals(samples=100, mean_ms=(mean_low + mean_high) / 2.0, p95_ms=mean_high, mean=interval, p95=interval)
+
+
+@pytest.fixture(params=["numpy", "python"])
+def resampler(request: pytest.FixtureRequest, monkeypatch: pytest.MonkeyPatch) -> str:
+    """Run a test with the vectorized resampler, when numpy is installed, and with the pure-Python one."""
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(benchmark_stats, "numpy", None)
+    return request.param
+
+
+def test_bootstrap_needs_values() -> None:
+    """There is nothing to resample in an empty run."""
+    with pytest.raises(ValueError):
+        bootstrap_intervals([])
+
+
+def test_intervals_bracket_the_point_estimates(resampler: str) -> None:
+    """The mean and p95 of the data lie inside their own intervals."""
+    intervals = bootstrap_intervals(_latencies(20.0))
+
+    assert intervals.samples == 200
+    assert intervals.mean.low <= intervals.mean_ms <= intervals.mean.high
+    assert intervals.p95.low <= intervals.p95_ms <= intervals.p95.high
+    assert intervals.mean.high - intervals.mean.low < 1.0
+
+
+def test_bootstrap_is_seeded(resampler: str) -> None:
+    """The same data and seed give the same intervals, so repeated checks agree."""
+    values = _latencies(20.0)
+
+    assert bootstrap_intervals(values) == bootstrap_intervals(values)
+
+
+def test_constant_latencies_give_degenerate_intervals(resampler: str) -> None:
+    """Without spread every resample is identical."""
+    intervals = bootstrap_intervals([12.5] * 30)
+
+    assert intervals.mean == ConfidenceInterval(12.5, 12.5)
+    assert intervals.p95 == ConfidenceInterval(12.5, 12.5)
+
+
+def test_resamplers_agree_within_noise(monkeypatch: pytest.MonkeyPatch) -> None:
+    """numpy and the pure-Python fallback draw differently but estimate the same intervals."""
+    pytest.importorskip("numpy")
+    values = _latencies(20.0)
+    vectorized = bootstrap_intervals(values)
+    monkeypatch.setattr(benchmark_stats, "numpy", None)
+    fallback = bootstrap_intervals(values)
+
+    assert vectorized.mean.low == pytest.approx(fallback.mean.low, abs=0.1)
+    assert vectorized.mean.high == pytest.approx(fallback.mean.high, abs=0.1)
+
+
+def test_distant_runs_are_separated_and_close_ones_are_not() -> None:
+    """Runs 10 ms apart are told apart, while two draws around one latency are tied."""
+    fast = bootstrap_intervals(_latencies(20.0, seed=1))
+    also_fast = bootstrap_intervals(_latencies(20.0, seed=2))
+    slow = bootstrap_intervals(_latencies(30.0, seed=3))
+
+    assert fast.separated_from(slow)
+    assert not fast.separated_from(also_fast)
+
+
+def test_tiers_open_when_separated_from_the_tier_leader() -> None:
+    """Ties with the tier's fastest member stay in the tier, and failed runs get no tier."""
+    tiers = ranking_tiers(
+        [
+            _intervals(10.0, 12.0),
+            _intervals(11.5, 13.0),
+            # Overlaps the second run but not the leader, so it opens tier 2.
+            _intervals(12.5, 14.0),
+            None,
+            _intervals(30.0, 32.0),
+        ]
+    )
+
+    assert tiers == [1, 1, 2, None, 3]
+
+
+def test_tiers_of_an_empty_or_failed_ranking() -> None:
+    """A ranking without intervals has no tiers."""
+    assert ranking_tiers([]) == []
+    assert ranking_tiers([None, None]) == [None, None]
+
+
+def _sample(domain: str, latency_ms: float | None) -> QueryMeasurement:
+    """Build one measurement, failed when it has no latency."""
+    return QueryMeasurement(domain=domain, success=latency_ms is not None, latency_ms=latency_ms)
+
+
+def test_matrix_pairs_only_names_both_resolvers_answered() -> None:
+    """Failed names are left out of the pairing, and repeated names keep their median."""
+    matrix = LatencyMatrix.from_measurements(
+        {
+            "do53": [_sample("a.example", 10.0), _sample("b.example", 20.0), _sample("c.example", 30.0), _sample("d.example", 40.0)],
+            "doh": [
+                _sample("a.example", 12.0),
+                _sample("a.example", 14.0),
+                _sample("a.example", 40.0),
+                _sample("b.example", 15.0),
+                _sample("c.example", None),
+                _sample("d.example", 45.0),
+            ],
+        }
+    )
+    comparison = matrix.compare("doh", "do53")
+
+    assert matrix.get("a.example", "doh") == 14.0
+    assert matrix.get("c.example", "doh") is None
+    assert comparison.paired_domains == 3
+    assert comparison.median_delta_ms == 4.0
+    assert comparison.mean_delta_ms == pytest.approx((4.0 - 5.0 + 5.0) / 3)
+    assert comparison.win_rate == pytest.approx(100.0 / 3)
+    assert comparison.summary_line() == "doh +4.0 ms/name vs do53, faster on 33%"
+
+
+def test_matrix_without_common_names() -> None:
+    """Two resolvers that never answered the same name cannot be compared."""
+    matrix = LatencyMatrix.from_measurements({"a": [_sample("x.example", 5.0)], "b": [_sample("y.example", 6.0)]})
+    comparison = matrix.compare("a", "b")
+
+    assert comparison.paired_domains == 0
+    assert comparison.median_delta_ms is None
+    assert comparison.summary_line() == "a has no names in common with b"
+
+
+def test_compare_all_skips_the_baseline() -> None:
+    """Every other resolver is compared against the baseline, in matrix order."""
+    matrix = LatencyMatrix.from_measurements({name: [_sample("a.example", 1.0)] for name in ("base", "one", "two")})
+
+    assert [comparison.resolver for comparison in matrix.compare_all("base")] == ["one", "two"]
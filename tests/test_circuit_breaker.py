@@ -0,0 +1,65 @@
+# test_circuit_breaker.py
+#
+# The sliding-window circuit breaker that ends the measured phase early for a
+# resolver whose recent answers mostly failed.
+
+from __future__ import annotations
+
+from src.benchmark import QueryMeasurement
+from src.benchmark import _CircuitBreaker
+
+
+def _answer(success: bool, error: str | None = None) -> QueryMeasurement:
+    """Build one measured answer."""
+    return QueryMeasurement(domain="example.com", success=success, error=error)
+
+
+def test_breaker_waits_for_a_full_window() -> None:
+    """Failures alone do not trip the breaker before the window has filled."""
+    breaker = _CircuitBreaker(True, window=5, error_rate=0.8)
+    for _index in range(4):
+        breaker.record(_answer(False, "Timeout"))
+
+    assert not breaker.is_open
+
+
+def test_breaker_trips_at_the_error_rate_and_names_the_last_error() -> None:
+    """Four failures in a window of five reach 80% and open the breaker with a reason."""
+    breaker = _CircuitBreaker(True, window=5, error_rate=0.8)
+    breaker.record(_answer(True))
+    for _index in range(4):
+        breaker.record(_answer(False, "Timeout"))
+
+    assert breaker.is_open
+    assert breaker.reason == "circuit opened after 5 queries: 4/5 recent queries failed (last error: Timeout)"
+
+
+def test_breaker_slides_past_old_failures() -> None:
+    """Only the most recent answers count, so a recovered resolver keeps the breaker closed."""
+    breaker = _CircuitBreaker(True, window=5, error_rate=0.8)
+    for _index in range(3):
+        breaker.record(_answer(False, "Timeout"))
+    for _index in range(10):
+        breaker.record(_answer(True))
+
+    assert not breaker.is_open
+    assert breaker.completed == 13
+
+
+def test_answered_overrides_an_expected_error_rcode() -> None:
+    """Passes that expect NXDOMAIN count it as an answer rather than a failure."""
+    breaker = _CircuitBreaker(True, window=3, error_rate=0.5)
+    for _index in range(3):
+        breaker.record(_answer(False, "NXDOMAIN"), answered=True)
+
+    assert not breaker.is_open
+
+
+def test_disabled_breaker_never_trips() -> None:
+    """With the breaker off, or with an empty window, nothing is recorded."""
+    for breaker in (_CircuitBreaker(False, window=5, error_rate=0.8), _CircuitBreaker(True, window=0, error_rate=0.8)):
+        for _index in range(10):
+            breaker.record(_answer(False, "Timeout"))
+
+        assert not breaker.is_open
+        assert breaker.completed == 0
@@ -0,0 +1,46 @@
+# test_profiling.py
+#
+# Profiled runs that overlap share one process-wide tracer, and their results
+# say so instead of silently losing or mixing in each other's data.
+
+from __future__ import annotations
+
+import asyncio
+import tracemalloc
+
+from src.benchmark_profiling import MeasuredPhaseProfiler
+
+
+async def _profiled_round(profiler: MeasuredPhaseProfiler, iterations: int) -> None:
+    """Profile one round that allocates and yields to the loop ``iterations`` times."""
+    profiler.start()
+    for _ in range(iterations):
+        [str(number) for number in range(100)]
+        await asyncio.sleep(0)
+    profiler.stop()
+
+
+def test_overlapping_runs_share_the_tracer(tmp_path) -> None:
+    """Two runs on one loop both get a profile, flagged as mixed, and tracing stops after the last one."""
+    first = MeasuredPhaseProfiler("cprofile", True)
+    second = MeasuredPhaseProfiler("cprofile", True)
+
+    async def scenario() -> None:
+        await asyncio.gather(_profiled_round(first, 20), _profiled_round(second, 5))
+
+    asyncio.run(scenario())
+
+    assert not tracemalloc.is_tracing()
+    for profiler in (first, second):
+        artifacts = profiler.write(str(tmp_path), "overlap")
+        assert "cprofile" in artifacts and "allocations" in artifacts
+        assert any(note.startswith("incomplete:") for note in profiler.notes)
+
+
+def test_lone_run_only_notes_overhead(tmp_path) -> None:
+    """A run profiled on its own is complete, but still says which tracers slowed it down."""
+    profiler = MeasuredPhaseProfiler("cprofile", True)
+    asyncio.run(_profiled_round(profiler, 5))
+
+    assert [note.split(":", 1)[0] for note in profiler.notes] == ["overhead", "overhead"]
+    assert "notes" in profiler.write(str(tmp_path), "alone")
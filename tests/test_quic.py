@@ -0,0 +1,226 @@
+# test_quic.py
+#
+# DoQ and DoH3 clients against the loopback stand-ins: answers, reuse of the
+# shared connection, and how failures end up classified.
+
+from __future__ import annotations
+
+import asyncio
+import socket
+
+import pytest
+
+pytest.importorskip("aioquic")
+
+import certifi  # noqa: E402
+
+from src.benchmark import BenchmarkOptions  # noqa: E402
+from src.benchmark import DoH3Client  # noqa: E402
+from src.benchmark import DoQClient  # noqa: E402
+from src.benchmark import QuicClient  # noqa: E402
+from src.benchmark import ResolverEndpoint  # noqa: E402
+from tests.quic_standin import HTTP_ERROR_RETRY_AFTER  # noqa: E402
+from tests.quic_standin import start_standin  # noqa: E402
+from tests.quic_standin import write_certificate  # noqa: E402
+
+OPTIONS = BenchmarkOptions(timeout_seconds=1.0)
+
+
+@pytest.fixture(scope="module")
+def certificate(tmp_path_factory: pytest.TempPathFactory) -> tuple[str, str]:
+    """Create one self-signed certificate for every stand-in of the module."""
+    return write_certificate(str(tmp_path_factory.mktemp("quic")))
+
+
+@pytest.fixture
+def trusted(certificate: tuple[str, str], monkeypatch: pytest.MonkeyPatch) -> None:
+    """Make aioquic trust the stand-in, since it verifies against the certifi bundle."""
+    monkeypatch.setattr(certifi, "where", lambda: certificate[0])
+
+
+async def _query_standin(
+    client: QuicClient,
+    h3: bool,
+    certificate: tuple[str, str],
+    domains: list[str],
+):
+    """Serve one stand-in, resolve ``domains`` in order on ``client``, and return the measurements."""
+    server, port = await start_standin(h3, *certificate)
+    if not h3:
+        client.port = port
+    try:
+        return [await client.query(domain, "A") for domain in domains]
+    finally:
+        await client.close()
+        server.close()
+
+
+def _doq_client() -> DoQClient:
+    """Build a DoQ client that verifies the stand-in as localhost."""
+    return DoQClient(ResolverEndpoint(name="standin", transport="DoQ", target="localhost"), OPTIONS, "127.0.0.1")
+
+
+def _doh3_client(port: int, method: str = "POST") -> DoH3Client:
+    """Build a DoH3 client for a stand-in listening on ``port``."""
+    endpoint = ResolverEndpoint(
+        name="standin",
+        transport="DoH3",
+        target=f"https://localhost:{port}/dns-query",
+        doh_method=method,
+    )
+    return DoH3Client(endpoint, OPTIONS, "127.0.0.1")
+
+
+def test_quic_client_requires_an_exchange() -> None:
+    """The shared client cannot be used without a transport-specific exchange."""
+    with pytest.raises(TypeError):
+        QuicClient(ResolverEndpoint(name="standin", transport="DoQ", target="localhost"), OPTIONS, "127.0.0.1")
+
+
+def test_doq_reuses_one_connection(certificate: tuple[str, str], trusted: None) -> None:
+    """Only the first query pays the handshake, and it reports it as a phase."""
+    client = _doq_client()
+    first, second = asyncio.run(_query_standin(client, False, certificate, ["example.com", "example.org"]))
+
+    assert first.success and second.success
+    assert first.attempts == second.attempts == 1
+    assert "tls_handshake" in first.phases
+    assert "tls_handshake" not in second.phases
+    assert client.counters.tls_handshakes == 1
+    assert client.counters.reused_connections == 1
+
+
+def test_cold_query_counts_the_handshake_and_closes(certificate: tuple[str, str], trusted: None) -> None:
+    """A cold query pays its handshake inside the latency and leaves no connection behind."""
+
+    async def scenario():
+        server, port = await start_standin(False, *certificate)
+        client = _doq_client()
+        client.port = port
+        try:
+            return client, await client.query_cold("example.com", "A")
+        finally:
+            server.close()
+
+    client, measurement = asyncio.run(scenario())
+
+    assert measurement.success
+    assert measurement.latency_ms == pytest.approx(measurement.phases["tls_handshake"] + measurement.phases["exchange"])
+    assert client.counters.tls_handshakes == 1
+    assert client.connection is None
+
+
+def test_doq_nxdomain_is_a_failed_answer(certificate: tuple[str, str], trusted: None) -> None:
+    """An error rcode is a timed answer that failed, not a transport error."""
+    (measurement,) = asyncio.run(_query_standin(_doq_client(), False, certificate, ["nx.example.com"]))
+
+    assert not measurement.success
+    assert measurement.error == "NXDOMAIN"
+    assert measurement.latency_ms is not None
+    assert measurement.response_wire is not None
+    assert measurement.attempts == 1
+
+
+def test_doq_untrusted_certificate_fails_after_one_retry(certificate: tuple[str, str]) -> None:
+    """A handshake that cannot succeed is retried once on a fresh connection and then reported."""
+    client = _doq_client()
+    (measurement,) = asyncio.run(_query_standin(client, False, certificate, ["example.com"]))
+
+    assert not measurement.success
+    assert measurement.error
+    assert measurement.attempts == 2
+    assert client.counters.retries == 1
+
+
+def test_doq_silent_server_times_out() -> None:
+    """A server that never answers ends as a failure within the retry budget."""
+
+    async def scenario():
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as silent:
+            silent.bind(("127.0.0.1", 0))
+            client = _doq_client()
+            client.port = silent.getsockname()[1]
+            try:
+                return await client.query("example.com", "A", timeout=0.2)
+            finally:
+                await client.close()
+
+    measurement = asyncio.run(scenario())
+
+    assert not measurement.success
+    assert measurement.error
+    assert measurement.attempts == 2
+
+
+@pytest.mark.parametrize("method", ["GET", "POST"])
+def test_doh3_answers_over_http3(certificate: tuple[str, str], trusted: None, method: str) -> None:
+    """Both RFC 8484 methods resolve over HTTP/3 on one connection."""
+
+    async def scenario():
+        server, port = await start_standin(True, *certificate)
+        client = _doh3_client(port, method)
+        try:
+            return client, [await client.query(domain, "A") for domain in ("example.com", "example.org")]
+        finally:
+            await client.close()
+            server.close()
+
+    client, (first, second) = asyncio.run(scenario())
+
+    assert first.success and second.success
+    assert first.http_version == "HTTP_3"
+    assert client.counters.tls_handshakes == 1
+
+
+def test_doh3_http_error_is_a_failure(certificate: tuple[str, str], trusted: None) -> None:
+    """A non-200 status is a timed failure carrying Retry-After, and it keeps the connection."""
+
+    async def scenario():
+        server, port = await start_standin(True, *certificate)
+        client = _doh3_client(port)
+        try:
+            return client, [await client.query(domain, "A") for domain in ("http503.example.com", "example.com")]
+        finally:
+            await client.close()
+            server.close()
+
+    client, (refused, answered) = asyncio.run(scenario())
+
+    assert not refused.success
+    assert refused.error == "HTTP 503"
+    assert refused.retry_after_seconds == HTTP_ERROR_RETRY_AFTER
+    assert refused.latency_ms is not None
+    assert refused.attempts == 1
+    assert answered.success
+    assert client.counters.tls_handshakes == 1
+    assert client.counters.retries == 0
+
+
+@pytest.mark.parametrize("h3", [False, True], ids=["DoQ", "DoH3"])
+def test_stream_timeout_spares_the_shared_connection(certificate: tuple[str, str], trusted: None, h3: bool) -> None:
+    """One stream that times out fails alone; concurrent streams keep the connection and answer on time."""
+
+    async def scenario():
+        server, port = await start_standin(h3, *certificate)
+        client = _doh3_client(port) if h3 else _doq_client()
+        if not h3:
+            client.port = port
+        try:
+            await client.query("example.com", "A")
+            measurements = await asyncio.gather(
+                client.query("slow.example.com", "A"),
+                *(client.query(f"name{index}.example.com", "A") for index in range(5)),
+            )
+            return client, measurements
+        finally:
+            await client.close()
+            server.close()
+
+    client, (slow, *others) = asyncio.run(scenario())
+
+    assert not slow.success
+    assert slow.attempts == 1
+    assert all(measurement.success and measurement.attempts == 1 for measurement in others)
+    assert all(measurement.latency_ms < OPTIONS.timeout_seconds * 1000.0 for measurement in others)
+    assert client.counters.tls_handshakes == 1
+    assert client.counters.retries == 0
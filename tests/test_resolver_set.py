@@ -0,0 +1,121 @@
+# test_resolver_set.py
+#
+# Stub selection strategies of the resolver set, driven by scripted upstreams so
+# the order and timing of every answer is known.
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+import dns.message
+import dns.rcode
+
+from src.benchmark import BenchmarkOptions
+from src.benchmark import QueryMeasurement
+from src.benchmark import ResolverEndpoint
+from src.resolver_set import ResolverSetRunner
+
+
+class _ScriptedRunner:
+    """Stand-in for a prepared benchmark runner that answers every query the same way after a delay."""
+
+    def __init__(self, name: str, delay: float, rcode: int | None = dns.rcode.NOERROR):
+        self.endpoint = ResolverEndpoint(name=name, transport="Do53", target=name)
+        self.delay = delay
+        # None answers nothing, like a timeout.
+        self.rcode = rcode
+        self.queries = 0
+        self.finished = 0
+        self.closed = False
+
+    async def prepare(self) -> str | None:
+        return None
+
+    async def query(self, domain: str, worker_index: int = 0, timeout: float | None = None) -> QueryMeasurement:
+        self.queries += 1
+        await asyncio.sleep(self.delay)
+        self.finished += 1
+        if self.rcode is None:
+            return QueryMeasurement(domain=domain, success=False, error="timed out")
+        response = dns.message.make_response(dns.message.make_query(domain, "A"))
+        response.set_rcode(self.rcode)
+        return QueryMeasurement(
+            domain=domain,
+            success=self.rcode == dns.rcode.NOERROR,
+            latency_ms=self.delay * 1000.0,
+            error=None if self.rcode == dns.rcode.NOERROR else dns.rcode.to_text(self.rcode),
+            response_wire=response.to_wire(),
+        )
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+def _run(strategy: str, runners: list[_ScriptedRunner], domains: list[str]):
+    """Run a resolver set whose upstreams are the scripted runners, returning the result and the run's duration."""
+    endpoints = [runner.endpoint for runner in runners]
+    resolver_set = ResolverSetRunner(endpoints, domains, BenchmarkOptions(concurrency=1), strategy)
+    for upstream, runner in zip(resolver_set.upstreams, runners):
+        upstream.runner = runner
+
+    async def scenario():
+        started = time.perf_counter()
+        try:
+            result = await resolver_set.run()
+            return result, time.perf_counter() - started
+        finally:
+            await resolver_set.close()
+
+    return asyncio.run(scenario())
+
+
+def test_failover_keeps_negative_answers() -> None:
+    """NXDOMAIN is an answer, so the next upstream is never asked."""
+    first = _ScriptedRunner("first", 0.0, dns.rcode.NXDOMAIN)
+    second = _ScriptedRunner("second", 0.0)
+    result, _seconds = _run("failover", [first, second], ["nx.example.com"])
+
+    (measurement,) = result.measurements
+    assert measurement.error == "NXDOMAIN"
+    assert measurement.upstream == "first"
+    assert second.queries == 0
+    assert result.upstreams[0].failures == 0
+
+
+def test_failover_moves_on_after_servfail_and_timeouts() -> None:
+    """SERVFAIL and a missing answer both send the query to the next upstream."""
+    broken = _ScriptedRunner("broken", 0.0, dns.rcode.SERVFAIL)
+    silent = _ScriptedRunner("silent", 0.0, None)
+    healthy = _ScriptedRunner("healthy", 0.0)
+    result, _seconds = _run("failover", [broken, silent, healthy], ["example.com"])
+
+    (measurement,) = result.measurements
+    assert measurement.success
+    assert measurement.upstream == "healthy"
+    assert [share.failures for share in result.upstreams] == [1, 1, 0]
+
+
+def test_race_returns_first_success_and_records_the_losers() -> None:
+    """The race ends with the fast answer, while the slow upstream still finishes and is recorded."""
+    fast = _ScriptedRunner("fast", 0.01)
+    slow = _ScriptedRunner("slow", 0.3)
+    result, seconds = _run("race", [fast, slow], ["example.com", "example.org"])
+
+    assert seconds < slow.delay
+    assert all(measurement.upstream == "fast" for measurement in result.measurements)
+    assert all(measurement.latency_ms < 300.0 for measurement in result.measurements)
+    assert slow.finished == 2
+    assert result.upstreams[1].srtt_ms is not None
+    assert slow.closed
+
+
+def test_race_falls_back_to_a_negative_answer() -> None:
+    """Without a success, the race reports the negative answer rather than the transport failure."""
+    silent = _ScriptedRunner("silent", 0.0, None)
+    negative = _ScriptedRunner("negative", 0.01, dns.rcode.NXDOMAIN)
+    result, _seconds = _run("race", [silent, negative], ["nx.example.com"])
+
+    (measurement,) = result.measurements
+    assert measurement.error == "NXDOMAIN"
+    assert measurement.upstream == "negative"
@@ -0,0 +1,187 @@
+# test_response_cache.py
+#
+# The warm-mode response cache on a hand-driven clock, and the client-cache
+# simulation that replays measured upstream answers through it.
+
+from __future__ import annotations
+
+import asyncio
+
+import dns.message
+import dns.rcode
+import dns.rrset
+import pytest
+
+from src.benchmark import BenchmarkOptions
+from src.benchmark import BenchmarkRunner
+from src.benchmark import CacheSimulationResult
+from src.benchmark import QueryMeasurement
+from src.benchmark import ResolverEndpoint
+from src.benchmark import ResponseCache
+
+
+class _Clock:
+    """Clock the tests move by hand."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _answer(domain: str, ttl: int = 60) -> dns.message.Message:
+    """Build a NOERROR response with one A record."""
+    response = dns.message.make_response(dns.message.make_query(domain, "A"))
+    response.answer.append(dns.rrset.from_text(domain, ttl, "IN", "A", "192.0.2.1"))
+    return response
+
+
+def _nxdomain(domain: str, soa_ttl: int | None) -> dns.message.Message:
+    """Build an NXDOMAIN response, with an SOA whose minimum is 120 s when ``soa_ttl`` is given."""
+    response = dns.message.make_response(dns.message.make_query(domain, "A"))
+    response.set_rcode(dns.rcode.NXDOMAIN)
+    if soa_ttl is not None:
+        response.authority.append(dns.rrset.from_text("example.", soa_ttl, "IN", "SOA", "ns. host. 1 7200 900 1209600 120"))
+    return response
+
+
+def test_lru_evicts_the_least_recently_used_entry() -> None:
+    """A lookup refreshes recency, so the untouched entry is the one evicted."""
+    cache = ResponseCache(True, max_entries=2, clock=_Clock())
+
+    async def scenario():
+        await cache.put("a.example", "A", _answer("a.example."))
+        await cache.put("b.example", "A", _answer("b.example."))
+        await cache.lookup("a.example", "A")
+        await cache.put("c.example", "A", _answer("c.example."))
+        return [(await cache.lookup(domain, "A"))[0] for domain in ("a.example", "b.example", "c.example")]
+
+    assert asyncio.run(scenario()) == ["fresh", "miss", "fresh"]
+    assert cache.statistics.evictions == 1
+    assert cache.statistics.entries == 2
+
+
+def test_byte_bound_evicts_and_rejects_oversized_answers() -> None:
+    """The wire-byte bound evicts old entries and never admits an answer larger than itself."""
+    size = len(_answer("a.example.").to_wire())
+    cache = ResponseCache(True, max_entries=0, max_bytes=size + 1, clock=_Clock())
+
+    async def scenario():
+        await cache.put("a.example", "A", _answer("a.example."))
+        await cache.put("b.example", "A", _answer("b.example."))
+        oversized = _answer("c.example.")
+        for index in range(4):
+            oversized.answer.append(dns.rrset.from_text("c.example.", 60, "IN", "TXT", f'"padding {index}"'))
+        return await cache.put("c.example", "A", oversized)
+
+    assert asyncio.run(scenario()) is False
+    assert cache.statistics.entries == 1
+    assert cache.statistics.wire_bytes <= size + 1
+    assert cache.statistics.evictions == 1
+
+
+def test_negative_answers_live_for_the_soa_minimum() -> None:
+    """NXDOMAIN is cached for min(SOA TTL, SOA minimum) and served as a failure."""
+    clock = _Clock()
+    cache = ResponseCache(True, clock=clock)
+
+    async def scenario():
+        stored = await cache.put("nx.example", "A", _nxdomain("nx.example.", 900))
+        clock.now = 119.0
+        hit = await cache.get("nx.example", "A")
+        clock.now = 121.0
+        expired = await cache.get("nx.example", "A")
+        return stored, hit, expired
+
+    stored, hit, expired = asyncio.run(scenario())
+
+    assert stored
+    assert hit is not None and not hit.success and hit.error == "NXDOMAIN"
+    assert expired is None
+    assert cache.statistics.negative_hits == 1
+    assert cache.statistics.expirations == 1
+
+
+def test_uncacheable_answers_are_not_stored() -> None:
+    """NXDOMAIN without an SOA and SERVFAIL carry no lifetime, so they stay out of the cache."""
+    cache = ResponseCache(True, clock=_Clock())
+    servfail = dns.message.make_response(dns.message.make_query("sf.example.", "A"))
+    servfail.set_rcode(dns.rcode.SERVFAIL)
+
+    async def scenario():
+        return [
+            await cache.put("nx.example", "A", _nxdomain("nx.example.", None)),
+            await cache.put("sf.example", "A", servfail),
+        ]
+
+    assert asyncio.run(scenario()) == [False, False]
+    assert cache.statistics.entries == 0
+
+
+def test_prefetch_and_serve_stale_states() -> None:
+    """Entries turn due for prefetch late in their TTL and stay servable stale for the grace period."""
+    clock = _Clock()
+    cache = ResponseCache(True, prefetch_threshold=0.8, stale_max_seconds=30.0, clock=clock)
+
+    async def scenario():
+        await cache.put("a.example", "A", _answer("a.example.", ttl=100))
+        states = []
+        for now in (50.0, 85.0, 110.0, 135.0):
+            clock.now = now
+            states.append((await cache.lookup("a.example", "A"))[0])
+        return states
+
+    assert asyncio.run(scenario()) == ["fresh", "prefetch", "stale", "miss"]
+    assert cache.statistics.stale_hits == 1
+
+
+def _simulate(**options) -> CacheSimulationResult:
+    """Replay one domain with a 10 s TTL and a 50 ms upstream at one query per second for 30 s."""
+    runner = BenchmarkRunner(
+        ResolverEndpoint(name="simulated", transport="Do53", target="192.0.2.53"),
+        ["example.com"],
+        BenchmarkOptions(
+            cache_simulation=True,
+            simulation_duration_seconds=30.0,
+            simulation_query_rate=1.0,
+            **options,
+        ),
+    )
+    runner._upstream_samples["example.com"] = [
+        QueryMeasurement(
+            domain="example.com",
+            success=True,
+            latency_ms=50.0,
+            response_wire=_answer("example.com.", ttl=10).to_wire(),
+        )
+    ]
+    return asyncio.run(runner._simulate_client_cache())
+
+
+def test_client_cache_blocks_on_every_expiry_without_prefetch_or_stale() -> None:
+    """A plain cache sends the first query after each expiry to the upstream and waits for it."""
+    simulation = _simulate(prefetch_threshold=0.0, serve_stale=False)
+
+    assert simulation.queries == 30
+    assert simulation.blocked_queries == 3
+    assert simulation.upstream_fetches == 3
+    assert simulation.effective_average_latency_ms == pytest.approx(3 * 50.0 / 30)
+
+
+def test_client_cache_serve_stale_only_blocks_the_first_query() -> None:
+    """Serve-stale answers expired entries at once and refreshes them in the background."""
+    simulation = _simulate(prefetch_threshold=0.0, serve_stale=True)
+
+    assert simulation.blocked_queries == 1
+    assert simulation.stale_served == 2
+    assert simulation.upstream_fetches == 3
+
+
+def test_client_cache_prefetch_refreshes_before_expiry() -> None:
+    """Prefetching late in the TTL keeps the entry fresh, so only the cold start blocks."""
+    simulation = _simulate(prefetch_threshold=0.5, serve_stale=False)
+
+    assert simulation.blocked_queries == 1
+    assert simulation.prefetches > 0
+    assert simulation.stale_served == 0
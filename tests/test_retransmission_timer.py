@@ -0,0 +1,97 @@
+# test_retransmission_timer.py
+#
+# The RFC 6298 retransmission timer behind the adaptive per-query timeout.
+
+from __future__ import annotations
+
+import pytest
+
+from src.benchmark import QueryMeasurement
+from src.benchmark import _RetransmissionTimer
+
+
+def _answer(latency_ms: float) -> QueryMeasurement:
+    """Build one answered query."""
+    return QueryMeasurement(domain="example.com", success=True, latency_ms=latency_ms)
+
+
+def _timeout() -> QueryMeasurement:
+    """Build one query that timed out without an answer."""
+    return QueryMeasurement(domain="example.com", success=False, error="Timeout: timed out")
+
+
+def test_rto_starts_at_the_fixed_budget() -> None:
+    """Without a sample the timer cannot do better than the fixed budget."""
+    timer = _RetransmissionTimer(0.2, 2.0)
+
+    assert timer.rto == 2.0
+    assert timer.srtt is None
+
+
+def test_first_and_later_samples_follow_rfc_6298() -> None:
+    """The first sample sets SRTT = R and RTTVAR = R/2; later ones use the 1/8 and 1/4 gains."""
+    timer = _RetransmissionTimer(0.2, 2.0)
+    timer.record(_answer(100.0), 2.0)
+
+    assert timer.srtt == pytest.approx(0.1)
+    assert timer.rttvar == pytest.approx(0.05)
+    assert timer.rto == pytest.approx(0.3)
+
+    timer.record(_answer(200.0), 2.0)
+
+    assert timer.rttvar == pytest.approx(0.75 * 0.05 + 0.25 * 0.1)
+    assert timer.srtt == pytest.approx(0.875 * 0.1 + 0.125 * 0.2)
+    assert timer.rto == pytest.approx(timer.srtt + 4.0 * timer.rttvar)
+    assert timer.samples == 2
+
+
+def test_rto_is_clamped_between_floor_and_budget() -> None:
+    """Fast answers cannot push the RTO below the floor, nor slow ones above the budget."""
+    fast = _RetransmissionTimer(0.2, 2.0)
+    for _index in range(10):
+        fast.record(_answer(10.0), 2.0)
+    slow = _RetransmissionTimer(0.2, 2.0)
+    slow.record(_answer(5000.0), 2.0)
+
+    assert fast.rto == 0.2
+    assert slow.rto == 2.0
+
+
+def test_expiry_doubles_once_per_expired_rto() -> None:
+    """Concurrent expiries of the same RTO back off once, and doubling stops at the budget."""
+    timer = _RetransmissionTimer(0.2, 2.0)
+    timer.record(_answer(100.0), 2.0)
+    expired = timer.rto
+    timer.back_off(expired)
+    timer.back_off(expired)
+
+    assert timer.rto == pytest.approx(2.0 * expired)
+    assert timer.backoffs == 1
+
+    timer.back_off(1.5)
+
+    assert timer.rto == 2.0
+    assert timer.backoffs == 2
+
+
+def test_only_timeouts_back_off() -> None:
+    """A timed-out query backs off from the RTO it used; other failures leave the timer alone."""
+    timer = _RetransmissionTimer(0.2, 2.0)
+    timer.record(_answer(100.0), 2.0)
+    timer.record(QueryMeasurement(domain="example.com", success=False, error="ConnectionRefusedError: refused"), 0.3)
+
+    assert timer.rto == pytest.approx(0.3)
+
+    timer.record(_timeout(), 0.3)
+
+    assert timer.rto == pytest.approx(0.6)
+    assert timer.samples == 1
+
+
+def test_floor_never_exceeds_the_budget() -> None:
+    """A floor above the fixed budget is lowered to it."""
+    timer = _RetransmissionTimer(5.0, 1.0)
+    timer.record(_answer(10.0), 1.0)
+
+    assert timer.min_rto == 1.0
+    assert timer.rto == 1.0
@@ -0,0 +1,114 @@
+# test_throttle.py
+#
+# Throttling signals and the AIMD in-flight budget of the throttle controller.
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+import pytest
+
+from src.benchmark import MAX_RETRY_AFTER_SECONDS
+from src.benchmark import QueryMeasurement
+from src.benchmark import _ThrottleController
+
+
+def _answer(error: str | None = None, retry_after_seconds: float | None = None) -> QueryMeasurement:
+    """Build one answer, failed when it carries an error."""
+    return QueryMeasurement(
+        domain="example.com",
+        success=error is None,
+        latency_ms=5.0,
+        error=error,
+        retry_after_seconds=retry_after_seconds,
+    )
+
+
+def _settle(throttle: _ThrottleController, answers: list[QueryMeasurement]) -> list[str | None]:
+    """Send each answer through one acquire and release, returning the signals."""
+
+    async def scenario():
+        signals = []
+        for answer in answers:
+            await throttle.acquire()
+            signals.append(await throttle.release(answer))
+        return signals
+
+    return asyncio.run(scenario())
+
+
+@pytest.mark.parametrize(
+    ("error", "signal"),
+    [
+        ("REFUSED", "refused"),
+        ("HTTP 429", "http-429"),
+        ("HTTP 503", "http-503"),
+        ("HTTP 500", None),
+        ("HTTP none", None),
+        ("NXDOMAIN", None),
+        (None, None),
+    ],
+)
+def test_single_answers_that_signal_throttling(error: str | None, signal: str | None) -> None:
+    """REFUSED and HTTP 429/503 signal throttling on their own; other answers do not."""
+    assert _ThrottleController(True, 4).classify(_answer(error)) == signal
+
+
+@pytest.mark.parametrize(("error", "kind"), [("SERVFAIL", "servfail"), ("Timeout: timed out", "timeout")])
+def test_servfail_and_timeouts_only_signal_in_bursts(error: str, kind: str) -> None:
+    """The third SERVFAIL or timeout among recent answers is a burst."""
+    throttle = _ThrottleController(True, 4)
+
+    assert [throttle.classify(_answer(error)) for _index in range(3)] == [None, None, f"{kind}-burst"]
+
+
+def test_budget_halves_once_per_window_and_grows_back_additively() -> None:
+    """A signal halves the budget, a second one right after does not, and clean answers add 1/budget each."""
+    throttle = _ThrottleController(True, 8)
+    _settle(throttle, [_answer("REFUSED"), _answer("REFUSED")])
+
+    assert throttle.budget == 4.0
+    assert throttle.statistics.backoffs == 1
+    assert throttle.statistics.signals == {"refused": 2}
+
+    _settle(throttle, [_answer()])
+
+    assert throttle.budget == pytest.approx(4.25)
+
+    _settle(throttle, [_answer()] * 2 + [_answer("REFUSED")])
+
+    assert throttle.statistics.backoffs == 2
+    assert throttle.budget < 4.0
+    assert throttle.statistics.min_in_flight == int(throttle.budget)
+
+
+def test_budget_never_exceeds_the_limit_nor_drops_below_one() -> None:
+    """Clean answers stop growing at the configured concurrency, and backoff stops at one query."""
+    growing = _ThrottleController(True, 4)
+    _settle(growing, [_answer()] * 20)
+    shrinking = _ThrottleController(True, 4)
+    _settle(shrinking, [_answer("REFUSED")] * 40)
+
+    assert growing.budget == 4.0
+    assert shrinking.budget == 1.0
+    assert shrinking.finish().final_in_flight == 1
+
+
+def test_retry_after_pauses_new_queries_up_to_the_cap() -> None:
+    """Retry-After moves the resume time forward, never by more than the cap."""
+    throttle = _ThrottleController(True, 4)
+    before = time.monotonic()
+    _settle(throttle, [_answer("HTTP 429", retry_after_seconds=3600.0)])
+
+    assert throttle.statistics.retry_after_waits == 1
+    assert before < throttle.resume_at <= time.monotonic() + MAX_RETRY_AFTER_SECONDS
+
+
+def test_disabled_controller_passes_everything_through() -> None:
+    """Without backoff nothing is classified on release and the budget stays put."""
+    throttle = _ThrottleController(False, 4)
+
+    assert _settle(throttle, [_answer("REFUSED")] * 5) == [None] * 5
+    assert throttle.budget == 4.0
+    assert throttle.statistics.backoffs == 0